@@ -12,18 +12,224 @@ from __future__ import (
 __version__ = '0.9.6'
 
 
-from .lexer import CxmlLexer
+import atexit
+import multiprocessing
+import os
+
+from functools import partial
+from threading import Lock
+
+from .builder import CxmlBuilder
+from .cache import DiskCache, XmlCache
+from .etree import ElementFactory
+from .events import iterevents, saxify  # noqa
+from .lexer import CxmlLexer, CxmlRegexLexer
+from .model import nsmap
 from .parser import CxmlParser
 from .symbols import root
+from .template import CxmlTemplate
 from .translator import CxmlTranslator
 
 
-def xml(cxml):
+_element_factory = ElementFactory()
+_xml_cache = XmlCache()
+_disk_cache = None
+_pool = None  # (workers, pool) pair for the pool shared by xml_many() calls
+_pool_lock = Lock()  # held while the shared pool is replaced or in use
+
+
+def cache_clear():
+    """
+    Discard all XML cached by :func:`xml`, and all element trees cached by
+    :func:`element`, and reset the cache statistics.
+    """
+    _xml_cache.clear()
+    _element_factory.cache_clear()
+
+
+def cache_info():
+    """
+    Return a |CacheInfo| named tuple reporting the hits, misses, evictions,
+    limits, and current size of the cache used by :func:`xml`.
+    """
+    return _xml_cache.info()
+
+
+def compile(template):
+    """
+    Return a |CxmlTemplate| object for *template*, a CXML expression
+    containing `${name}` placeholders for attribute values, element text, or
+    names. The template is translated once; its `render(**values)` method
+    then generates the XML for each set of values without re-parsing, e.g.::
+
+        jc = cxml.compile('w:jc{w:val=${val}}')
+        jc.render(val='center')
+    """
+    return CxmlTemplate(template)
+
+
+def element(cxml):
+    """
+    Return a new element tree for *cxml*, equivalent to parsing the XML for
+    *cxml* while dropping the whitespace used to pretty-print it. The tree
+    is an lxml element when lxml is installed and an ElementTree element
+    otherwise. Each distinct expression is parsed only once; later calls
+    return a copy of the tree parsed then, which the caller is free to
+    modify.
+    """
+    return _element_factory.element(cxml)
+
+
+def set_cache_dir(directory):
+    """
+    Persist the XML generated by :func:`xml` in *directory*, so it is
+    available to later processes, or stop persisting it when *directory* is
+    |None|. Expressions not found in the in-memory cache are looked up here
+    before being translated. The directory can be shared by concurrent
+    processes, such as pytest-xdist workers. The directory named by the
+    `CXML_CACHE_DIR` environment variable, if any, is used by default.
+    """
+    global _disk_cache
+    if directory is None:
+        _disk_cache = None
+        return
+    salt = '%s|%s' % (__version__, sorted(nsmap.items()))
+    _disk_cache = DiskCache(directory, salt)
+
+
+def xml(cxml, engine='ast'):
     """
     Return the XML generated from *cxml*.
+
+    *engine* selects how the expression is processed. The default, `'ast'`,
+    lexes the expression, parses it into an abstract syntax tree, and then
+    translates that tree into elements. `'direct'` builds the elements from
+    the token stream as it is parsed, which is considerably faster. Both
+    produce identical XML, and neither is limited by expression depth or
+    width, so even a document of many thousands of runs can be translated
+    without raising the recursion limit.
+
+    The XML for recently translated expressions is cached, keyed on both
+    the expression and the engine, so repeated calls with the same
+    expression and engine return without re-translating it. See
+    :func:`set_cache_dir` to also persist it across processes.
     """
-    lexer = CxmlLexer(cxml)
-    parser = CxmlParser(lexer)
-    root_ast = parser.parse(root)
-    root_element = CxmlTranslator.translate(root_ast)
+    if engine not in ('ast', 'direct'):
+        raise ValueError("unknown engine '%s'" % engine)
+    key = '%s\0%s' % (engine, cxml)
+    xml_ = _xml_cache.get(key)
+    if xml_ is not None:
+        return xml_
+    disk_cache = _disk_cache
+    if disk_cache is not None:
+        xml_ = disk_cache.get(key)
+    if xml_ is None:
+        xml_ = _translate(cxml, engine)
+        if disk_cache is not None:
+            disk_cache.put(key, xml_)
+    _xml_cache.put(key, xml_)
+    return xml_
+
+
+def xml_many(expressions, engine='ast', workers=None, chunksize=64,
+             pool=None):
+    """
+    Return a list of the XML generated from each of *expressions*, in the
+    same order. The expressions are translated by a pool of *workers*
+    processes, defaulting to one per CPU, which are sent *chunksize*
+    expressions at a time. When *workers* is 1 (or less) they are translated
+    in this process instead.
+
+    The pool is created on first use and kept for later calls, so its
+    workers, and the XML they have cached, stay warm from one batch to the
+    next; it is closed when the interpreter exits. Calls from several
+    threads take turns using it. A `multiprocessing.Pool` owned by the
+    caller can be passed as *pool* instead, in which case *workers* is
+    ignored and the pool is left open.
+
+    An expression that cannot be translated does not abort the batch; the
+    exception raised for it (e.g. |SyntaxError|) takes the place of its XML
+    in the list.
+    """
+    if engine not in ('ast', 'direct'):
+        raise ValueError("unknown engine '%s'" % engine)
+    xml_or_exception = partial(_xml_or_exception, engine=engine)
+    if pool is None:
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers <= 1:
+            return [xml_or_exception(cxml) for cxml in expressions]
+        # the lock is held while mapping so no other thread can replace the
+        # pool, closing it, in the meantime
+        with _pool_lock:
+            pool = _worker_pool(workers)
+            return list(pool.imap(xml_or_exception, expressions, chunksize))
+    return list(pool.imap(xml_or_exception, expressions, chunksize))
+
+
+def _close_pool():
+    """
+    Close the pool shared by calls to :func:`xml_many`, if there is one,
+    and wait for its workers to exit.
+    """
+    with _pool_lock:
+        _discard_pool()
+
+
+def _discard_pool():
+    """
+    Close the shared pool, if there is one, and wait for its workers to
+    exit. The caller must hold `_pool_lock`.
+    """
+    global _pool
+    if _pool is None:
+        return
+    _, pool = _pool
+    _pool = None
+    pool.close()
+    pool.join()
+
+
+def _translate(cxml, engine):
+    """
+    Return the XML generated from *cxml* using *engine*, bypassing the
+    cache.
+    """
+    if engine == 'direct':
+        root_element = CxmlBuilder(CxmlRegexLexer(cxml)).build()
+    else:
+        lexer = CxmlLexer(cxml)
+        parser = CxmlParser(lexer, iterative=True)
+        root_ast = parser.parse(root)
+        root_element = CxmlTranslator.translate(root_ast)
     return root_element.xml
+
+
+def _worker_pool(workers):
+    """
+    Return the pool of *workers* processes shared by calls to
+    :func:`xml_many`, creating it on first use and replacing it when a
+    different number of workers is asked for. The caller must hold
+    `_pool_lock`, for as long as it uses the pool.
+    """
+    global _pool
+    if _pool is None or _pool[0] != workers:
+        _discard_pool()
+        _pool = (workers, multiprocessing.Pool(workers))
+    return _pool[1]
+
+
+def _xml_or_exception(cxml, engine):
+    """
+    Return the XML generated from *cxml*, or the exception raised while
+    translating it. Defined at module level so it can be sent to a worker
+    process by :func:`xml_many`.
+    """
+    try:
+        return xml(cxml, engine)
+    except Exception as e:
+        return e
+
+
+atexit.register(_close_pool)
+set_cache_dir(os.environ.get('CXML_CACHE_DIR') or None)
@@ -0,0 +1,165 @@
+# encoding: utf-8
+
+"""
+Builder producing a CXML element graph directly from the token stream,
+without the intermediate abstract syntax tree (AST).
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from .lib.parser import TokenStream
+from .model import (
+    Element, NamespaceDeclaration, RootElement, StringAttribute
+)
+from .symbols import (
+    COLON, COMMA, EQUAL, LBRACE, LPAREN, NAME, RBRACE, RPAREN, SLASH, SNTL,
+    TEXT
+)
+
+
+class CxmlReader(object):
+    """
+    Base class for objects that read a CXML expression in a single pass over
+    the tokens produced by *lexer*, providing the methods that recognize
+    names and attributes. The CXML grammar is LL(1), so each production is
+    chosen by looking at the next token only.
+    """
+    def __init__(self, lexer):
+        self._lexer = lexer
+        self._tokens = None
+
+    def _accept(self, symbol):
+        """
+        Return the next token and advance past it if it is of token class
+        *symbol*, otherwise return |None|.
+        """
+        return self._tokens.accept(symbol)
+
+    def _attr(self):
+        """
+        Return a |StringAttribute| or |NamespaceDeclaration| object for the
+        attribute at the current position.
+        """
+        name = self._expect(NAME).lexeme
+        if self._accept(COLON):
+            local_name = self._accept(NAME)
+            if local_name is None:
+                return NamespaceDeclaration(name)
+            name = '%s:%s' % (name, local_name.lexeme)
+        self._expect(EQUAL)
+        return StringAttribute.new(name, self._expect(TEXT).lexeme)
+
+    def _attrs(self):
+        """
+        Return a list of the attribute objects in the braces at the current
+        position.
+        """
+        self._expect(LBRACE)
+        attrs = [self._attr()]
+        while self._accept(COMMA):
+            attrs.append(self._attr())
+        self._expect(RBRACE)
+        return attrs
+
+    def _expect(self, symbol):
+        """
+        Return the next token and advance past it, raising |SyntaxError| if
+        it is not of token class *symbol*.
+        """
+        token = self._accept(symbol)
+        if token is None:
+            raise SyntaxError("in '%s'" % self._lexer._input)
+        return token
+
+    def _expect_end(self):
+        """
+        Consume the end-of-input sentinel, raising |SyntaxError| if the next
+        token is not the sentinel and |ValueError| if tokens remain after it.
+        """
+        self._expect(SNTL)
+        tokens = self._tokens
+        if not tokens.at_end:
+            raise ValueError(
+                'not all tokens were consumed %s' % (tokens.remaining,)
+            )
+
+    def _peek_is(self, symbol):
+        """
+        |True| if the next token is of token class *symbol*.
+        """
+        return self._tokens.peek_symbol() == symbol
+
+    def _qname(self):
+        """
+        Return the qualified name at the current position as a single
+        string, e.g. 'w:rPr'.
+        """
+        name = self._expect(NAME).lexeme
+        if self._accept(COLON):
+            return '%s:%s' % (name, self._expect(NAME).lexeme)
+        return name
+
+
+class CxmlBuilder(CxmlReader):
+    """
+    Constructs the |RootElement| object (with its graph) for a CXML
+    expression in a single pass over the tokens produced by *lexer*. Each
+    element, attribute, and namespace declaration object is created as soon
+    as its tokens are recognized (syntax-directed translation), so no AST
+    nodes or intermediate (element, trees) pairs are allocated.
+
+    Nested trees are tracked on an explicit stack, allowing expressions of
+    any depth or width.
+    """
+
+    def build(self):
+        """
+        Return the |RootElement| object for the expression, containing all
+        the right children, with all the right attributes, etc.
+        """
+        self._tokens = TokenStream.from_lexer(self._lexer)
+        root_element = self._element(RootElement)
+        if self._accept(SLASH):
+            self._trees(root_element)
+        self._expect_end()
+        return root_element
+
+    def _element(self, element_cls):
+        """
+        Return an object of *element_cls* (|Element| or |RootElement|) for
+        the element at the current position.
+        """
+        qname = self._qname()
+        attrs = self._attrs() if self._peek_is(LBRACE) else []
+        text_token = self._accept(TEXT)
+        text = text_token.lexeme if text_token is not None else ''
+        return element_cls.new(qname, attrs, text)
+
+    def _trees(self, parent):
+        """
+        Add the trees at the current position (following a slash) to
+        *parent*. Each entry on the stack is a (parent, parenthesized) pair
+        for a sequence of trees not yet complete.
+        """
+        stack = []
+        while True:
+            # start the trees of *parent*
+            stack.append((parent, self._accept(LPAREN) is not None))
+            while True:
+                element = self._element(Element)
+                stack[-1][0].add_child(element)
+                if self._accept(SLASH):
+                    parent = element
+                    break
+                # this tree is complete, close each sequence it completes
+                while stack:
+                    parenthesized = stack[-1][1]
+                    if parenthesized and self._accept(COMMA):
+                        break
+                    if parenthesized:
+                        self._expect(RPAREN)
+                    stack.pop()
+                else:
+                    return
@@ -0,0 +1,193 @@
+# encoding: utf-8
+
+"""
+Caching of the XML generated for CXML expressions.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import errno
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+# os.replace() is atomic and overwrites on all platforms, but only exists on
+# Python 3.3+; os.rename() does the same on POSIX
+_replace = getattr(os, 'replace', os.rename)
+
+
+CacheInfo = namedtuple(
+    'CacheInfo',
+    ('hits', 'misses', 'evictions', 'maxsize', 'maxbytes', 'currsize',
+     'currbytes')
+)
+
+
+class XmlCache(object):
+    """
+    Bounded mapping of CXML expression to its generated XML, evicting the
+    least-recently-used entries once it holds more than *maxsize* entries or
+    more than *maxbytes* bytes of (UTF-8 encoded) XML. A value larger than
+    *maxbytes* on its own is not cached. All operations are safe to call from
+    multiple threads.
+    """
+
+    def __init__(self, maxsize=4096, maxbytes=16 * 1024 * 1024):
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = Lock()
+        self._currbytes = 0
+        self._hits = self._misses = self._evictions = 0
+
+    def clear(self):
+        """
+        Remove all entries and reset the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._currbytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def get(self, key):
+        """
+        Return the value cached for *key*, marking it most-recently-used, or
+        |None| if *key* is not cached.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries[key] = entry
+            self._hits += 1
+            return entry[0]
+
+    def info(self):
+        """
+        Return a |CacheInfo| named tuple reporting the hit, miss, and
+        eviction counts, the limits, and the current size of this cache.
+        """
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, self._maxsize,
+                self._maxbytes, len(self._entries), self._currbytes
+            )
+
+    def put(self, key, value, nbytes=None):
+        """
+        Cache *value* for *key* as the most-recently-used entry, evicting
+        least-recently-used entries as needed to stay within the limits.
+        *nbytes* is the size counted for *value*, by default the length of
+        *value* (a string) encoded as UTF-8.
+        """
+        if nbytes is None:
+            nbytes = len(value.encode('utf-8'))
+        if nbytes > self._maxbytes:
+            return
+        with self._lock:
+            entries = self._entries
+            existing = entries.pop(key, None)
+            if existing is not None:
+                self._currbytes -= existing[1]
+            entries[key] = (value, nbytes)
+            self._currbytes += nbytes
+            while (
+                len(entries) > self._maxsize or
+                self._currbytes > self._maxbytes
+            ):
+                _, (_, evicted_nbytes) = entries.popitem(last=False)
+                self._currbytes -= evicted_nbytes
+                self._evictions += 1
+
+
+class DiskCache(object):
+    """
+    Persistent mapping of CXML expression to its generated XML, stored in
+    *directory* so it survives from one process (e.g. test run) to the next.
+
+    Each entry is a file named for the SHA-1 hash of *salt* and the
+    expression, in a subdirectory named for the first two hex digits of the
+    hash. *salt* should identify everything besides the expression that
+    affects the XML, such as the package version and namespace map, so a
+    stale entry is never found. An entry is written to a temporary file
+    which is then renamed into place, so concurrent processes sharing the
+    directory never read a partially written entry; when two write the same
+    entry, the last rename wins with identical content.
+    """
+
+    def __init__(self, directory, salt=''):
+        self._directory = directory
+        self._salt = salt.encode('utf-8')
+
+    def clear(self):
+        """
+        Remove all entries, along with *directory* itself.
+        """
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def get(self, key):
+        """
+        Return the value stored for *key*, or |None| if there is none or it
+        cannot be read, such as a truncated entry that is not valid UTF-8.
+        """
+        try:
+            with io.open(self._path(key), 'rb') as f:
+                return f.read().decode('utf-8')
+        except (IOError, OSError, UnicodeDecodeError):
+            return None
+
+    def put(self, key, value):
+        """
+        Store *value* for *key*, replacing any value already stored. Failure
+        to write (e.g. a read-only directory) is not an error, the entry is
+        just not stored.
+        """
+        path = self._path(key)
+        shard_dir = os.path.dirname(path)
+        try:
+            _makedirs(shard_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=shard_dir, suffix='.tmp')
+        except (IOError, OSError):
+            return
+        try:
+            with io.open(fd, 'wb') as f:
+                f.write(value.encode('utf-8'))
+            _replace(tmp_path, path)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _path(self, key):
+        """
+        Return the path of the file holding the entry for *key*.
+        """
+        digest = hashlib.sha1(
+            self._salt + b'\0' + key.encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self._directory, digest[:2], digest[2:] + '.xml')
+
+
+def _makedirs(path):
+    """
+    Create directory *path* and any missing parents, tolerating its
+    creation by another process at the same time.
+    """
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST or not os.path.isdir(path):
+            raise
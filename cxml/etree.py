@@ -0,0 +1,142 @@
+# encoding: utf-8
+
+"""
+Element objects, as used by lxml or the standard library ElementTree, for
+CXML expressions.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import copy
+
+try:
+    from lxml import etree
+    have_lxml = True
+except ImportError:
+    from xml.etree import ElementTree as etree
+    have_lxml = False
+
+from .builder import CxmlBuilder
+from .cache import XmlCache
+from .lexer import CxmlRegexLexer
+from .model import nsmap
+
+
+xml_namespace = 'http://www.w3.org/XML/1998/namespace'
+
+
+class EtreeBuilder(object):
+    """
+    Builds the element tree for a |RootElement| object graph directly, with
+    `SubElement()`, rather than by generating its XML and parsing that.
+
+    Names are in Clark notation, e.g. `'{http://ns/uri}p'`, the form both
+    lxml and ElementTree use for a namespaced name. With lxml, the namespace
+    declarations are placed as they appear in the XML: the root element
+    declares the prefixes given by :attr:`RootElement.nspfxs` and each
+    descendant declares the prefixes it declares explicitly. An ElementTree
+    element has no namespace declarations, so they are omitted and prefixes
+    are chosen when the tree is serialized.
+    """
+
+    def __init__(self, etree_module=None):
+        self._etree = etree if etree_module is None else etree_module
+        self._has_nsmap = self._etree is etree and have_lxml
+
+    def build(self, root_element):
+        """
+        Return the root of the element tree for *root_element*. The tree is
+        walked on an explicit stack, so its depth is not limited by the
+        recursion limit.
+        """
+        root = self._new_element(
+            None, root_element, root_element.nspfxs
+        )
+        stack = [(root, root_element)]
+        while stack:
+            parent, parent_element = stack.pop()
+            for element in parent_element.children:
+                child = self._new_element(
+                    parent, element, element.explicit_nspfxs
+                )
+                if element.children:
+                    stack.append((child, element))
+        return root
+
+    def _new_element(self, parent, element, nspfxs):
+        """
+        Return a new element for *element*, a child of *parent* unless
+        *parent* is |None|, declaring the namespace prefixes in *nspfxs*.
+        """
+        tag = clark_name(element.tagname)
+        if self._has_nsmap:
+            kwargs = {'nsmap': dict((pfx, nsmap[pfx]) for pfx in nspfxs)}
+        else:
+            kwargs = {}
+        if parent is None:
+            new_element = self._etree.Element(tag, **kwargs)
+        else:
+            new_element = self._etree.SubElement(parent, tag, **kwargs)
+        for attr in element.str_attrs:
+            new_element.set(clark_name(attr.qname), attr.value)
+        if element.text:
+            new_element.text = element.text
+        return new_element
+
+
+def clark_name(qname):
+    """
+    Return *qname*, e.g. `'w:pPr'`, in Clark notation, e.g.
+    `'{http://schemas.../main}pPr'`. A name without a prefix is returned
+    unchanged.
+    """
+    if ':' not in qname:
+        return qname
+    nspfx, local_name = qname.split(':')
+    uri = xml_namespace if nspfx == 'xml' else nsmap[nspfx]
+    return '{%s}%s' % (uri, local_name)
+
+
+class ElementFactory(object):
+    """
+    Provides a fresh element tree for a CXML expression on each request.
+    The tree is an `lxml.etree._Element` object when lxml is installed and
+    an `xml.etree.ElementTree.Element` object otherwise, in either case
+    without the whitespace used to pretty-print the XML.
+
+    The tree for each expression is built only once and kept as a
+    prototype in an LRU cache of *maxsize* entries. Each request receives a
+    deep copy of the prototype, so callers can modify the tree they receive
+    without affecting later requests.
+    """
+
+    def __init__(self, maxsize=1024):
+        self._prototypes = XmlCache(maxsize=maxsize)
+        self._builder = EtreeBuilder()
+
+    def cache_clear(self):
+        """
+        Discard all cached prototypes and reset the cache statistics.
+        """
+        self._prototypes.clear()
+
+    def cache_info(self):
+        """
+        Return a |CacheInfo| named tuple for the prototype cache. Each
+        prototype is counted as the size of the expression it was built
+        from.
+        """
+        return self._prototypes.info()
+
+    def element(self, cxml):
+        """
+        Return a new element tree for CXML expression *cxml*.
+        """
+        prototype = self._prototypes.get(cxml)
+        if prototype is None:
+            root_element = CxmlBuilder(CxmlRegexLexer(cxml)).build()
+            prototype = self._builder.build(root_element)
+            self._prototypes.put(cxml, prototype, len(cxml.encode('utf-8')))
+        return copy.deepcopy(prototype)
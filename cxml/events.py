@@ -0,0 +1,241 @@
+# encoding: utf-8
+
+"""
+Streaming output of a CXML expression as a sequence of parse events, in the
+manner of SAX, without constructing element objects.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from xml.sax.xmlreader import AttributesNSImpl
+
+from .builder import CxmlReader
+from .etree import xml_namespace
+from .lexer import CxmlRegexLexer
+from .lib.parser import TokenStream
+from .model import NamespaceDeclaration, _ordered_union, nsmap
+from .symbols import COMMA, LBRACE, LPAREN, RPAREN, SLASH, TEXT
+
+
+def iterevents(cxml):
+    """
+    Generate the parse events for CXML expression *cxml* in document order,
+    each a tuple of one of these forms:
+
+    * `('start', qname, attrs, nsdecls)`, where *attrs* is a list of
+      `(qname, value)` pairs and *nsdecls* a list of `(prefix, uri)` pairs
+      for the namespace declarations on the element.
+    * `('text', text)`
+    * `('end', qname)`
+
+    The namespace declarations match those in the XML generated for *cxml*.
+    Those of the root element depend on the whole expression, so it is read
+    twice, once to resolve them and again to generate the events. Only the
+    elements currently open are held in memory.
+    """
+    root_nspfxs = _root_nspfxs(CxmlEventParser(CxmlRegexLexer(cxml)).events())
+    return CxmlEventParser(CxmlRegexLexer(cxml)).events(root_nspfxs)
+
+
+def saxify(cxml, handler):
+    """
+    Feed the parse events for CXML expression *cxml* to *handler*, an
+    `xml.sax.handler.ContentHandler` object, as namespace-aware SAX events.
+    """
+    SaxAdapter(handler).feed(iterevents(cxml))
+
+
+class CxmlEventParser(CxmlReader):
+    """
+    Generates the parse events for a CXML expression in a single pass over
+    the tokens produced by *lexer*. Open elements are tracked on an explicit
+    stack, allowing expressions of any depth or width.
+    """
+
+    def events(self, root_nspfxs=None):
+        """
+        Generate the parse events for the expression, as described for
+        :func:`iterevents`. The root element declares the namespace prefixes
+        in *root_nspfxs*, or, when that is |None|, only the prefixes it
+        declares explicitly.
+        """
+        self._tokens = TokenStream.from_lexer(self._lexer)
+        qname, attrs, nspfxs, text = self._element()
+        if root_nspfxs is not None:
+            nspfxs = root_nspfxs
+        yield ('start', qname, attrs, _nsdecls(nspfxs))
+        if text:
+            yield ('text', text)
+        if self._accept(SLASH):
+            for event in self._tree_events():
+                yield event
+        yield ('end', qname)
+        self._expect_end()
+
+    def _element(self):
+        """
+        Return a (qname, attrs, nspfxs, text) 4-tuple for the element at the
+        current position, where *attrs* is a list of (qname, value) pairs
+        and *nspfxs* the list of namespace prefixes it declares.
+        """
+        qname = self._qname()
+        attrs, nspfxs = [], []
+        if self._peek_is(LBRACE):
+            for attr in self._attrs():
+                if isinstance(attr, NamespaceDeclaration):
+                    nspfxs.append(attr.nspfx)
+                else:
+                    attrs.append((attr.qname, attr.value))
+        text_token = self._accept(TEXT)
+        text = text_token.lexeme if text_token is not None else ''
+        return qname, attrs, nspfxs, text
+
+    def _tree_events(self):
+        """
+        Generate the events for the trees at the current position (following
+        a slash). Each entry on the stack is a (qname, parenthesized) pair
+        for a sequence of trees not yet complete, where *qname* is that of
+        their parent.
+        """
+        stack = []
+        parent_qname = None  # the root element is ended by the caller
+        while True:
+            # start the trees of the element named *parent_qname*
+            stack.append((parent_qname, self._accept(LPAREN) is not None))
+            while True:
+                qname, attrs, nspfxs, text = self._element()
+                yield ('start', qname, attrs, _nsdecls(nspfxs))
+                if text:
+                    yield ('text', text)
+                if self._accept(SLASH):
+                    parent_qname = qname
+                    break
+                yield ('end', qname)
+                # this tree is complete, close each sequence it completes
+                while stack:
+                    parent_qname, parenthesized = stack[-1]
+                    if parenthesized and self._accept(COMMA):
+                        break
+                    if parenthesized:
+                        self._expect(RPAREN)
+                    stack.pop()
+                    if stack:
+                        yield ('end', parent_qname)
+                else:
+                    return
+
+
+class SaxAdapter(object):
+    """
+    Feeds parse events, as generated by :func:`iterevents`, to *handler*, an
+    `xml.sax.handler.ContentHandler` object, calling its namespace-aware
+    methods (`startElementNS()` etc.) with names as (uri, localname) pairs.
+    """
+
+    def __init__(self, handler):
+        self._handler = handler
+
+    def feed(self, events):
+        """
+        Call the handler methods for each of *events*, enclosed in calls to
+        `startDocument()` and `endDocument()`.
+        """
+        handler = self._handler
+        # the prefixes declared by each open element, to be ended with it
+        open_nspfxs = []
+
+        handler.startDocument()
+        for event in events:
+            kind = event[0]
+            if kind == 'start':
+                _, qname, attrs, nsdecls = event
+                for nspfx, uri in nsdecls:
+                    handler.startPrefixMapping(nspfx, uri)
+                open_nspfxs.append([nspfx for nspfx, _ in nsdecls])
+                handler.startElementNS(
+                    _ns_name(qname), qname, _attributes(attrs)
+                )
+            elif kind == 'text':
+                handler.characters(event[1])
+            else:
+                qname = event[1]
+                handler.endElementNS(_ns_name(qname), qname)
+                for nspfx in reversed(open_nspfxs.pop()):
+                    handler.endPrefixMapping(nspfx)
+        handler.endDocument()
+
+
+def _attributes(attrs):
+    """
+    Return an `AttributesNSImpl` object for *attrs*, a list of (qname,
+    value) pairs.
+    """
+    values, qnames = {}, {}
+    for qname, value in attrs:
+        name = _ns_name(qname)
+        values[name] = value
+        qnames[name] = qname
+    return AttributesNSImpl(values, qnames)
+
+
+def _nsdecls(nspfxs):
+    """
+    Return a list of (prefix, uri) pairs for the namespace prefixes in
+    *nspfxs*.
+    """
+    return [(nspfx, nsmap[nspfx]) for nspfx in nspfxs]
+
+
+def _ns_name(qname):
+    """
+    Return the (uri, localname) pair for *qname*, with a uri of |None| when
+    *qname* has no namespace prefix.
+    """
+    if ':' not in qname:
+        return (None, qname)
+    nspfx, local_name = qname.split(':')
+    uri = xml_namespace if nspfx == 'xml' else nsmap[nspfx]
+    return (uri, local_name)
+
+
+def _root_nspfxs(events):
+    """
+    Return the list of namespace prefixes to be declared on the root element
+    of *events*, resolved by the same rules as :attr:`RootElement.nspfxs`.
+    Only the distinct prefixes are held, not the events.
+    """
+    events = iter(events)
+    _, qname, attrs, root_nsdecls = next(events)
+    root_nspfx = qname.split(':')[0] if ':' in qname else None
+    implicit = _ordered_union(_qname_nspfxs(qname, attrs))
+    seen, descendant_explicit = set(implicit), set()
+    for event in events:
+        if event[0] != 'start':
+            continue
+        _, qname, attrs, nsdecls = event
+        for nspfx in _qname_nspfxs(qname, attrs):
+            if nspfx not in seen:
+                seen.add(nspfx)
+                implicit.append(nspfx)
+        descendant_explicit.update(nspfx for nspfx, _ in nsdecls)
+
+    nspfxs = _ordered_union(
+        [root_nspfx] if root_nspfx else [],
+        [nspfx for nspfx, _ in root_nsdecls],
+        (pfx for pfx in implicit if pfx != 'xml'),
+    )
+    return [pfx for pfx in nspfxs if pfx not in descendant_explicit]
+
+
+def _qname_nspfxs(qname, attrs):
+    """
+    Return a list of the namespace prefixes of *qname* and of the names in
+    *attrs*, a list of (qname, value) pairs, in that order.
+    """
+    nspfxs = []
+    for name in [qname] + [name for name, _ in attrs]:
+        if ':' in name:
+            nspfxs.append(name.split(':')[0])
+    return nspfxs
@@ -8,7 +8,19 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
-from .lib.lexer import Lexer
+import re
+
+from bisect import bisect_right
+
+try:
+    import numpy as np
+    have_numpy = True
+except ImportError:
+    have_numpy = False
+
+from .lib.lexer import (
+    CharSet, DfaLexer, Lexer, LexerSpec, Token, TokenBuffer, _unichr
+)
 
 from .symbols import (
     COLON, COMMA, EQUAL, LBRACE, LPAREN, NAME, RBRACE, RPAREN, SLASH, SNTL,
@@ -22,8 +34,34 @@ nums = '0123456789'
 name_start_chars = alphas + '_'
 name_chars = alphas + nums + '_-.'
 
+# the non-ASCII characters an XML NCName may begin with, as (first, last)
+# code point ranges, and those it may contain after the first
+name_start_ranges = (
+    (0xC0, 0xD6), (0xD8, 0xF6), (0xF8, 0x2FF), (0x370, 0x37D),
+    (0x37F, 0x1FFF), (0x200C, 0x200D), (0x2070, 0x218F), (0x2C00, 0x2FEF),
+    (0x3001, 0xD7FF), (0xF900, 0xFDCF), (0xFDF0, 0xFFFD), (0x10000, 0xEFFFF),
+)
+name_char_ranges = tuple(sorted(
+    name_start_ranges + ((0xB7, 0xB7), (0x300, 0x36F), (0x203F, 0x2040))
+))
+
+# every character a name may begin with or contain
+name_start_charset = CharSet(name_start_chars, ranges=name_start_ranges)
+name_charset = CharSet(name_chars, ranges=name_char_ranges)
+
 punctuation = ':,=/{}()'
 
+punctuation_symbols = {
+    ':': COLON, ',': COMMA, '{': LBRACE, '}': RBRACE,
+    '=': EQUAL, '/': SLASH, '(': LPAREN, ')': RPAREN,
+}
+
+# terminal symbol of each token class the batch lexer recognizes, by id
+_symbols_by_id = dict(
+    (int(symbol), symbol)
+    for symbol in [NAME, TEXT] + list(punctuation_symbols.values())
+)
+
 
 class CxmlLexer(Lexer):
     """
@@ -56,10 +94,12 @@ class CxmlLexer(Lexer):
         elif peek == '"':
             return self._lex_quoted_string
 
+        # only a non-ASCII character needs the full test for a name
+        elif peek > '\x7f' and self._peek_char in name_start_charset:
+            return self._lex_name
+
         else:
-            raise SyntaxError(
-                "at character '%s' in '%s'" % (peek, self._input)
-            )
+            raise self._syntax_error("at character '%s'" % self._peek_char)
 
     def _lex_eof(self):
         """
@@ -71,9 +111,19 @@ class CxmlLexer(Lexer):
 
     def _lex_name(self):
         """
-        Emit maximal sequence of name characters.
+        Emit maximal sequence of name characters. Runs of ASCII name
+        characters are accepted in a single step, each non-ASCII character
+        one at a time.
         """
         self._accept_run(name_chars)
+        while True:
+            peek = self._peek
+            if peek is None or peek < '\x80':
+                break
+            if self._peek_char not in name_charset:
+                break
+            self._accept_char()
+            self._accept_run(name_chars)
         self._emit(NAME)
         return self._lex_start
 
@@ -83,12 +133,7 @@ class CxmlLexer(Lexer):
         COLON.
         """
         symbol = self._next()
-
-        token_type = {
-            ':': COLON, ',': COMMA, '{': LBRACE, '}': RBRACE,
-            '=': EQUAL, '/': SLASH, '(': LPAREN, ')': RPAREN,
-        }[symbol]
-
+        token_type = punctuation_symbols[symbol]
         self._emit(token_type)
         return self._lex_text if symbol in '=}' else self._lex_start
 
@@ -137,3 +182,451 @@ class CxmlLexer(Lexer):
         self._accept_run(' ')
         self._ignore()
         return self._lex_start
+
+
+def _char_class(chars, ranges=()):
+    """
+    Return a regular expression character class matching any of *chars* or
+    any character in *ranges*, a sequence of (first, last) code point pairs.
+    """
+    return '[%s%s]' % (
+        ''.join(re.escape(c) for c in chars),
+        ''.join(
+            '%s-%s' % (re.escape(_unichr(first)), re.escape(_unichr(last)))
+            for first, last in ranges
+        ),
+    )
+
+
+class CxmlRegexLexer(object):
+    """
+    Alternate lexer engine for CXML that recognizes each token with a single
+    compiled master pattern rather than stepping through the input one
+    character at a time. It produces the same token stream as |CxmlLexer|
+    and can be used in its place by |CxmlParser|.
+
+    The text state entered after an `=` or `}` is folded into the master
+    pattern as an optional continuation of the punctuation character that
+    introduces it.
+    """
+
+    _pattern = re.compile(
+        '(?P<whitespace> +)'
+        '|(?P<name>%s%s*)'
+        '|(?P<text_punctuation>(?P<text_punct>[=}])'
+        '(?:"(?P<text_quoted>[^"]*)(?P<text_quote_end>"?)'
+        '|(?P<text_raw>[^,}/)"][^,}/)]*))?)'
+        '|(?P<punctuation>%s)'
+        '|(?P<quoted_string>"(?P<quoted>[^"]*)(?P<quote_end>"?))'
+        '|(?P<error>.)' % (
+            _char_class(name_start_chars, name_start_ranges),
+            _char_class(name_chars, name_char_ranges),
+            _char_class(punctuation),
+        ),
+        re.DOTALL
+    )
+
+    def __init__(self, input, emit_sntl=True):
+        self._input = input
+        self._emit_sntl = emit_sntl
+
+    def __iter__(self):
+        """
+        Generate each of the tokens in input.
+        """
+        input_ = self._input
+
+        for match in self._pattern.finditer(input_):
+            kind = match.lastgroup
+
+            if kind == 'name':
+                yield Token(NAME, match.group())
+
+            elif kind == 'punctuation':
+                char = match.group()
+                yield Token(punctuation_symbols[char], char)
+
+            elif kind == 'text_punctuation':
+                char = match.group('text_punct')
+                yield Token(punctuation_symbols[char], char)
+                text = match.group('text_raw')
+                if text is None:
+                    text = match.group('text_quoted')
+                    if text is not None and not match.group('text_quote_end'):
+                        raise SyntaxError("unterminated quote")
+                if text is not None:
+                    yield Token(TEXT, text)
+
+            elif kind == 'quoted_string':
+                if not match.group('quote_end'):
+                    raise SyntaxError("unterminated quote")
+                yield Token(TEXT, match.group('quoted'))
+
+            elif kind == 'error':
+                raise SyntaxError(
+                    "at character '%s' in '%s'" % (match.group(), input_)
+                )
+
+        if self._emit_sntl:
+            yield Token(SNTL, '')
+
+    def iter_spans(self):
+        """
+        Generate a (symbol, (start, end)) pair for each of the tokens in
+        input, where *start* and *end* are the offsets of its lexeme, without
+        creating a |Token| object or slicing its lexeme. The tokens are the
+        same as those generated by :meth:`__iter__`.
+        """
+        input_ = self._input
+
+        for match in self._pattern.finditer(input_):
+            kind = match.lastgroup
+
+            if kind == 'name':
+                yield NAME, match.span()
+
+            elif kind == 'punctuation':
+                yield punctuation_symbols[match.group()], match.span()
+
+            elif kind == 'text_punctuation':
+                start = match.start()
+                yield punctuation_symbols[input_[start]], (start, start + 1)
+                span = match.span('text_raw')
+                if span[0] < 0:
+                    span = match.span('text_quoted')
+                    if span[0] >= 0 and not match.group('text_quote_end'):
+                        raise SyntaxError("unterminated quote")
+                if span[0] >= 0:
+                    yield TEXT, span
+
+            elif kind == 'quoted_string':
+                if not match.group('quote_end'):
+                    raise SyntaxError("unterminated quote")
+                yield TEXT, match.span('quoted')
+
+            elif kind == 'error':
+                raise SyntaxError(
+                    "at character '%s' in '%s'" % (match.group(), input_)
+                )
+
+        if self._emit_sntl:
+            end = len(input_)
+            yield SNTL, (end, end)
+
+    def token_buffer(self):
+        """
+        Return a |TokenBuffer| object containing the tokens in input. No
+        |Token| object is created while lexing into the buffer.
+        """
+        token_buffer = TokenBuffer(self._input)
+        token_buffer.extend(self.iter_spans())
+        return token_buffer
+
+
+def _cxml_lexer_spec():
+    """
+    Return the |LexerSpec| object for CXML, the same lexical specification
+    implemented by the state methods of |CxmlLexer|.
+    """
+    spec = LexerSpec()
+    spec.mode('start')
+    spec.mode('text', fallback='start')
+
+    quote, not_quote = CharSet('"'), CharSet('"', negated=True)
+    quoted_string = (quote, (not_quote, '*'), quote)
+    unterminated_quote = (quote, (not_quote, '*'))
+
+    spec.rule('start', [(CharSet(' '), '+')])
+    spec.rule('start', [name_start_charset, (name_charset, '*')], NAME)
+    for char in punctuation:
+        spec.rule(
+            'start', [CharSet(char)], punctuation_symbols[char],
+            next_mode='text' if char in '=}' else None
+        )
+    spec.rule('start', quoted_string, TEXT, trim=1)
+    spec.rule('start', unterminated_quote, error='unterminated quote')
+
+    # text following an `=` or `}`, the lexer falls back to the start mode
+    # when there is none
+    spec.rule(
+        'text',
+        [CharSet(',}/)"', negated=True), (CharSet(',}/)', negated=True), '*')],
+        TEXT, next_mode='start'
+    )
+    spec.rule('text', quoted_string, TEXT, next_mode='start', trim=1)
+    spec.rule('text', unterminated_quote, error='unterminated quote')
+    return spec
+
+
+class CxmlDfaLexer(DfaLexer):
+    """
+    Alternate lexer engine for CXML driven by transition tables compiled
+    from a declarative specification of the language, rather than the
+    hand-written state methods of |CxmlLexer|. It produces the same token
+    stream as |CxmlLexer| and can be used in its place by |CxmlParser|.
+    """
+
+    spec = _cxml_lexer_spec()
+
+
+def lex_many(inputs, emit_sntl=True):
+    """
+    Return a list of |TokenBuffer| objects, one for each of the CXML
+    expressions in *inputs*, each containing the same tokens as the buffer
+    produced by |CxmlLexer| for that expression. When NumPy is installed,
+    the expressions are lexed as a batch, with every character classified in
+    a single vectorized pass, otherwise each is lexed in turn by
+    |CxmlRegexLexer|. A |SyntaxError| is raised for the first expression
+    that is lexically invalid.
+    """
+    inputs = list(inputs)
+    if not have_numpy:
+        return [
+            CxmlRegexLexer(input_, emit_sntl).token_buffer()
+            for input_ in inputs
+        ]
+    return _BatchLexer(inputs, emit_sntl).token_buffers()
+
+
+class _BatchLexer(object):
+    """
+    Lexes the CXML expressions in *inputs* together, joined into a single
+    string. Each character is classified by table lookup and the names,
+    punctuation, and whitespace between text values are delimited by
+    comparing the class of each character with that of its neighbors, all
+    with NumPy array operations. Only text values, whose extent depends on
+    the characters before them, are found by stepping from one to the next.
+    """
+
+    # character classes
+    OTHER, SPACE, NAME_START, NAME_CHAR, PUNCT, QUOTE = range(6)
+
+    def __init__(self, inputs, emit_sntl):
+        self._inputs = inputs
+        self._emit_sntl = emit_sntl
+        # expressions are joined by a space, which ends any name and is
+        # skipped, so no token can span two of them
+        self._bases = bases = []
+        base = 0
+        for input_ in inputs:
+            bases.append(base)
+            base += len(input_) + 1
+        self._text = ' '.join(inputs)
+        self._codes = np.frombuffer(
+            self._text.encode('utf-32-le'), dtype=np.uint32
+        )
+
+    def token_buffers(self):
+        """
+        Return the list of |TokenBuffer| objects, one for each expression.
+        """
+        codes = self._codes
+        classes = self._classes()
+        text_starts, text_ends, opaque, quote_errors = self._text_values()
+
+        # characters not part of a text value, where the lexer is between
+        # tokens
+        live = ~opaque
+        namey = live & (
+            (classes == self.NAME_START) | (classes == self.NAME_CHAR)
+        )
+        before, after = np.zeros_like(namey), np.zeros_like(namey)
+        before[1:], after[:-1] = namey[:-1], namey[1:]
+        name_starts = namey & ~before
+        name_ends = namey & ~after
+        bad = live & (
+            (classes == self.OTHER) |
+            (name_starts & (classes == self.NAME_CHAR))
+        )
+        self._raise_first_error(np.flatnonzero(bad), quote_errors)
+
+        puncts = np.flatnonzero(live & (classes == self.PUNCT))
+        name_starts = np.flatnonzero(name_starts)
+        starts = np.concatenate((name_starts, puncts, text_starts))
+        ends = np.concatenate(
+            (np.flatnonzero(name_ends) + 1, puncts + 1, text_ends)
+        )
+        symbol_ids = np.concatenate((
+            np.full(len(name_starts), int(NAME), dtype=np.int64),
+            self._punctuation_ids()[codes[puncts]],
+            np.full(len(text_starts), int(TEXT), dtype=np.int64),
+        ))
+
+        order = np.argsort(starts, kind='mergesort')
+        starts, ends = starts[order], ends[order]
+        symbol_ids = symbol_ids[order]
+        bases = np.array(self._bases, dtype=np.int64)
+        splits = np.searchsorted(starts, bases)
+        # offsets relative to the expression each token is in
+        owners = np.repeat(
+            np.arange(len(bases)), np.diff(np.append(splits, len(starts)))
+        )
+        starts = (starts - bases[owners]).tolist()
+        ends = (ends - bases[owners]).tolist()
+        symbol_ids = symbol_ids.tolist()
+
+        token_buffers = []
+        bounds = splits.tolist() + [len(starts)]
+        for idx, input_ in enumerate(self._inputs):
+            lo, hi = bounds[idx], bounds[idx + 1]
+            token_buffer = TokenBuffer(input_)
+            token_buffer.extend_columns(
+                symbol_ids[lo:hi], starts[lo:hi], ends[lo:hi],
+                _symbols_by_id
+            )
+            if self._emit_sntl:
+                token_buffer.append(SNTL, len(input_), len(input_))
+            token_buffers.append(token_buffer)
+        return token_buffers
+
+    def _classes(self):
+        """
+        Return an array of the character class of each character.
+        """
+        table = np.full(128, self.OTHER, dtype=np.int8)
+        for chars, char_class in (
+                (' ', self.SPACE), (name_chars, self.NAME_CHAR),
+                (name_start_chars, self.NAME_START),
+                (punctuation, self.PUNCT), ('"', self.QUOTE)):
+            table[[ord(c) for c in chars]] = char_class
+
+        codes = self._codes
+        classes = np.full(len(codes), self.OTHER, dtype=np.int8)
+        is_ascii = codes < 128
+        classes[is_ascii] = table[codes[is_ascii]]
+        if is_ascii.all():
+            return classes
+
+        # each distinct non-ASCII character is classified only once
+        others = codes[~is_ascii]
+        distinct = np.unique(others)
+        distinct_classes = np.array([
+            self.NAME_START if char in name_start_charset
+            else self.NAME_CHAR if char in name_charset
+            else self.OTHER
+            for char in (_unichr(code) for code in distinct.tolist())
+        ], dtype=np.int8)
+        classes[~is_ascii] = distinct_classes[
+            np.searchsorted(distinct, others)
+        ]
+        return classes
+
+    def _punctuation_ids(self):
+        """
+        Return an array mapping the code of each punctuation character to
+        the id of its terminal symbol.
+        """
+        table = np.zeros(128, dtype=np.int64)
+        for char, symbol in punctuation_symbols.items():
+            table[ord(char)] = int(symbol)
+        return table
+
+    def _raise_first_error(self, bad_offsets, quote_errors):
+        """
+        Raise |SyntaxError| for the error nearest the start of the joined
+        input, if there is one, which is the first error in the first
+        invalid expression. *bad_offsets* is an array of the offsets of
+        characters that cannot begin a token and *quote_errors* a list of
+        the offsets of unterminated opening quotes.
+        """
+        offsets = quote_errors[:1]
+        if len(bad_offsets):
+            offsets.append(int(bad_offsets[0]))
+        if not offsets:
+            return
+        offset = min(offsets)
+        if offset in quote_errors:
+            raise SyntaxError("unterminated quote")
+        input_ = self._inputs[bisect_right(self._bases, offset) - 1]
+        raise SyntaxError(
+            "at character '%s' in '%s'" % (self._text[offset], input_)
+        )
+
+    def _text_values(self):
+        """
+        Return a (text_starts, text_ends, opaque, quote_errors) 4-tuple,
+        where *text_starts* and *text_ends* are arrays of the offsets of
+        each text value, *opaque* a boolean array marking the characters
+        within text values and their quotes, and *quote_errors* a list of
+        the offsets of unterminated opening quotes.
+
+        A text value begins at a quote, or just after an `=` or `}`, when
+        that character is itself between tokens rather than within another
+        text value. The text value each such trigger character would begin,
+        and the offset lexing resumes at after it, are worked out for every
+        trigger at once. Only then are the triggers actually between tokens
+        found, following the chain from each to the first trigger at or after
+        the offset where lexing resumes.
+        """
+        codes = self._codes
+        quote = ord('"')
+        is_quote = codes == quote
+        triggers = np.flatnonzero(
+            is_quote | (codes == ord('=')) | (codes == ord('}'))
+        )
+        quotes = np.flatnonzero(is_quote)
+        terminators = np.flatnonzero(np.isin(codes, [ord(c) for c in ',}/)']))
+
+        # the end offset of the expression containing each trigger
+        bases = np.array(self._bases, dtype=np.int64)
+        expr_ends = bases + np.array(
+            [len(input_) for input_ in self._inputs], dtype=np.int64
+        )
+        ends = expr_ends[np.searchsorted(bases, triggers, 'right') - 1]
+
+        next_codes = np.append(codes, 0)[triggers + 1]
+        at_end = triggers + 1 == ends
+        is_quote = codes[triggers] == quote
+        opens_quote = is_quote | (~at_end & (next_codes == quote))
+        open_quotes = np.where(is_quote, triggers, triggers + 1)
+        closes = _following(quotes, open_quotes + 1)
+        unterminated = opens_quote & (closes >= ends)
+        is_raw = ~is_quote & ~at_end & ~np.isin(
+            next_codes, [ord(c) for c in ',}/)"']
+        )
+        raw_ends = np.minimum(_following(terminators, triggers + 1), ends)
+
+        has_text = (opens_quote & ~unterminated) | is_raw
+        text_starts = np.where(opens_quote, open_quotes + 1, triggers + 1)
+        text_ends = np.where(opens_quote, closes, raw_ends)
+        opaque_starts = np.where(opens_quote, open_quotes, triggers + 1)
+        resumes = np.where(
+            unterminated, ends,
+            np.where(opens_quote, closes + 1,
+                     np.where(is_raw, raw_ends, triggers + 1))
+        )
+
+        # follow the chain of triggers between tokens, the first always is
+        next_triggers = np.searchsorted(triggers, resumes).tolist()
+        live, idx, count = [], 0, len(triggers)
+        while idx < count:
+            live.append(idx)
+            idx = next_triggers[idx]
+        live = np.array(live, dtype=np.int64)
+
+        opaque_mask = np.zeros(len(triggers), dtype=bool)
+        opaque_mask[live] = True
+        text_mask = opaque_mask & has_text
+        opaque_mask &= opens_quote | is_raw
+
+        # mark each opaque span by the running sum of its boundaries
+        marks = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.add.at(marks, opaque_starts[opaque_mask], 1)
+        np.add.at(marks, resumes[opaque_mask], -1)
+        opaque = np.cumsum(marks[:-1]) > 0
+
+        quote_errors = open_quotes[opaque_mask & unterminated].tolist()
+        return (
+            text_starts[text_mask], text_ends[text_mask], opaque, quote_errors
+        )
+
+
+def _following(offsets, positions):
+    """
+    Return an array of the first of the sorted array *offsets* at or after
+    each of *positions*, or a value past the end of any input where there
+    is none.
+    """
+    sentinel = np.iinfo(np.int64).max
+    padded = np.append(offsets, sentinel)
+    return padded[np.searchsorted(offsets, positions)]
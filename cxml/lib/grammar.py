@@ -9,6 +9,8 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+from collections import namedtuple
+
 
 class _Symbol(int):
     """
@@ -74,11 +76,77 @@ class NonterminalSymbol(_Symbol):
     def __repr__(self):
         return "NonterminalSymbol(%d, '%s')" % (int(self), self._name)
 
+    @property
+    def is_tail(self):
+        return False
+
     @property
     def is_terminal(self):
         return False
 
 
+class TailSymbol(NonterminalSymbol):
+    """
+    A nonterminal introduced by left-factoring a grammar. A tail symbol
+    derives the remainder of the productions sharing a common prefix. It does
+    not produce an AST node of its own; the nodes it derives are spliced into
+    the node of the production it appears in.
+    """
+
+    _next_id = 2001
+
+    def __repr__(self):
+        return "TailSymbol(%d, '%s')" % (int(self), self._name)
+
+    @property
+    def is_tail(self):
+        return True
+
+
+class Reduction(object):
+    """
+    A marker that can appear in the body of a production in a transformed
+    grammar, where it takes the place of a nonterminal whose body was
+    substituted inline. It directs the parser to replace the last *count*
+    child nodes it has matched with a single node for *symbol*, restoring the
+    node the substituted nonterminal would have produced.
+    """
+
+    __slots__ = ('_symbol', '_count')
+
+    def __init__(self, symbol, count):
+        self._symbol = symbol
+        self._count = count
+
+    def __eq__(self, other):
+        if not isinstance(other, Reduction):
+            return False
+        return (self._symbol, self._count) == (other.symbol, other.count)
+
+    def __hash__(self):
+        return hash((self._symbol, self._count))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Reduction(%s, %d)' % (self._symbol.name, self._count)
+
+    @property
+    def count(self):
+        """
+        The number of child nodes reduced to a single node.
+        """
+        return self._count
+
+    @property
+    def symbol(self):
+        """
+        The nonterminal symbol of the node produced by this reduction.
+        """
+        return self._symbol
+
+
 class Production(object):
     """
     A production rule of a grammar, consisting of a head and a body.
@@ -90,6 +158,16 @@ class Production(object):
         self._head = head
         self._body = tuple(body)
 
+    def __repr__(self):
+        """
+        Like "Production(attr -> qname EQUAL TEXT)".
+        """
+        body = ' '.join(
+            repr(s) if isinstance(s, Reduction) else s.name
+            for s in self._body
+        )
+        return 'Production(%s -> %s)' % (self._head.name, body or "''")
+
     @property
     def head(self):
         """
@@ -113,17 +191,39 @@ class Productions(object):
     production rules having a matching key.
     """
 
-    __slots__ = ('_productions',)
+    __slots__ = ('_productions', '_index')
 
     def __init__(self, productions):
         self._productions = tuple(productions)
+        index = {}
+        for p in self._productions:
+            index.setdefault(p.head, []).append(p)
+        self._index = dict((k, tuple(v)) for k, v in index.items())
 
     def __getitem__(self, key):
         """
         Return an iterator that will generate each production with head
         matching *key*, in the order the productions should be matched.
         """
-        return (p for p in self._productions if p.head == key)
+        return iter(self._index.get(key, ()))
+
+    def __iter__(self):
+        return iter(self._productions)
+
+    def __len__(self):
+        return len(self._productions)
+
+    @property
+    def heads(self):
+        """
+        A list of the distinct head symbols of these productions, in the
+        order each first appears.
+        """
+        heads = []
+        for p in self._productions:
+            if p.head not in heads:
+                heads.append(p.head)
+        return heads
 
     @classmethod
     def from_seq(cls, *head_body_pairs):
@@ -136,5 +236,367 @@ class Productions(object):
         )
 
 
+Conflict = namedtuple('Conflict', ('head', 'terminal', 'productions'))
+
+
+class Grammar(object):
+    """
+    A context-free grammar defined by its |Productions|, providing the
+    analysis needed to construct a predictive (LL(1)) parser: the nullable
+    nonterminals and the FIRST and FOLLOW sets of each nonterminal.
+    """
+
+    def __init__(self, productions):
+        if not isinstance(productions, Productions):
+            productions = Productions(productions)
+        self._productions = productions
+        self._nullable = None
+        self._first_sets = None
+        self._follow_sets = None
+
+    def first(self, symbols):
+        """
+        Return a (terminals, nullable) pair for the sequence *symbols*, where
+        *terminals* is the set of terminal symbols that can begin a string
+        derived from *symbols* and *nullable* is |True| if *symbols* can
+        derive the empty string. |Reduction| markers are transparent.
+        """
+        first_sets, nullable = self.first_sets, self.nullable
+        terminals = set()
+        for symbol in symbols:
+            if isinstance(symbol, Reduction):
+                continue
+            if symbol.is_terminal:
+                terminals.add(symbol)
+                return frozenset(terminals), False
+            terminals |= first_sets.get(symbol, frozenset())
+            if symbol not in nullable:
+                return frozenset(terminals), False
+        return frozenset(terminals), True
+
+    @property
+    def first_sets(self):
+        """
+        A dict mapping each nonterminal to the (frozen) set of terminal
+        symbols that can begin a string derived from it.
+        """
+        if self._first_sets is None:
+            nullable = self.nullable
+            first_sets = dict((h, set()) for h in self._productions.heads)
+            changed = True
+            while changed:
+                changed = False
+                for p in self._productions:
+                    first = first_sets[p.head]
+                    size = len(first)
+                    for symbol in p.body:
+                        if isinstance(symbol, Reduction):
+                            continue
+                        if symbol.is_terminal:
+                            first.add(symbol)
+                            break
+                        first |= first_sets.get(symbol, set())
+                        if symbol not in nullable:
+                            break
+                    changed = changed or len(first) != size
+            self._first_sets = dict(
+                (h, frozenset(s)) for h, s in first_sets.items()
+            )
+        return self._first_sets
+
+    @property
+    def follow_sets(self):
+        """
+        A dict mapping each nonterminal to the (frozen) set of terminal
+        symbols that can immediately follow it in some sentential form. No
+        end-of-input marker is added for a start symbol.
+        """
+        if self._follow_sets is None:
+            follow_sets = dict((h, set()) for h in self._productions.heads)
+            changed = True
+            while changed:
+                changed = False
+                for p in self._productions:
+                    body = p.body
+                    for idx, symbol in enumerate(body):
+                        if isinstance(symbol, Reduction):
+                            continue
+                        if symbol.is_terminal:
+                            continue
+                        follow = follow_sets.setdefault(symbol, set())
+                        size = len(follow)
+                        terminals, nullable = self.first(body[idx+1:])
+                        follow |= terminals
+                        if nullable:
+                            follow |= follow_sets[p.head]
+                        changed = changed or len(follow) != size
+            self._follow_sets = dict(
+                (h, frozenset(s)) for h, s in follow_sets.items()
+            )
+        return self._follow_sets
+
+    def left_factored(self, max_passes=16):
+        """
+        Return a new |Grammar| equivalent to this one in which alternative
+        productions of the same head that begin with the same symbols have
+        been left-factored into a common prefix followed by a |TailSymbol|.
+
+        Where alternatives can begin with the same terminal but not with the
+        same symbol, the leading nonterminal of each is first replaced by its
+        bodies, each followed by a |Reduction| that rebuilds the nonterminal's
+        node, and factoring is repeated. A parser for the factored grammar
+        therefore produces the same AST as one for this grammar. Any
+        conflicts remaining after *max_passes* (as with left recursion) are
+        left for :meth:`ll1_table` to report.
+        """
+        originals = dict(
+            (h, [p.body for p in self._productions[h]])
+            for h in self._productions.heads
+        )
+        heads = list(originals)
+        rules = dict((h, list(bodies)) for h, bodies in originals.items())
+
+        for _ in range(max_passes):
+            if self._factor_rules(heads, rules):
+                continue
+            if not self._substitute_rules(heads, rules, originals):
+                break
+
+        return Grammar(
+            Production(h, body) for h in heads for body in rules[h]
+        )
+
+    def ll1_table(self):
+        """
+        Return an |LL1Table| for this grammar, predicting the production to
+        use for each (nonterminal, lookahead terminal) pair.
+        """
+        return LL1Table(self)
+
+    @property
+    def nullable(self):
+        """
+        The (frozen) set of nonterminals that can derive the empty string.
+        """
+        if self._nullable is None:
+            nullable = set()
+            changed = True
+            while changed:
+                changed = False
+                for p in self._productions:
+                    if p.head in nullable:
+                        continue
+                    if all(
+                        isinstance(s, Reduction) or s in nullable
+                        for s in p.body
+                    ):
+                        nullable.add(p.head)
+                        changed = True
+            self._nullable = frozenset(nullable)
+        return self._nullable
+
+    @property
+    def productions(self):
+        """
+        The |Productions| object defining this grammar.
+        """
+        return self._productions
+
+    @staticmethod
+    def _factor_rules(heads, rules):
+        """
+        Left-factor each rule in *rules* in place, appending any new tail
+        symbols to *heads*. Return |True| if any rule was factored.
+        """
+        factored = False
+        names = set(head.name for head in heads)
+        for head in list(heads):
+            groups, keys = {}, []
+            for body in rules[head]:
+                key = body[0] if body else None
+                if key not in groups:
+                    groups[key] = []
+                    keys.append(key)
+                if body not in groups[key]:
+                    groups[key].append(body)
+
+            if all(len(groups[k]) == 1 for k in keys):
+                continue
+
+            factored = True
+            bodies = []
+            for key in keys:
+                members = groups[key]
+                if len(members) == 1:
+                    bodies.append(members[0])
+                    continue
+                prefix_len = _common_prefix_len(members)
+                tail = TailSymbol(_tail_name(head, names))
+                bodies.append(members[0][:prefix_len] + (tail,))
+                rules[tail] = [m[prefix_len:] for m in members]
+                heads.append(tail)
+            rules[head] = bodies
+        return factored
+
+    @staticmethod
+    def _substitute_rules(heads, rules, originals):
+        """
+        Replace the leading nonterminal of each alternative in *rules* that
+        can begin with the same terminal as another alternative of the same
+        head but with a different symbol. Return |True| if any substitution
+        was made.
+        """
+        grammar = Grammar(
+            Production(h, body) for h in heads for body in rules[h]
+        )
+        substituted = False
+        for head in heads:
+            bodies = rules[head]
+            firsts = [grammar.first(body)[0] for body in bodies]
+            new_bodies = []
+            for idx, body in enumerate(bodies):
+                lead_idx = _lead_index(body)
+                lead = body[lead_idx] if lead_idx is not None else None
+                conflicted = any(
+                    firsts[idx] & firsts[other] and
+                    _lead_symbol(bodies[other]) != lead
+                    for other in range(len(bodies)) if other != idx
+                )
+                if lead is None or lead.is_terminal or not conflicted:
+                    new_bodies.append(body)
+                    continue
+                if not lead.is_tail and lead not in originals:
+                    new_bodies.append(body)
+                    continue
+                substituted = True
+                before, after = body[:lead_idx], body[lead_idx+1:]
+                if lead.is_tail:
+                    for sub_body in rules[lead]:
+                        new_bodies.append(before + sub_body + after)
+                    continue
+                for sub_body in originals[lead]:
+                    reduction = Reduction(lead, len(sub_body))
+                    new_bodies.append(before + sub_body + (reduction,) + after)
+            rules[head] = new_bodies
+        return substituted
+
+
+class LL1Table(object):
+    """
+    Predictive parse table for a |Grammar|, mapping each (nonterminal,
+    lookahead terminal) pair to the single production that can derive it.
+    Any pair for which more than one production qualifies is recorded as
+    a |Conflict|, meaning the grammar is not LL(1).
+    """
+
+    def __init__(self, grammar):
+        self._grammar = grammar
+        self._table = {}
+        self._epsilon = {}
+        self._conflicts = []
+        self._build()
+
+    @property
+    def conflicts(self):
+        """
+        A list of |Conflict| named tuples, one for each (head, terminal) pair
+        predicting more than one production. The terminal is |None| for
+        a conflict between two nullable productions.
+        """
+        return list(self._conflicts)
+
+    @property
+    def grammar(self):
+        """
+        The |Grammar| this table was constructed from.
+        """
+        return self._grammar
+
+    def predict(self, head, terminal):
+        """
+        Return the production to expand *head* with when the lookahead token
+        is of class *terminal*. A nullable production of *head* is returned
+        when no other production applies, leaving any syntax error to be
+        detected by a subsequent terminal mismatch. Returns |None| if no
+        production applies.
+        """
+        production = self._table.get((head, terminal))
+        if production is None:
+            production = self._epsilon.get(head)
+        return production
+
+    def _add(self, head, terminal, production):
+        """
+        Enter *production* for (*head*, *terminal*), noting a conflict if
+        another production is already entered there.
+        """
+        table = self._table if terminal is not None else self._epsilon
+        key = (head, terminal) if terminal is not None else head
+        existing = table.get(key)
+        if existing is None:
+            table[key] = production
+        elif existing is not production:
+            self._conflicts.append(
+                Conflict(head, terminal, (existing, production))
+            )
+
+    def _build(self):
+        grammar = self._grammar
+        follow_sets = grammar.follow_sets
+        for p in grammar.productions:
+            terminals, nullable = grammar.first(p.body)
+            for terminal in terminals:
+                self._add(p.head, terminal, p)
+            if nullable:
+                self._add(p.head, None, p)
+                for terminal in follow_sets.get(p.head, ()):
+                    self._add(p.head, terminal, p)
+
+
+def _common_prefix_len(bodies):
+    """
+    Return the length of the longest prefix common to all of *bodies*.
+    """
+    length = 0
+    for symbols in zip(*bodies):
+        if any(s != symbols[0] for s in symbols[1:]):
+            break
+        length += 1
+    return length
+
+
+def _lead_index(body):
+    """
+    Return the index of the first grammar symbol in *body*, skipping any
+    leading |Reduction| markers, or |None| if there is none.
+    """
+    for idx, symbol in enumerate(body):
+        if not isinstance(symbol, Reduction):
+            return idx
+    return None
+
+
+def _lead_symbol(body):
+    """
+    Return the first grammar symbol in *body*, or |None| if there is none.
+    """
+    idx = _lead_index(body)
+    return body[idx] if idx is not None else None
+
+
+def _tail_name(head, names):
+    """
+    Return the name for a new tail symbol factored out of the productions
+    for *head*, like "attr'" or "attr''", the first such name not in
+    *names*, the set of names of the symbols in the grammar. The name
+    returned is added to *names*.
+    """
+    name = "%s'" % head.name
+    while name in names:
+        name += "'"
+    names.add(name)
+    return name
+
+
 # the sentinal token, having bool() value False
 SNTL = TerminalSymbol('SNTL', 0)
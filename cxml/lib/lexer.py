@@ -8,6 +8,13 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+import re
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from mmap import mmap
+
 from .grammar import SNTL
 
 
@@ -27,7 +34,7 @@ class Token(object):
         """
         Like "Token(COMMA, ',')".
         """
-        return "Token(%s, '%s')" % (self._symbol.name, self._lexeme)
+        return "Token(%s, '%s')" % (self._symbol.name, self.lexeme)
 
     @property
     def symbol(self):
@@ -53,6 +60,187 @@ class Token(object):
         return self._lexeme
 
 
+class BufferedToken(Token):
+    """
+    A token held in a |TokenBuffer|, whose lexeme is sliced from the input
+    the first time it is asked for.
+    """
+
+    __slots__ = ('_buffer', '_idx')
+
+    def __init__(self, buffer_, idx):
+        self._symbol = buffer_.symbol_at(idx)
+        self._lexeme = None
+        self._buffer = buffer_
+        self._idx = idx
+
+    @property
+    def lexeme(self):
+        """
+        String value (lexeme) of this token.
+        """
+        lexeme = self._lexeme
+        if lexeme is None:
+            lexeme = self._lexeme = self._buffer.lexeme_at(self._idx)
+        return lexeme
+
+    value = lexeme
+
+
+class ByteToken(Token):
+    """
+    A token recognized in binary input, holding a memoryview of the input
+    and the offsets of its lexeme there. The lexeme is only decoded, as
+    UTF-8, the first time it is asked for.
+    """
+
+    __slots__ = ('_view', '_start', '_end')
+
+    def __init__(self, symbol, view, start, end):
+        self._symbol = symbol
+        self._lexeme = None
+        self._view = view
+        self._start = start
+        self._end = end
+
+    @property
+    def lexeme(self):
+        """
+        String value (lexeme) of this token.
+        """
+        lexeme = self._lexeme
+        if lexeme is None:
+            lexeme = self._lexeme = _decode(self._view, self._start, self._end)
+        return lexeme
+
+    value = lexeme
+
+
+class TokenBuffer(object):
+    """
+    Compact sequence of the tokens in *input*, holding the symbol id, start
+    offset, and end offset of each token in parallel integer arrays rather
+    than as a |Token| object and lexeme string. A |Token| object is only
+    created when the token is accessed by index, and its lexeme is only
+    sliced from *input* when asked for.
+
+    *input* may also be binary, a `bytes`, `bytearray`, or `mmap` object
+    holding UTF-8, in which case the offsets are byte offsets and a lexeme
+    is decoded from a memoryview of the input when asked for.
+    """
+
+    __slots__ = (
+        '_input', '_view', '_symbol_ids', '_starts', '_ends', '_symbols'
+    )
+
+    def __init__(self, input):
+        self._input = input
+        self._view = memoryview(input) if _is_binary(input) else None
+        self._symbol_ids = array(str('i'))
+        self._starts = array(str('i'))
+        self._ends = array(str('i'))
+        self._symbols = {}  # symbol id -> terminal symbol
+
+    def __getitem__(self, idx):
+        """
+        Return a |Token| object for the token at *idx*, or a list of them
+        when *idx* is a slice.
+        """
+        if isinstance(idx, slice):
+            return [
+                BufferedToken(self, i) for i in range(*idx.indices(len(self)))
+            ]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('token index out of range')
+        return BufferedToken(self, idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield BufferedToken(self, idx)
+
+    def __len__(self):
+        return len(self._symbol_ids)
+
+    def append(self, symbol, start, end):
+        """
+        Add a token of token class *symbol* spanning *input[start:end]*.
+        """
+        symbol_id = int(symbol)
+        if symbol_id not in self._symbols:
+            self._symbols[symbol_id] = symbol
+        self._symbol_ids.append(symbol_id)
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def extend(self, spans):
+        """
+        Add a token for each (symbol, (start, end)) pair in *spans*, as for
+        :meth:`append`.
+        """
+        symbols = self._symbols
+        append_symbol_id = self._symbol_ids.append
+        append_start = self._starts.append
+        append_end = self._ends.append
+        for symbol, (start, end) in spans:
+            # a terminal symbol is an int, hashing and comparing as its id
+            if symbol not in symbols:
+                symbols[int(symbol)] = symbol
+            append_symbol_id(symbol)
+            append_start(start)
+            append_end(end)
+
+    def extend_columns(self, symbol_ids, starts, ends, symbols):
+        """
+        Add a token for each of the parallel sequences of integers
+        *symbol_ids*, *starts*, and *ends*, as produced by a lexer working
+        on whole columns at once. *symbols* maps each id in *symbol_ids* to
+        its terminal symbol.
+        """
+        for symbol_id in set(symbol_ids):
+            self._symbols[symbol_id] = symbols[symbol_id]
+        self._symbol_ids.fromlist(list(symbol_ids))
+        self._starts.fromlist(list(starts))
+        self._ends.fromlist(list(ends))
+
+    @property
+    def input(self):
+        """
+        The input string the tokens were recognized in.
+        """
+        return self._input
+
+    def lexeme_at(self, idx):
+        """
+        Return the lexeme of the token at *idx*, sliced from the input.
+        """
+        if self._view is not None:
+            return _decode(self._view, self._starts[idx], self._ends[idx])
+        return self._input[self._starts[idx]:self._ends[idx]]
+
+    def span_at(self, idx):
+        """
+        Return the (start, end) offsets of the token at *idx* in the input.
+        """
+        return self._starts[idx], self._ends[idx]
+
+    @property
+    def symbol_ids(self):
+        """
+        The array of the symbol id of each token, for comparing token
+        classes without creating a |Token| object.
+        """
+        return self._symbol_ids
+
+    def symbol_at(self, idx):
+        """
+        Return the terminal symbol (token class) of the token at *idx*
+        without creating a |Token| object.
+        """
+        return self._symbols[self._symbol_ids[idx]]
+
+
 class Lexer(object):
     """
     Lexer base class. A lexical specification is implemented as a set of
@@ -62,51 +250,80 @@ class Lexer(object):
     another method on construction. Whatever the start state method is named,
     it must be implemented in the subclass; there is no default
     implementation.
+
+    Each state method returns the next state method, or |None| at end of
+    input. The tokens it emits are generated as soon as it returns, so
+    a consumer pulling tokens one at a time drives the lexer only as far as
+    it needs to, and an error in the input is raised when the lexer reaches
+    it rather than before the first token is produced.
+
+    The input may be binary, a `bytes`, `bytearray`, or `mmap` object
+    holding UTF-8, rather than a text string. It is then read through
+    a memoryview, without being copied, offsets are byte offsets, and each
+    input character a state method sees stands for a single byte, being the
+    character of the same ordinal. Each token holds the offsets of its
+    lexeme rather than a string, decoded only when the lexeme is used.
     """
+
+    # input characters either side of an error shown in its message
+    excerpt_size = 40
+
     def __init__(self, input, start_state='_lex_start', emit_sntl=True):
         self._input = input
+        if _is_binary(input):
+            self._view = memoryview(input)
+            self._chars = _ByteChars(self._view)
+        else:
+            self._view = None
+            self._chars = input
         self._start = 0
         self._pos = 0
         self._start_state = getattr(self, start_state)
         self._emit_sntl = emit_sntl
         self._tokens = []
+        self._emit_spans = False
 
     def __iter__(self):
         """
         Generate each of the tokens in input.
         """
-        # reset to start state so lexer instance is reusable
-        self._start = self._pos = 0
-        self.state = self._start_state
+        return self._lex(emit_spans=False)
 
-        return iter(self._next_token, None)
-
-    def _next_token(self):
+    def iter_spans(self):
         """
-        Suitable for use in an `iter(_next_token, None)` function call,
-        returns the next token if one is available, otherwise passes control
-        to the next state function. Calling `lexer.emit()` in the state
-        method adds a token to the queue, which then makes its way back to
-        the caller once the state function returns. The iterator constructed
-        this way terminates when last token is returned and the next state is
-        |None|, indicating EOF.
+        Generate a (symbol, (start, end)) pair for each of the tokens in
+        input, where *start* and *end* are the offsets of its lexeme, without
+        creating a |Token| object or slicing its lexeme.
         """
-        if self._token_in_queue:
-            return self._pop_token()
+        return self._lex(emit_spans=True)
 
-        while self.state is not None:
-            self.state = self.state()
-            if self._token_in_queue:
-                return self._pop_token()
+    def token_buffer(self):
+        """
+        Return a |TokenBuffer| object containing the tokens in input. No
+        |Token| object is created while lexing into the buffer.
+        """
+        token_buffer = TokenBuffer(self._input)
+        token_buffer.extend(self.iter_spans())
+        return token_buffer
 
-        if self._start != self._pos or self._pos < self._len:
-            raise ValueError('not all input consumed')
+    def _accept_char(self):
+        """
+        Accept the whole input character at pos, :attr:`_peek_char`, into
+        the current lexeme.
+        """
+        if self._view is None:
+            self._pos += 1
+        else:
+            self._pos += len(self._peek_char.encode('utf-8'))
 
     def _accept_run(self, charset):
         """
         Accept characters from the input string into the current lexeme while
         the character is in *charset*.
         """
+        if isinstance(charset, type('')):
+            self._pos = self._run_end(charset, False)
+            return
         while True:
             c = self._next()
             if c is None or c not in charset:
@@ -118,6 +335,9 @@ class Lexer(object):
         Position pos after the last input character that is NOT a member of
         *charset*, stopping at EOF if encountered.
         """
+        if isinstance(charset, type('')):
+            self._pos = self._run_end(charset, True)
+            return
         while True:
             c = self._next()
             if c is None or c in charset:
@@ -132,12 +352,22 @@ class Lexer(object):
 
     def _emit(self, token_type):
         """
-        Add a token of *token_type* to the queue containing the current
-        lexeme and reset the lexeme cursors to the next input character.
+        Add a token of *token_type* containing the current lexeme to those
+        to be generated when the current state method returns, and reset the
+        lexeme cursors to the next input character. Only the span of the
+        lexeme is recorded when generating spans. A `SNTL` token is dropped
+        unless *emit_sntl* is |True|.
         """
-        lexeme = self._input[self._start:self._pos]
-        self._start = self._pos
-        self._tokens.append(Token(token_type, lexeme))
+        start, pos = self._start, self._pos
+        self._start = pos
+        if token_type is SNTL and not self._emit_sntl:
+            return
+        if self._emit_spans:
+            self._tokens.append((token_type, (start, pos)))
+        elif self._view is not None:
+            self._tokens.append(ByteToken(token_type, self._view, start, pos))
+        else:
+            self._tokens.append(Token(token_type, self._input[start:pos]))
 
     def _ignore(self):
         """
@@ -145,6 +375,27 @@ class Lexer(object):
         """
         self._start = self._pos
 
+    def _lex(self, emit_spans):
+        """
+        Generate the tokens, or spans when *emit_spans* is |True|, emitted by
+        each successive state method, starting from the start state, as soon
+        as that method returns.
+        """
+        # reset to start state so lexer instance is reusable
+        self._start = self._pos = 0
+        self._emit_spans = emit_spans
+        tokens = self._tokens = []
+        state = self._start_state
+        while state is not None:
+            state = state()
+            if tokens:
+                for token in tokens:
+                    yield token
+                del tokens[:]
+
+        if self._start != self._pos or self._pos < self._len:
+            raise ValueError('not all input consumed')
+
     @property
     def _len(self):
         """
@@ -173,7 +424,7 @@ class Lexer(object):
         Return |None| if at EOF, but advance pos in any case, such that
         _backup() works consistently at EOF.
         """
-        next_char = self._input[self._pos] if self._pos < self._len else None
+        next_char = self._chars[self._pos] if self._pos < self._len else None
         self._pos += 1
         return next_char
 
@@ -184,13 +435,56 @@ class Lexer(object):
         """
         if self._pos >= len(self._input):
             return None
-        return self._input[self._pos]
+        return self._chars[self._pos]
 
-    def _pop_token(self):
+    @property
+    def _peek_char(self):
         """
-        Remove the first token in the queue and return it.
+        The whole input character at pos, the same as :attr:`_peek` but for
+        a non-ASCII character of binary input, which is decoded from the
+        several bytes encoding it. Raises |SyntaxError| on bytes that are
+        not valid UTF-8.
         """
-        return self._tokens.pop(0)
+        peek = self._peek
+        if self._view is None or peek is None or peek < '\x80':
+            return peek
+        lead, pos = ord(peek), self._pos
+        size = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        return _decode(self._view, pos, pos + size)[:1]
+
+    def _syntax_error(self, message):
+        """
+        Return a |SyntaxError| for the error at pos described by *message*,
+        e.g. `"at character '!'"`, followed by up to :attr:`excerpt_size`
+        input characters either side of pos. For binary input the byte
+        offset of pos is given as well.
+        """
+        if self._view is None:
+            return _syntax_error(
+                self._input, self._pos, message, self.excerpt_size
+            )
+        return _binary_syntax_error(
+            self._view, self._pos, message, self.excerpt_size
+        )
+
+    def _run_end(self, chars, negated):
+        """
+        Return the offset of the first input character from pos that is not
+        in *chars* or, when *negated* is |True|, that is in *chars*, or the
+        length of the input when there is none. The run is matched with
+        a regular expression, in a single step however long it is.
+        """
+        binary = self._view is not None
+        key = (chars, negated, binary)
+        pattern = _run_patterns.get(key)
+        if pattern is None:
+            char_class = '[%s%s]*' % (
+                '^' if negated else '', ''.join(re.escape(c) for c in chars)
+            )
+            if binary:
+                char_class = char_class.encode('latin-1')
+            pattern = _run_patterns[key] = re.compile(char_class, re.DOTALL)
+        return pattern.match(self._input, self._pos).end()
 
     def _skip(self, n=1):
         """
@@ -203,18 +497,758 @@ class Lexer(object):
             raise ValueError('cannot skip past EOF')
         self._start = self._pos = self._start + n
 
+
+# the compiled pattern matching a run of characters in or not in a set, by
+# (chars, negated, binary)
+_run_patterns = {}
+
+
+class _ByteChars(object):
+    """
+    Sequence of the characters standing for the bytes in *view*, a
+    memoryview of binary input, one character for each byte.
+    """
+
+    __slots__ = ('_view',)
+
+    def __init__(self, view):
+        self._view = view
+
+    def __getitem__(self, idx):
+        code = self._view[idx]
+        return _byte_chars[code if isinstance(code, int) else ord(code)]
+
+    def __len__(self):
+        return len(self._view)
+
+
+def _binary_syntax_error(view, pos, message, size=40):
+    """
+    Return a |SyntaxError| like that of :func:`_syntax_error` for the error
+    at byte offset *pos* in *view*, a memoryview of UTF-8 bytes. The offset
+    is given in the message as well, and the bytes shown are decoded with
+    any that are not valid UTF-8 replaced.
+    """
+    length = len(view)
+    start, end = max(pos - size, 0), min(pos + size + 1, length)
+    chars = _ByteChars(view)
+    # don't cut a character encoded in several bytes in two
+    while start < pos and '\x80' <= chars[start] < '\xc0':
+        start += 1
+    while pos < end < length and '\x80' <= chars[end] < '\xc0':
+        end -= 1
+    excerpt = view[start:end].tobytes().decode('utf-8', 'replace')
+    return SyntaxError("%s (byte %d) in '%s%s%s'" % (
+        message, pos, '...' if start else '', excerpt,
+        '...' if end < length else '',
+    ))
+
+
+def _decode(view, start, end):
+    """
+    Return the text decoded from the UTF-8 bytes from *start* up to *end*
+    in *view*. Raises |SyntaxError| on bytes that are not valid UTF-8.
+    """
+    try:
+        return view[start:end].tobytes().decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise _binary_syntax_error(view, start + e.start, 'invalid UTF-8')
+
+
+def _is_binary(input):
+    """
+    Return |True| if *input* is binary rather than a text string.
+    """
+    return isinstance(input, (bytearray, mmap)) or (
+        isinstance(input, bytes) and not isinstance(input, type(''))
+    )
+
+
+class CharSet(object):
+    """
+    A set of characters for use in a |LexerSpec| pattern, containing the
+    characters in *chars* or, when *negated* is |True|, every character
+    except those. The characters in *ranges*, a sequence of (first, last)
+    pairs of code points, are named as well, allowing a set such as that of
+    the letters of every script without listing each character.
+    """
+
+    __slots__ = ('_chars', '_negated', '_ranges', '_firsts')
+
+    def __init__(self, chars, negated=False, ranges=()):
+        self._chars = frozenset(chars)
+        self._negated = negated
+        self._ranges = tuple(sorted(ranges))
+        self._firsts = [first for first, _ in self._ranges]
+
+    def __contains__(self, char):
+        named = char in self._chars or self.in_ranges(ord(char))
+        return named is not self._negated
+
+    @property
+    def chars(self):
+        """
+        The characters named by this set, those it contains or, when it is
+        negated, those it excludes.
+        """
+        return self._chars
+
+    @property
+    def negated(self):
+        """
+        |True| if this set contains every character not in :attr:`chars`.
+        """
+        return self._negated
+
+    @property
+    def ranges(self):
+        """
+        The sorted (first, last) code point pairs of the ranges of
+        characters named by this set.
+        """
+        return self._ranges
+
+    def in_ranges(self, code):
+        """
+        |True| if the character having code point *code* is in one of the
+        ranges named by this set.
+        """
+        idx = bisect_right(self._firsts, code) - 1
+        return idx >= 0 and code <= self._ranges[idx][1]
+
+
+LexRule = namedtuple(
+    'LexRule', ('pattern', 'symbol', 'next_mode', 'trim', 'error')
+)
+
+DfaTable = namedtuple('DfaTable', ('rows', 'rules', 'fallback'))
+
+LexerTables = namedtuple(
+    'LexerTables', ('class_map', 'modes', 'start_mode')
+)
+
+# the tokens of an edited input from index *start* up to *new_stop* replace
+# those of the original input from *start* up to *old_stop*; the tokens
+# before and after are the same in both
+TokenEdit = namedtuple('TokenEdit', ('start', 'old_stop', 'new_stop'))
+
+
+class LexerSpec(object):
+    """
+    Declarative lexical specification, compiled into a transition table for
+    each lexer mode by :meth:`compile` and used by |DfaLexer|.
+
+    A mode is a set of rules tried together at each position in the input.
+    Each rule is a pattern, a sequence of |CharSet| objects each optionally
+    quantified, that recognizes a token of its *symbol*, and the mode the
+    lexer is in once it has matched. As with a regular expression
+    alternation, the rule matching the longest lexeme is chosen, and the
+    first such rule in the order they were added when several do.
+    """
+
+    _quantifiers = ('', '?', '*', '+')
+
+    def __init__(self, start_mode='start'):
+        self._start_mode = start_mode
+        self._rules = {}  # mode name -> list of LexRule
+        self._fallbacks = {}
+        self._tables = None
+
+    def compile(self):
+        """
+        Return a |LexerTables| object for this specification, computed once
+        and then cached. Raises |ValueError| if the specification refers to a
+        mode it does not define or has a rule that matches an empty lexeme.
+        """
+        if self._tables is None:
+            self._tables = self._compile()
+        return self._tables
+
+    def mode(self, name, fallback=None):
+        """
+        Define mode *name*. When no rule of the mode matches, including at
+        the end of input, the lexer continues in mode *fallback* without
+        consuming any input. Without a fallback that is the end of input or
+        a syntax error.
+        """
+        self._rules.setdefault(name, [])
+        self._fallbacks[name] = fallback
+        self._tables = None
+
+    @property
+    def modes(self):
+        """
+        Sorted list of the names of the modes in this specification.
+        """
+        return sorted(self._rules)
+
+    def rule(self, mode, pattern, symbol=None, next_mode=None, trim=0,
+             error=None):
+        """
+        Add a rule to *mode* recognizing *pattern*, a sequence each item of
+        which is a |CharSet| object matching a single character or a
+        (|CharSet|, quantifier) pair, where quantifier is one of `'?'`,
+        `'*'`, or `'+'`.
+
+        A match is a token of *symbol* having the matched characters as its
+        lexeme, less *trim* characters at each end, or is discarded when
+        *symbol* is |None|. When *error* is not |None| a match instead
+        raises |SyntaxError| with *error* as its message. The lexer is in
+        *next_mode* after the match, or stays in *mode* when that is
+        |None|.
+        """
+        items = []
+        for item in pattern:
+            charset, quantifier = (
+                (item, '') if isinstance(item, CharSet) else item
+            )
+            if quantifier not in self._quantifiers:
+                raise ValueError("invalid quantifier '%s'" % quantifier)
+            items.append((charset, quantifier))
+        if mode not in self._rules:
+            self.mode(mode)
+        self._rules[mode].append(
+            LexRule(tuple(items), symbol, next_mode, trim, error)
+        )
+        self._tables = None
+
+    def _char_classes(self):
+        """
+        Return a (class_map, charset_classes) pair partitioning the
+        characters into classes that no pattern distinguishes between.
+        *class_map* maps the code point of a character to its class, a
+        one-character string; characters named by no pattern are in class
+        `'\\x00'`. *charset_classes* maps each |CharSet| to the set of
+        classes it contains.
+        """
+        charsets = []
+        for rules in self._rules.values():
+            for rule in rules:
+                for charset, _ in rule.pattern:
+                    if charset not in charsets:
+                        charsets.append(charset)
+
+        # characters with the same membership in each charset are a class
+        other = tuple(charset.negated for charset in charsets)
+        signatures = {other: _unichr(0)}
+
+        # the characters not named individually fall in intervals of code
+        # points bounded by the ends of the ranges, each all in one class
+        bounds = set([0])
+        for charset in charsets:
+            for first, last in charset.ranges:
+                bounds.update((first, last + 1))
+        bounds = sorted(bounds)
+        bound_classes = []
+        for code in bounds:
+            signature = tuple(
+                charset.in_ranges(code) is not charset.negated
+                for charset in charsets
+            )
+            if signature not in signatures:
+                signatures[signature] = _unichr(len(signatures))
+            bound_classes.append(signatures[signature])
+
+        # ASCII characters are all mapped up front, others when first met
+        class_map = _ClassMap(bounds, bound_classes)
+        class_map.update((code, class_map[code]) for code in range(128))
+        for char in sorted(set().union(*[cs.chars for cs in charsets])):
+            signature = tuple(char in charset for charset in charsets)
+            if signature not in signatures:
+                signatures[signature] = _unichr(len(signatures))
+            class_map[ord(char)] = signatures[signature]
+
+        charset_classes = dict(
+            (charset, set(
+                cls for signature, cls in signatures.items()
+                if signature[idx]
+            ))
+            for idx, charset in enumerate(charsets)
+        )
+        return class_map, charset_classes
+
+    def _compile(self):
+        """
+        Return a newly computed |LexerTables| object for this specification.
+        """
+        modes = self._rules
+        if self._start_mode not in modes:
+            raise ValueError("start mode '%s' not defined" % self._start_mode)
+        for mode, rules in modes.items():
+            targets = [self._fallbacks.get(mode)]
+            targets.extend(rule.next_mode for rule in rules)
+            for target in targets:
+                if target is not None and target not in modes:
+                    raise ValueError(
+                        "mode '%s' refers to undefined mode '%s'"
+                        % (mode, target)
+                    )
+
+        for mode in modes:
+            seen = set()
+            while mode is not None:
+                if mode in seen:
+                    raise ValueError(
+                        "fallback of mode '%s' leads back to it" % mode
+                    )
+                seen.add(mode)
+                mode = self._fallbacks.get(mode)
+
+        class_map, charset_classes = self._char_classes()
+        tables = dict(
+            (mode, _DfaCompiler(rules, charset_classes).compile(
+                mode, self._fallbacks.get(mode)
+            ))
+            for mode, rules in modes.items()
+        )
+        return LexerTables(class_map, tables, self._start_mode)
+
+
+class _DfaCompiler(object):
+    """
+    Compiles the rules of a lexer mode into a |DfaTable| object, building a
+    nondeterministic automaton (NFA) for the rules and converting it to a
+    deterministic one (DFA) by subset construction. Transitions are on
+    character classes rather than characters.
+    """
+
+    def __init__(self, rules, charset_classes):
+        self._rules = rules
+        self._charset_classes = charset_classes
+        # NFA state i has moves[i] (class set, target) pairs and epsilon
+        # transitions to each state in epsilons[i]
+        self._moves, self._epsilons, self._accepts = [], [], {}
+
+    def compile(self, mode, fallback):
+        """
+        Return the |DfaTable| object for the rules, where *mode* names the
+        mode they belong to and *fallback* is its fallback mode.
+        """
+        start = self._new_state()
+        for rule_idx, rule in enumerate(self._rules):
+            self._epsilons[start].append(self._add_rule(rule_idx, rule))
+
+        # subset construction; DFA state 0 is the start state
+        start_set = self._closure([start])
+        if self._accepting_rule(start_set) is not None:
+            raise ValueError(
+                "a rule in mode '%s' matches an empty lexeme" % mode
+            )
+        dfa_states, rows, rules = {start_set: 0}, [], []
+        pending = [start_set]
+        while pending:
+            nfa_set = pending.pop(0)
+            row = {}
+            for cls, targets in sorted(self._transitions(nfa_set).items()):
+                target_set = self._closure(targets)
+                if target_set not in dfa_states:
+                    dfa_states[target_set] = len(dfa_states)
+                    pending.append(target_set)
+                row[cls] = dfa_states[target_set]
+            rows.append(row)
+            rule_idx = self._accepting_rule(nfa_set)
+            rules.append(None if rule_idx is None else self._rules[rule_idx])
+        return DfaTable(rows, rules, fallback)
+
+    def _accepting_rule(self, nfa_set):
+        """
+        Return the index of the first rule accepted by a state in *nfa_set*,
+        or |None| if no state in it is an accepting state.
+        """
+        rule_idxs = [self._accepts[s] for s in nfa_set if s in self._accepts]
+        return min(rule_idxs) if rule_idxs else None
+
+    def _add_rule(self, rule_idx, rule):
+        """
+        Add the states recognizing the pattern of *rule* to the NFA and
+        return its start state. Each repetition loops on a state of its own,
+        so the states of a pattern form a chain.
+        """
+        start = state = self._new_state()
+        for charset, quantifier in rule.pattern:
+            classes = self._charset_classes[charset]
+            next_state = self._new_state()
+            if quantifier in ('', '?', '+'):
+                self._moves[state].append((classes, next_state))
+            if quantifier in ('?', '*'):
+                self._epsilons[state].append(next_state)
+            if quantifier in ('*', '+'):
+                self._moves[next_state].append((classes, next_state))
+            state = next_state
+        self._accepts[state] = rule_idx
+        return start
+
+    def _closure(self, states):
+        """
+        Return a frozenset of *states* and each NFA state reachable from one
+        of them by epsilon transitions alone.
+        """
+        closure, stack = set(states), list(states)
+        while stack:
+            for target in self._epsilons[stack.pop()]:
+                if target not in closure:
+                    closure.add(target)
+                    stack.append(target)
+        return frozenset(closure)
+
+    def _new_state(self):
+        """
+        Return the number of a newly added NFA state.
+        """
+        self._moves.append([])
+        self._epsilons.append([])
+        return len(self._moves) - 1
+
+    def _transitions(self, nfa_set):
+        """
+        Return a dict mapping each character class to the set of NFA states
+        reached from *nfa_set* on a character of that class.
+        """
+        transitions = {}
+        for state in nfa_set:
+            for classes, target in self._moves[state]:
+                for cls in classes:
+                    transitions.setdefault(cls, set()).add(target)
+        return transitions
+
+
+class _ClassMap(dict):
+    """
+    Code point to character class mapping for `unicode.translate()`. The
+    class of a character not in the mapping is that of the interval of code
+    points it falls in, where *bounds* is the sorted list of the first code
+    point of each interval, starting at zero, and *bound_classes* the class
+    of each. It is added to the mapping once looked up, so each distinct
+    character is only placed in its interval once.
+    """
+
+    def __init__(self, bounds, bound_classes):
+        super(_ClassMap, self).__init__()
+        self._bounds = bounds
+        self._bound_classes = bound_classes
+
+    def __missing__(self, key):
+        cls = self._bound_classes[bisect_right(self._bounds, key) - 1]
+        self[key] = cls
+        return cls
+
+
+class DfaLexer(object):
+    """
+    Lexer driven by the transition tables compiled from a |LexerSpec|,
+    provided by a subclass as its :attr:`spec` class attribute.
+
+    The input is first translated to a string of character classes in a
+    single call. Each token is then recognized by following the transition
+    table of the current mode, one dict lookup per character, and taking the
+    longest match.
+    """
+
+    spec = None
+
+    def __init__(self, input, emit_sntl=True):
+        self._input = input
+        self._emit_sntl = emit_sntl
+
+    def __iter__(self):
+        """
+        Generate each of the tokens in input.
+        """
+        input_ = self._input
+        for symbol, (start, end) in self.iter_spans():
+            yield Token(symbol, input_[start:end])
+
+    @property
+    def emit_sntl(self):
+        """
+        |True| if a `SNTL` token is generated at the end of input.
+        """
+        return self._emit_sntl
+
     @property
-    def _token_in_queue(self):
+    def input(self):
+        """
+        The input string this lexer recognizes tokens in.
+        """
+        return self._input
+
+    def iter_spans(self):
         """
-        |True| if there is an emittable token in the token queue. If the top
-        token is `SNTL` and *emit_sntl* is |False|, that token is popped from
-        the queue and discarded.
+        Generate a (symbol, (start, end)) pair for each of the tokens in
+        input, where *start* and *end* are the offsets of its lexeme, without
+        creating a |Token| object or slicing its lexeme.
         """
-        while self._tokens:
-            token = self._tokens[0]
-            if token.symbol is SNTL and self._emit_sntl is False:
-                # discard SNTL token
-                self._pop_token()
+        input_ = self._input
+        for symbol, start, end, _, _, _ in self._scan(input_, 0, None, 0):
+            yield symbol, (start, end)
+        if self._emit_sntl:
+            end = len(input_)
+            yield SNTL, (end, end)
+
+    @classmethod
+    def relex(cls, token_buffer, offset, deleted, inserted):
+        """
+        Return a |DfaTokenBuffer| object for the input of *token_buffer*, as
+        returned by :meth:`token_buffer`, with the *deleted* characters at
+        *offset* replaced by the string *inserted*.
+
+        Only the tokens affected by the edit are lexed again. Lexing resumes
+        after the last token the lexer recognized without looking as far as
+        *offset*, in the mode it was in there. Once it reaches a token
+        boundary past the edit that was also a boundary in the old input,
+        with the lexer in the same mode, the remaining old tokens are reused
+        with their offsets shifted by the change in length. The tokens that
+        were not reused are described by the :attr:`DfaTokenBuffer.edit` of
+        the new buffer.
+        """
+        old_input = token_buffer.input
+        input_ = old_input[:offset] + inserted + old_input[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+
+        new_buffer = DfaTokenBuffer(input_, token_buffer.emit_sntl)
+        keep = token_buffer.unaffected_count(offset)
+        new_buffer.extend_from(token_buffer, 0, keep, 0)
+        pos, mode_id, reach = token_buffer.resume_state(keep)
+
+        records, old_stop = [], token_buffer.lexed_count
+        for record in cls._scan(input_, pos, mode_id, reach):
+            records.append(record)
+            resume_offset, resume_mode = record[3], record[4]
+            if resume_offset < edit_end:
                 continue
-            return True
-        return False
+            idx = token_buffer.resync_index(resume_offset - delta, resume_mode)
+            if idx is not None:
+                old_stop = idx
+                break
+        new_buffer.extend_lexed(records)
+        new_buffer.extend_from(
+            token_buffer, old_stop, token_buffer.lexed_count, delta
+        )
+        new_buffer.edit = TokenEdit(keep, old_stop, keep + len(records))
+
+        if new_buffer.emit_sntl:
+            end = len(input_)
+            new_buffer.append(SNTL, end, end)
+        return new_buffer
+
+    def token_buffer(self):
+        """
+        Return a |DfaTokenBuffer| object containing the tokens in input,
+        which can be passed to :meth:`relex` when the input is edited. No
+        |Token| object is created while lexing into the buffer.
+        """
+        input_ = self._input
+        token_buffer = DfaTokenBuffer(input_, self._emit_sntl)
+        token_buffer.extend_lexed(self._scan(input_, 0, None, 0))
+        if self._emit_sntl:
+            end = len(input_)
+            token_buffer.append(SNTL, end, end)
+        return token_buffer
+
+    @classmethod
+    def _scan(cls, input_, pos, mode_id, reach):
+        """
+        Generate a (symbol, start, end, resume_offset, resume_mode, reach)
+        6-tuple for each of the tokens in *input_* from offset *pos*,
+        starting in the mode having *mode_id*, or the start mode when that
+        is |None|. *resume_offset* and *resume_mode* are the offset and mode
+        id at which lexing continues after the token. *reach* is one more
+        than the greatest offset the lexer has looked at so far, counting
+        the end of input as a position, and starts from the *reach* passed
+        in.
+        """
+        tables = cls.spec.compile()
+        modes = tables.modes
+        mode_names = sorted(modes)
+        mode_ids = dict((name, idx) for idx, name in enumerate(mode_names))
+        mode = tables.start_mode if mode_id is None else mode_names[mode_id]
+        table = modes[mode]
+        rows, rules = table.rows, table.rules
+        classes = input_.translate(tables.class_map)
+        end = len(input_)
+
+        while True:
+            # follow transitions for the longest match starting at pos
+            state, idx, rule, match_end = 0, pos, None, pos
+            while idx < end:
+                state = rows[state].get(classes[idx])
+                if state is None:
+                    break
+                idx += 1
+                if rules[state] is not None:
+                    rule, match_end = rules[state], idx
+            if idx >= reach:
+                reach = idx + 1
+
+            if rule is None:
+                if table.fallback is not None:
+                    mode = table.fallback
+                    table = modes[mode]
+                    rows, rules = table.rows, table.rules
+                    continue
+                if pos == end:
+                    break
+                raise SyntaxError(
+                    "at character '%s' in '%s'" % (input_[pos], input_)
+                )
+
+            if rule.error is not None:
+                raise SyntaxError(rule.error)
+            if rule.next_mode is not None:
+                mode = rule.next_mode
+                table = modes[mode]
+                rows, rules = table.rows, table.rules
+            if rule.symbol is not None:
+                trim = rule.trim
+                yield (
+                    rule.symbol, pos + trim, match_end - trim, match_end,
+                    mode_ids[mode], reach
+                )
+            pos = match_end
+
+
+class DfaTokenBuffer(TokenBuffer):
+    """
+    |TokenBuffer| produced by a |DfaLexer|, also recording the state of the
+    lexer after each token it recognized: the offset and mode at which
+    lexing continues, and how far into the input the lexer had looked. This
+    allows lexing to resume at a token boundary when the input is edited.
+    The `SNTL` token, when *emit_sntl* is |True|, has no such state.
+
+    When the buffer was produced by :meth:`DfaLexer.relex`, its
+    :attr:`edit` is a |TokenEdit| object locating the tokens that differ
+    from those of the buffer it was produced from. It is |None| otherwise.
+    """
+
+    __slots__ = (
+        'edit', '_emit_sntl', '_resume_offsets', '_resume_modes', '_reaches'
+    )
+
+    def __init__(self, input, emit_sntl=True):
+        super(DfaTokenBuffer, self).__init__(input)
+        self.edit = None
+        self._emit_sntl = emit_sntl
+        self._resume_offsets = array(str('i'))
+        self._resume_modes = array(str('i'))
+        self._reaches = array(str('i'))
+
+    @property
+    def emit_sntl(self):
+        """
+        |True| if the last token in this buffer is the `SNTL` token.
+        """
+        return self._emit_sntl
+
+    def extend_from(self, other, start, stop, delta):
+        """
+        Add the tokens of |DfaTokenBuffer| *other* from index *start* up to
+        *stop*, shifting each offset by *delta*.
+        """
+        def shifted(column):
+            if not delta:
+                return column[start:stop]
+            return array(str('i'), map(delta.__add__, column[start:stop]))
+
+        for symbol_id in set(other._symbol_ids[start:stop]):
+            self._symbols[symbol_id] = other._symbols[symbol_id]
+        self._symbol_ids.extend(other._symbol_ids[start:stop])
+        self._starts.extend(shifted(other._starts))
+        self._ends.extend(shifted(other._ends))
+        self._resume_offsets.extend(shifted(other._resume_offsets))
+        self._resume_modes.extend(other._resume_modes[start:stop])
+
+        # how far the lexer has looked never decreases from token to token,
+        # so only leading reaches can fall short of the last one
+        reaches = shifted(other._reaches)
+        last_reach = self._reaches[-1] if self._reaches else 0
+        idx = 0
+        while idx < len(reaches) and reaches[idx] < last_reach:
+            reaches[idx] = last_reach
+            idx += 1
+        self._reaches.extend(reaches)
+
+    def extend_lexed(self, records):
+        """
+        Add a token for each (symbol, start, end, resume_offset,
+        resume_mode, reach) 6-tuple in *records*, as generated by
+        :meth:`DfaLexer._scan`.
+        """
+        for symbol, start, end, resume_offset, resume_mode, reach in records:
+            self.append(symbol, start, end)
+            self._resume_offsets.append(resume_offset)
+            self._resume_modes.append(resume_mode)
+            self._reaches.append(reach)
+
+    @property
+    def lexed_count(self):
+        """
+        The number of tokens in this buffer recognized by the lexer, all but
+        the `SNTL` token.
+        """
+        return len(self._resume_offsets)
+
+    def resume_state(self, count):
+        """
+        Return the (offset, mode_id, reach) 3-tuple of the lexer state after
+        the first *count* tokens, where a *mode_id* of |None| is the start
+        mode.
+        """
+        if count == 0:
+            return 0, None, 0
+        idx = count - 1
+        return (
+            self._resume_offsets[idx], self._resume_modes[idx],
+            self._reaches[idx]
+        )
+
+    def resync_index(self, offset, mode_id):
+        """
+        Return the index of the first token recognized after lexing resumed
+        at *offset* in the mode having *mode_id*, or |None| if the lexer
+        never resumed there.
+        """
+        idx = bisect_left(self._resume_offsets, offset)
+        if idx == len(self._resume_offsets):
+            return None
+        if self._resume_offsets[idx] != offset:
+            return None
+        if self._resume_modes[idx] != mode_id:
+            return None
+        return idx + 1
+
+    def unaffected_count(self, offset):
+        """
+        The number of leading tokens recognized without the lexer looking at
+        *offset* or beyond, so unaffected by an edit at *offset*.
+        """
+        return bisect_right(self._reaches, offset)
+
+
+def _syntax_error(input, pos, message, size=40):
+    """
+    Return a |SyntaxError| for the error at *pos* in text string *input*,
+    described by *message*, e.g. `"at character '!'"`, followed by the
+    input around *pos*. Only up to *size* characters either side of *pos*
+    are shown, so the message stays short however large the input is.
+    """
+    length = len(input)
+    start, end = max(pos - size, 0), min(pos + size + 1, length)
+    return SyntaxError("%s in '%s%s%s'" % (
+        message, '...' if start else '', input[start:end],
+        '...' if end < length else '',
+    ))
+
+
+def _unichr(code):
+    """
+    Return the unicode character having code point *code*.
+    """
+    try:
+        return unichr(code)  # noqa
+    except NameError:
+        return chr(code)
+
+
+# the character standing for each byte value in binary input
+_byte_chars = tuple(_unichr(code) for code in range(256))
@@ -8,13 +8,24 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+from collections import namedtuple
+from itertools import islice
+
+from .grammar import Reduction
+from .lexer import BufferedToken, Token, TokenBuffer
+
+
+MemoInfo = namedtuple('MemoInfo', ('hits', 'misses'))
+
 
 class ASTNode(object):
     """
     A node in an abstract syntax tree (AST).
     """
 
-    __slots__ = ('_symbol', '_child_nodes')
+    # weak-referenceable, so a translator can keep the value of a node for
+    # as long as the node itself is in use
+    __slots__ = ('_symbol', '_child_nodes', '__weakref__')
 
     def __init__(self, symbol, child_nodes):
         self._symbol = symbol
@@ -46,27 +57,132 @@ class ASTNode(object):
         A string formed by concatenating each of the leaf token lexemes in
         this tree.
         """
-        child_values = [c.value for c in self._child_nodes]
-        return ''.join(child_values)
+        # walk the tree on an explicit stack so a very deep tree does not
+        # exceed the recursion limit
+        values, stack = [], [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ASTNode):
+                stack.extend(reversed(node._child_nodes))
+            else:
+                values.append(node.value)
+        return ''.join(values)
 
 
 class Parser(object):
     """
     Parser for Compact XML Expression Languate (CXML).
+
+    When *memoize* is |True|, the parser operates in packrat mode, recording
+    the result of matching each nonterminal at each token position so that
+    alternate productions sharing a prefix do not re-derive it. The memo
+    lasts for a single call to :meth:`parse`.
+
+    When *iterative* is |True|, the parser matches on an explicit stack of
+    frames rather than by recursion, producing the same AST. This allows
+    parsing an arbitrarily deep or wide expression without reaching the
+    Python recursion limit.
+
+    When *incremental* is |True|, the memo is kept after a parse, along with
+    how far into the tokens each derivation looked, so that
+    :meth:`reparse` can re-derive only what an edit of the input affects.
+    This requires *lexer* to be a |DfaLexer| and implies *memoize*.
     """
-    def __init__(self, lexer, productions):
+
+    _pending = object()  # a frame was pushed and its result is not yet known
+
+    def __init__(self, lexer, productions, memoize=False, iterative=False,
+                 incremental=False):
+        if incremental and not hasattr(lexer, 'relex'):
+            raise ValueError('incremental parsing requires a DfaLexer')
         self._lexer = lexer
         self._productions = productions
+        self._memoize = memoize or incremental
+        self._iterative = iterative
+        self._incremental = incremental
+        self._memo = {}
+        self._memo_hits = self._memo_misses = 0
+        # when parsing incrementally, how many tokens past its position each
+        # memoized derivation looked, and the reach of the derivations
+        # enclosing each frame open when parsing iteratively
+        self._reaches, self._outer_reaches = {}, []
+        self._token_buffer = None
+
+    @property
+    def memo_info(self):
+        """
+        A |MemoInfo| named tuple reporting the number of packrat memo hits
+        and misses during the most recent parse. Both counts are zero when
+        memoization is not enabled.
+        """
+        return MemoInfo(self._memo_hits, self._memo_misses)
 
     def parse(self, start_symbol):
-        tokens = list(self._lexer)
-        ast_root, remaining_tokens = self._match_symbol(start_symbol, tokens)
-        if remaining_tokens:
-            raise ValueError(
-                'not all tokens were consumed %s' % (remaining_tokens,)
-            )
+        self._memo, self._reaches = {}, {}
+        self._memo_hits = self._memo_misses = 0
+        if self._incremental:
+            try:
+                self._token_buffer = self._lexer.token_buffer()
+            except SyntaxError:
+                # drop the buffer of an earlier parse, so the next reparse()
+                # parses the input in full rather than relexing that buffer
+                self._token_buffer = None
+                raise
+            tokens = _ReachTokenStream(self._token_buffer)
+        else:
+            tokens = TokenStream.from_lexer(self._lexer)
+        return self._parse(start_symbol, tokens)
+
+    def reparse(self, start_symbol, offset, deleted, inserted):
+        """
+        Return the AST for the input of the previous parse with the
+        *deleted* characters at *offset* replaced by the string *inserted*,
+        when parsing incrementally.
+
+        The tokens are re-lexed around the edit with :meth:`DfaLexer.relex`
+        and the memo of the previous parse is carried over, less derivations
+        that looked at a token the edit replaced, with the positions of
+        those after the edit shifted. The AST nodes of the remaining
+        derivations, such as the trees on either side of the edit, are
+        reused as they are; only the nodes enclosing the edit are derived
+        again.
+
+        When the edited input cannot be lexed, the |SyntaxError| is raised
+        and the next call parses the input in full.
+        """
+        if not self._incremental:
+            raise ValueError('reparse requires incremental parsing')
+        lexer_cls, input_ = type(self._lexer), self._lexer.input
+        self._lexer = lexer_cls(
+            input_[:offset] + inserted + input_[offset + deleted:],
+            self._lexer.emit_sntl
+        )
+        token_buffer, self._token_buffer = self._token_buffer, None
+        if token_buffer is None:
+            return self.parse(start_symbol)
+
+        token_buffer = lexer_cls.relex(token_buffer, offset, deleted, inserted)
+        self._rebase_memo(token_buffer.edit)
+        self._memo_hits = self._memo_misses = 0
+        self._token_buffer = token_buffer
+        return self._parse(start_symbol, _ReachTokenStream(token_buffer))
+
+    def _parse(self, start_symbol, tokens):
+        """
+        Return the AST for *start_symbol* derived from *tokens*, all of
+        which must be consumed.
+        """
+        self._outer_reaches = []
+        match = (
+            self._match_iteratively if self._iterative else self._match_symbol
+        )
+        ast_root = match(start_symbol, tokens)
         if ast_root is None:
             raise SyntaxError("in '%s'" % self._lexer._input)
+        if not tokens.at_end:
+            raise ValueError(
+                'not all tokens were consumed %s' % (tokens.remaining,)
+            )
         return ast_root
 
     def _match_symbol(self, symbol, tokens):
@@ -80,46 +196,485 @@ class Parser(object):
 
     def _match_terminal(self, symbol, tokens):
         """
-        Return a (token, remaining_tokens) pair where *token* is the head of
-        the *tokens* sequence and *remaining_tokens* is its tail, if the head
-        of *tokens* is of token class *symbol*. If the head of *tokens* is of
-        another token class, return (|None|, |None|).
+        Return the next token in *tokens* and advance past it if it is of
+        token class *symbol*. Return |None| without advancing if the next
+        token is of another token class or *tokens* is exhausted.
         """
-        if not tokens:  # an empty list never matches
-            return None, None
-        if tokens[0].symbol == symbol:
-            return tokens[0], tokens[1:]
-        return None, None
+        return tokens.accept(symbol)
 
     def _match_nonterminal(self, symbol, tokens):
         """
-        Return a (node, remaining_tokens) 2-tuple, where *node* is an
-        abstract syntax tree (AST) node for *symbol*, derived recursively
-        from *tokens*.
+        Return an abstract syntax tree (AST) node for *symbol*, derived
+        recursively from *tokens*, or |None| if *symbol* cannot be derived at
+        the current position. *tokens* is advanced past the derivation when
+        one is found.
+        """
+        if self._memoize:
+            return self._match_memoized(symbol, tokens)
+        return self._derive_nonterminal(symbol, tokens)
+
+    def _derive_nonterminal(self, symbol, tokens):
+        """
+        Return an AST node for *symbol* by trying each of its productions in
+        order, taking the first that matches.
         """
         for p in self._productions[symbol]:
-            node, remaining_tokens = self._match_production(p, tokens)
+            node = self._match_production(p, tokens)
             # take the first successful derivation
             if node is not None:
-                return node, remaining_tokens
-        return None, None
+                return node
+        return None
+
+    def _match_iteratively(self, symbol, tokens):
+        """
+        Return an AST node for *symbol* derived from *tokens*, or |None| if
+        it cannot be derived, in the same way as :meth:`_match_symbol` but
+        without recursion. Each nonterminal being derived has a frame on the
+        stack holding [head, productions, production_idx, mark, children],
+        where the number of children is the position reached in the body of
+        the current production.
+        """
+        stack = []
+        result = self._open_frame(symbol, tokens, stack)
+
+        while stack:
+            frame = stack[-1]
+            head, productions, production_idx, mark, children = frame
+
+            if result is None:
+                # current production failed, backtrack to try the next one
+                tokens.reset(mark)
+                production_idx = frame[2] = production_idx + 1
+                children = frame[4] = []
+                if production_idx == len(productions):
+                    stack.pop()
+                    self._close_frame(head, mark, None, tokens)
+                    continue
+            elif result is not self._pending:
+                children.append(result)
+
+            body = productions[production_idx].body
+            if len(children) < len(body):
+                result = self._open_frame(
+                    body[len(children)], tokens, stack
+                )
+                continue
+
+            stack.pop()
+            result = self._close_frame(
+                head, mark, ASTNode(head, children), tokens
+            )
+
+        return result
+
+    def _close_frame(self, head, mark, node, tokens):
+        """
+        Return *node*, the result of deriving *head* from position *mark*,
+        after recording it in the memo when memoizing.
+        """
+        if self._memoize:
+            self._memo[(head, mark)] = (node, tokens.mark() - mark)
+        if self._incremental:
+            reach = tokens.reach
+            self._reaches[(head, mark)] = reach - mark
+            tokens.reach = max(self._outer_reaches.pop(), reach)
+        return node
+
+    def _open_frame(self, symbol, tokens, stack):
+        """
+        Begin matching *symbol* at the current position of *tokens*. Return
+        the matched token or |None| for a terminal symbol, the memoized
+        result for a nonterminal derived at this position before, or
+        otherwise push a frame for *symbol* onto *stack* and return the
+        pending marker.
+        """
+        if symbol.is_terminal:
+            return self._match_terminal(symbol, tokens)
+
+        mark = tokens.mark()
+        if self._memoize:
+            result = self._memo.get((symbol, mark))
+            if result is not None:
+                self._memo_hits += 1
+                if self._incremental:
+                    tokens.reach = max(
+                        tokens.reach, mark + self._reaches[(symbol, mark)]
+                    )
+                node, length = result
+                if node is not None:
+                    tokens.reset(mark + length)
+                return node
+            self._memo_misses += 1
+
+        productions = tuple(self._productions[symbol])
+        if not productions:
+            return None
+        stack.append([symbol, productions, 0, mark, []])
+        if self._incremental:
+            self._outer_reaches.append(tokens.reach)
+            tokens.reach = mark
+        return self._pending
+
+    def _match_memoized(self, symbol, tokens):
+        """
+        Return the AST node for *symbol* at the current position of *tokens*,
+        deriving it only on the first request. A memo hit moves *tokens* to
+        the end position recorded for the derivation.
+        """
+        mark = tokens.mark()
+        key = (symbol, mark)
+        result = self._memo.get(key)
+        if result is not None:
+            self._memo_hits += 1
+            if self._incremental:
+                tokens.reach = max(tokens.reach, mark + self._reaches[key])
+            node, length = result
+            if node is not None:
+                tokens.reset(mark + length)
+            return node
+        self._memo_misses += 1
+        if self._incremental:
+            outer_reach, tokens.reach = tokens.reach, mark
+        node = self._derive_nonterminal(symbol, tokens)
+        self._memo[key] = (node, tokens.mark() - mark)
+        if self._incremental:
+            reach = tokens.reach
+            self._reaches[key] = reach - mark
+            tokens.reach = max(outer_reach, reach)
+        return node
 
     def _match_production(self, production, tokens):
         """
-        Return a (node, remaining_tokens) pair, where *node* is an abstract
-        syntax tree (AST) node for the head of *production* and
-        *remaining_tokens* is the sequence of tokens not consumed by the
-        production. The child nodes of *node* are derived from recursive
-        matching of the terminal symbols in the body of *production*. Returns
-        (|None|, |None|) if the body of *production* did not match *tokens*.
+        Return an abstract syntax tree (AST) node for the head of
+        *production*, having child nodes derived from recursive matching of
+        the symbols in the body of *production*. Returns |None|, with
+        *tokens* reset to its starting position, if the body of *production*
+        did not match *tokens*.
         """
-        remaining_tokens, children = tokens, []
+        mark, children = tokens.mark(), []
         for symbol in production.body:
-            node, remaining_tokens = self._match_symbol(
-                symbol, remaining_tokens
-            )
+            node = self._match_symbol(symbol, tokens)
             if node is None:  # this production doesn't match against tokens
-                return None, None
+                tokens.reset(mark)
+                return None
             children.append(node)
 
-        return ASTNode(production.head, children), remaining_tokens
+        return ASTNode(production.head, children)
+
+    def _rebase_memo(self, edit):
+        """
+        Carry the memo over to the tokens produced by *edit*, a |TokenEdit|
+        object. Derivations that looked only at tokens before the edit are
+        kept as they are, those starting at a token after it are moved with
+        the token, and all others are discarded. Memo entries record lengths
+        relative to the position they are keyed by, so moving one only takes
+        a new key.
+        """
+        start, old_stop = edit.start, edit.old_stop
+        shift = edit.new_stop - old_stop
+        memo, reaches = self._memo, self._reaches
+        dropped, moved = [], []
+        for key, extent in reaches.items():
+            mark = key[1]
+            if mark + extent <= start:
+                continue
+            (moved if mark >= old_stop else dropped).append(key)
+
+        if not shift:
+            moved = []  # entries after the edit keep their position
+        elif 2 * len(moved) > len(reaches):
+            # cheaper to build new dicts than to move most of the entries
+            self._memo, self._reaches = new_memo, new_reaches = {}, {}
+            moved_keys = set(moved)
+            for key, extent in reaches.items():
+                if key in moved_keys:
+                    new_key = (key[0], key[1] + shift)
+                    new_memo[new_key] = memo[key]
+                    new_reaches[new_key] = extent
+                elif key[1] + extent <= start:
+                    new_memo[key] = memo[key]
+                    new_reaches[key] = extent
+            return
+
+        for key in dropped:
+            del memo[key], reaches[key]
+        # all are removed before any is added so none is overwritten
+        moved = [(key, memo.pop(key), reaches.pop(key)) for key in moved]
+        for (symbol, mark), entry, extent in moved:
+            new_key = (symbol, mark + shift)
+            memo[new_key] = entry
+            reaches[new_key] = extent
+
+
+class TokenStream(object):
+    """
+    Cursor over a sequence of tokens, allowing a parser to consume tokens by
+    advancing an integer position rather than by slicing the sequence.
+    A position obtained from :meth:`mark` can later be passed to
+    :meth:`reset` to backtrack to it.
+
+    A list, tuple, or |TokenBuffer| in *tokens* is used in place. Tokens
+    from any other iterable, such as a lexer, are pulled from it lazily, a
+    chunk at a time as the cursor reaches them, so lexing proceeds only as
+    far as parsing does and a lexical error is raised as soon as the parser
+    reaches it. Tokens already pulled are kept for backtracking. When
+    *source* is given, *tokens* is the (empty) sequence it is pulled into.
+
+    When the tokens are held in a |TokenBuffer|, token classes are read
+    from it without creating a |Token| object, so only the tokens actually
+    consumed are materialized.
+    """
+
+    __slots__ = ('_tokens', '_pos', '_end', '_source', '_symbol_ids')
+
+    # input length (in characters) from which :meth:`from_lexer` lexes into
+    # a |TokenBuffer|; for shorter input a list of tokens is faster and its
+    # size doesn't matter
+    buffer_threshold = 4096
+
+    # number of tokens pulled from a lazy source at a time
+    chunk_size = 256
+
+    def __init__(self, tokens, source=None):
+        if source is None and not isinstance(
+            tokens, (list, tuple, TokenBuffer)
+        ):
+            tokens, source = [], iter(tokens)
+        self._tokens = tokens
+        self._source = source
+        self._symbol_ids = (
+            tokens.symbol_ids if isinstance(tokens, TokenBuffer) else None
+        )
+        self._pos = 0
+        self._end = len(tokens)
+
+    @classmethod
+    def from_lexer(cls, lexer):
+        """
+        Return a |TokenStream| object pulling tokens lazily from *lexer*,
+        into a |TokenBuffer| when *lexer* can generate token spans and its
+        input is at least :attr:`buffer_threshold` characters long.
+        """
+        iter_spans = getattr(lexer, 'iter_spans', None)
+        if (
+            iter_spans is not None and
+            len(lexer._input) >= cls.buffer_threshold
+        ):
+            return cls(TokenBuffer(lexer._input), iter_spans())
+        return cls(lexer)
+
+    def __len__(self):
+        """
+        The number of tokens remaining to be consumed.
+        """
+        self._drain()
+        return self._end - self._pos
+
+    def accept(self, symbol):
+        """
+        Return the token at the current position and advance past it if it
+        is of token class *symbol*, otherwise return |None| without
+        advancing.
+        """
+        pos = self._pos
+        if pos >= self._end and not self._fill(pos):
+            return None
+        symbol_ids = self._symbol_ids
+        if symbol_ids is not None:
+            # a terminal symbol is an int equal to its id
+            if symbol_ids[pos] != symbol:
+                return None
+            token = BufferedToken(self._tokens, pos)
+        else:
+            token = self._tokens[pos]
+            if token.symbol != symbol:
+                return None
+        self._pos = pos + 1
+        return token
+
+    def advance(self):
+        """
+        Move the cursor past the current token.
+        """
+        self._pos += 1
+
+    @property
+    def at_end(self):
+        """
+        |True| if all tokens have been consumed.
+        """
+        pos = self._pos
+        return pos >= self._end and not self._fill(pos)
+
+    def mark(self):
+        """
+        Return the current position, suitable for use with :meth:`reset`.
+        """
+        return self._pos
+
+    def peek(self):
+        """
+        Return the token at the current position without consuming it, or
+        |None| if all tokens have been consumed.
+        """
+        pos = self._pos
+        if pos >= self._end and not self._fill(pos):
+            return None
+        return self._tokens[pos]
+
+    def peek_symbol(self):
+        """
+        Return the token class (terminal symbol) of the token at the current
+        position, or |None| if all tokens have been consumed.
+        """
+        pos = self._pos
+        if pos >= self._end and not self._fill(pos):
+            return None
+        if self._symbol_ids is not None:
+            return self._tokens.symbol_at(pos)
+        return self._tokens[pos].symbol
+
+    @property
+    def remaining(self):
+        """
+        A list of the tokens not yet consumed.
+        """
+        self._drain()
+        return list(self._tokens[self._pos:])
+
+    def reset(self, mark):
+        """
+        Move the cursor back (or forward) to position *mark*.
+        """
+        self._pos = mark
+
+    def _drain(self):
+        """
+        Pull all remaining tokens from the source.
+        """
+        if self._source is not None:
+            self._tokens.extend(self._source)
+            self._source = None
+            self._end = len(self._tokens)
+
+    def _fill(self, pos):
+        """
+        Pull tokens from the source until the token at *pos* is available.
+        Return |True| if it is, or |False| if the tokens run out first.
+        """
+        source, tokens = self._source, self._tokens
+        while source is not None:
+            tokens.extend(islice(source, self.chunk_size))
+            end = len(tokens)
+            if end == self._end:
+                self._source = source = None
+            self._end = end
+            if pos < end:
+                return True
+        return False
+
+
+class _ReachTokenStream(TokenStream):
+    """
+    |TokenStream| over a |TokenBuffer| that records in :attr:`reach` how far
+    into the tokens the parser has looked, as one more than the greatest
+    position it has accepted a token at, or tried to. Each token accepted is
+    a |Token| object holding its own lexeme, so the AST does not keep the
+    buffer alive.
+    """
+
+    __slots__ = ('reach',)
+
+    def __init__(self, token_buffer):
+        super(_ReachTokenStream, self).__init__(token_buffer)
+        self.reach = 0
+
+    def accept(self, symbol):
+        """
+        Return the token at the current position and advance past it if it
+        is of token class *symbol*, otherwise return |None| without
+        advancing.
+        """
+        pos = self._pos
+        if pos >= self.reach:
+            self.reach = pos + 1
+        if pos >= self._end or self._symbol_ids[pos] != symbol:
+            return None
+        self._pos = pos + 1
+        token_buffer = self._tokens
+        return Token(token_buffer.symbol_at(pos), token_buffer.lexeme_at(pos))
+
+
+class PredictiveParser(object):
+    """
+    Table-driven parser for an LL(1) grammar. Each nonterminal is expanded
+    with the single production predicted by *table* (an |LL1Table|) for the
+    next token, so the parser never backtracks. The parse proceeds on an
+    explicit stack rather than by recursion.
+
+    The AST produced has the same form as that produced by |Parser| for the
+    grammar *table* was derived from; nodes derived by a |TailSymbol| are
+    spliced into their parent and |Reduction| markers rebuild the nodes of
+    nonterminals that were substituted inline during left-factoring.
+    """
+
+    _close = object()  # stack marker to complete the innermost open node
+
+    def __init__(self, lexer, table):
+        if table.conflicts:
+            raise ValueError(
+                'grammar is not LL(1), conflicts: %s' % (table.conflicts,)
+            )
+        self._lexer = lexer
+        self._table = table
+
+    def parse(self, start_symbol):
+        tokens = TokenStream.from_lexer(self._lexer)
+        predict, close = self._table.predict, self._close
+
+        # each open node is a (symbol, children) pair; the outermost
+        # "node" just collects the root
+        open_nodes = [(None, [])]
+        stack = [start_symbol]
+
+        while stack:
+            item = stack.pop()
+
+            if item is close:
+                symbol, children = open_nodes.pop()
+                open_nodes[-1][1].append(ASTNode(symbol, children))
+                continue
+
+            if isinstance(item, Reduction):
+                children = open_nodes[-1][1]
+                idx = len(children) - item.count
+                node = ASTNode(item.symbol, children[idx:])
+                children[idx:] = [node]
+                continue
+
+            next_symbol = tokens.peek_symbol()
+
+            if item.is_terminal:
+                if next_symbol != item:
+                    self._raise_syntax_error()
+                open_nodes[-1][1].append(tokens.peek())
+                tokens.advance()
+                continue
+
+            production = predict(item, next_symbol)
+            if production is None:
+                self._raise_syntax_error()
+            if not item.is_tail:
+                open_nodes.append((item, []))
+                stack.append(close)
+            stack.extend(reversed(production.body))
+
+        if not tokens.at_end:
+            raise ValueError(
+                'not all tokens were consumed %s' % (tokens.remaining,)
+            )
+        ast_root, = open_nodes[0][1]
+        return ast_root
+
+    def _raise_syntax_error(self):
+        raise SyntaxError("in '%s'" % self._lexer._input)
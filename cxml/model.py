@@ -34,25 +34,19 @@ def nsdecls_str(*nspfxs):
     return nsdecls
 
 
-def add_setwise(seq, seq_2):
+def _ordered_union(*seqs):
     """
-    Append any items in *seq_2* that do not already appear in *seq*.
+    Return a list containing each distinct item in *seqs*, in the order it
+    first appears, using a set for membership tests.
     """
-    for item in seq_2:
-        if item in seq:
-            continue
-        seq.append(item)
-    return seq
-
-
-def subtract_setwise(seq, seq_2):
-    """
-    Remove any members of *seq_2* from *seq*.
-    """
-    for item in seq_2:
-        if item in seq:
-            seq.remove(item)
-    return seq
+    seen, items = set(), []
+    for seq in seqs:
+        for item in seq:
+            if item in seen:
+                continue
+            seen.add(item)
+            items.append(item)
+    return items
 
 
 class BaseAttribute(object):
@@ -60,11 +54,16 @@ class BaseAttribute(object):
     Base class for |NamespaceDeclaration| and |StringAttribute|.
     """
 
+    __slots__ = ()
+
 
 class NamespaceDeclaration(BaseAttribute):
     """
     Represents an XML namespace declaration, e.g. xmlns:x="foo/bar".
     """
+
+    __slots__ = ('_nspfx',)
+
     def __init__(self, nspfx):
         self._nspfx = nspfx
 
@@ -88,6 +87,9 @@ class StringAttribute(BaseAttribute):
     """
     A normal XML attribute like `w:width="30840"`.
     """
+
+    __slots__ = ('_nspfx', '_qname', '_value')
+
     def __init__(self, nspfx, qname, value):
         self._nspfx = nspfx
         self._qname = qname
@@ -117,19 +119,46 @@ class StringAttribute(BaseAttribute):
         """
         return self._nspfx
 
+    @property
+    def qname(self):
+        """
+        The qualified name of this attribute, e.g. `'w:val'`.
+        """
+        return self._qname
+
+    @property
+    def value(self):
+        """
+        The string value of this attribute.
+        """
+        return self._value
+
 
 class BaseElement(object):
     """
     Base class for an XML element, subclassed by Element and RootElement and
-    providing common properties and methods.
+    providing common properties and methods. The attributes of an element
+    are partitioned into namespace declarations and string attributes once,
+    on construction.
     """
+
+    __slots__ = (
+        '_nspfx', '_tagname', '_attrs', '_text', '_children', '_nsdecls',
+        '_str_attrs',
+    )
+
     def __init__(self, nspfx, tagname, attrs, text):
         self._nspfx = nspfx
         self._tagname = tagname
         self._attrs = attrs
         self._text = text
-        self._children = []
-        self._indent_str = ''
+        self._children = ()  # replaced by a list when a child is added
+        self._nsdecls = tuple(
+            a for a in attrs if isinstance(a, NamespaceDeclaration)
+        )
+        self._str_attrs = tuple(
+            a for a in attrs if isinstance(a, StringAttribute)
+        )
 
     def __repr__(self):
         """
@@ -148,7 +177,17 @@ class BaseElement(object):
         """
         Add *child* as a child of this element.
         """
-        self._children.append(child)
+        if self._children:
+            self._children.append(child)
+        else:
+            self._children = [child]
+
+    @property
+    def children(self):
+        """
+        A sequence of the child elements of this element, in document order.
+        """
+        return self._children
 
     @property
     def descendant_explicit_nspfxs(self):
@@ -156,11 +195,9 @@ class BaseElement(object):
         A list containing the namespace prefixes explicitly declared in
         descendants of this element.
         """
-        nspfxs = []
-        for child in self._children:
-            add_setwise(nspfxs, child.explicit_nspfxs)
-            add_setwise(nspfxs, child.descendant_explicit_nspfxs)
-        return nspfxs
+        descendants = self.iter()
+        next(descendants)  # skip this element
+        return _ordered_union(*(e.explicit_nspfxs for e in descendants))
 
     @property
     def explicit_nspfxs(self):
@@ -178,6 +215,18 @@ class BaseElement(object):
         nspfx = qname.split(':')[0] if ':' in qname else ''
         return cls(nspfx, qname, attrs, text)
 
+    def iter(self):
+        """
+        Generate this element and each of its descendants in document order.
+        The tree is walked on an explicit stack, so its depth is not limited
+        by the recursion limit.
+        """
+        stack = [self]
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed(element._children))
+
     @property
     def nspfx(self):
         """
@@ -186,6 +235,29 @@ class BaseElement(object):
         """
         return self._nspfx
 
+    @property
+    def str_attrs(self):
+        """
+        A sequence of the |StringAttribute| objects of this element, in the
+        order they appear. Namespace declarations are excluded.
+        """
+        return self._str_attrs
+
+    @property
+    def tagname(self):
+        """
+        The qualified tag name of this element, e.g. `'w:pPr'`.
+        """
+        return self._tagname
+
+    @property
+    def text(self):
+        """
+        The text contained in this element, the empty string (`''`) if it
+        has none.
+        """
+        return self._text
+
     @property
     def tree_implicit_nspfxs(self):
         """
@@ -195,10 +267,7 @@ class BaseElement(object):
         declared namespaces are not included, but will appear if present in
         a child element or attribute name.
         """
-        nspfxs = [self.nspfx] if self.nspfx else []
-        nspfxs = add_setwise(nspfxs, self._str_attr_nspfxs)
-        for child in self._children:
-            add_setwise(nspfxs, child.tree_implicit_nspfxs)
+        nspfxs = _ordered_union(*(e._implicit_nspfxs for e in self.iter()))
         return [pfx for pfx in nspfxs if pfx != 'xml']
 
     def xml(self, indent):
@@ -206,33 +275,57 @@ class BaseElement(object):
         Return a string containing the XML of this element and all its
         children with a starting indent of *indent* spaces.
         """
-        self._indent_str = ' ' * indent
-        xml = self._start_tag
-        for child in self._children:
-            xml += child.xml(indent+2)
-        xml += self._end_tag
-        return xml
+        return ''.join(self._iter_fragments(indent))
 
-    @property
-    def _end_tag(self):
+    def _end_tag(self, indent_str):
         """
-        The text of the closing tag of this element, if there is one. If the
-        element contains text, no leading indentation is included.
+        The text of the closing tag of this element, if there is one,
+        indented by *indent_str*. If the element contains text, no leading
+        indentation is included.
         """
         if self._text:
             return '</%s>\n' % self._tagname
         if self._children:
-            return '%s</%s>\n' % (self._indent_str, self._tagname)
+            return '%s</%s>\n' % (indent_str, self._tagname)
         return ''
 
     @property
-    def _nsdecls(self):
+    def _implicit_nspfxs(self):
+        """
+        A list containing the namespace prefix of this element's tag, if it
+        has one, followed by those of its string attributes.
         """
-        A list containing the namespace declaration objects of this element.
+        nspfxs = [self.nspfx] if self.nspfx else []
+        nspfxs.extend(a.nspfx for a in self._str_attrs if a.nspfx)
+        return nspfxs
+
+    def _iter_fragments(self, indent):
         """
-        return [
-            n for n in self._attrs if isinstance(n, NamespaceDeclaration)
-        ]
+        Generate each successive fragment of the XML for this element and
+        all its children, using a starting indent of *indent* spaces. The
+        tree is walked on an explicit stack and the indent string for each
+        level is computed only once.
+        """
+        indent_strs = [' ' * indent]
+        stack = [(self, 0, False)]
+        while stack:
+            element, level, is_end = stack.pop()
+            indent_str = indent_strs[level]
+
+            if is_end:
+                yield element._end_tag(indent_str)
+                continue
+
+            yield element._start_tag(indent_str)
+            children = element._children
+            if not children:
+                yield element._end_tag(indent_str)
+                continue
+
+            if level + 1 == len(indent_strs):
+                indent_strs.append(indent_str + '  ')
+            stack.append((element, level, True))
+            stack.extend((c, level + 1, False) for c in reversed(children))
 
     @property
     def _start_tag_closing(self):
@@ -249,27 +342,15 @@ class BaseElement(object):
             return '>\n'
         return '/>\n'
 
-    @property
-    def _str_attr_nspfxs(self):
-        """
-        A list containing the unique namespace prefixes that appear in the
-        string attributes of this element.
-        """
-        return add_setwise([], [a.nspfx for a in self._str_attrs if a.nspfx])
-
-    @property
-    def _str_attrs(self):
-        """
-        A list containing the string attributes of this element.
-        """
-        return [a for a in self._attrs if isinstance(a, StringAttribute)]
-
 
 class Element(BaseElement):
     """
     Represents an XML element, having a namespace, tagname, attributes, and
     may contain either text or children (but not both) or may be empty.
     """
+
+    __slots__ = ()
+
     @property
     def _attrs_str(self):
         """
@@ -282,19 +363,17 @@ class Element(BaseElement):
             return ''
         return ' %s' % ' '.join(str(a) for a in self._attrs)
 
-    @property
-    def _start_tag(self):
+    def _start_tag(self, indent_str):
         """
         A string containing the opening tag of this element, including string
         attributes and explicit namespace declarations in the order they
         appear. If this element contains text, that text follows the start
         tag. If not, and this element has no children, an empty tag is
         returned. Otherwise, an opening tag is returned, followed by
-        a newline. The tag is indented by this element's indent value in all
-        cases.
+        a newline. The tag is indented by *indent_str* in all cases.
         """
         return '%s<%s%s%s' % (
-            self._indent_str, self._tagname, self._attrs_str,
+            indent_str, self._tagname, self._attrs_str,
             self._start_tag_closing
         )
 
@@ -304,6 +383,22 @@ class RootElement(BaseElement):
     Represents the root XML element of a CXML expression, having special
     behaviors around displaying namespace declarations.
     """
+
+    __slots__ = ('_nsdecls_str_cache',)
+
+    def __init__(self, nspfx, tagname, attrs, text):
+        super(RootElement, self).__init__(nspfx, tagname, attrs, text)
+        self._nsdecls_str_cache = None
+
+    @property
+    def nspfxs(self):
+        """
+        A list of the namespace prefixes declared on this element as the root
+        of its tree, in declaration order; the same prefixes as in the
+        namespace declarations of its XML.
+        """
+        return self._resolve_nspfxs()
+
     @property
     def xml(self):
         """
@@ -311,7 +406,42 @@ class RootElement(BaseElement):
         pretty-printed using 2-spaces indentation at each level and with
         a trailing '\n'.
         """
-        return super(RootElement, self).xml(indent=0)
+        self._nsdecls_str_cache = nsdecls_str(*self._resolve_nspfxs())
+        try:
+            return super(RootElement, self).xml(indent=0)
+        finally:
+            self._nsdecls_str_cache = None
+
+    def iter_xml(self, chunk_size=65536):
+        """
+        Generate the same XML as :attr:`xml` as a sequence of string chunks,
+        each at least *chunk_size* characters long except possibly the last,
+        so that the complete XML of a very large tree need never be held in
+        memory at once. The namespace declarations for the root element are
+        resolved before the first chunk is generated.
+        """
+        self._nsdecls_str_cache = nsdecls_str(*self._resolve_nspfxs())
+        try:
+            chunk, size = [], 0
+            for fragment in self._iter_fragments(indent=0):
+                chunk.append(fragment)
+                size += len(fragment)
+                if size >= chunk_size:
+                    yield ''.join(chunk)
+                    chunk, size = [], 0
+            if chunk:
+                yield ''.join(chunk)
+        finally:
+            self._nsdecls_str_cache = None
+
+    def write_to(self, fileobj, chunk_size=65536):
+        """
+        Write the XML corresponding to the tree rooted at this element to
+        *fileobj*, a text file-like object, in chunks of about *chunk_size*
+        characters.
+        """
+        for chunk in self.iter_xml(chunk_size):
+            fileobj.write(chunk)
 
     @property
     def _attrs_str(self):
@@ -334,15 +464,35 @@ class RootElement(BaseElement):
         declared in this element (i.e. with an `x:` attribute), and then
         followed by any implicit namespaces occurring in a descendant, less
         any namespaces explicit declared in a descendant.
+
+        The prefixes are gathered in a single walk of the tree. The result
+        is held only while :attr:`xml` or :meth:`iter_xml` is generating the
+        XML, never across a change to the tree, such as a child added to
+        a descendant after the XML was last generated.
         """
-        nspfxs = [self.nspfx] if self.nspfx else []
-        nspfxs = add_setwise(nspfxs, self.explicit_nspfxs)
-        add_setwise(nspfxs, self.tree_implicit_nspfxs)
-        subtract_setwise(nspfxs, self.descendant_explicit_nspfxs)
-        return nsdecls_str(*nspfxs)
+        if self._nsdecls_str_cache is not None:
+            return self._nsdecls_str_cache
+        return nsdecls_str(*self._resolve_nspfxs())
 
-    @property
-    def _start_tag(self):
+    def _resolve_nspfxs(self):
+        """
+        Return the list of namespace prefixes to be declared on this element
+        as the root of its tree, in declaration order.
+        """
+        implicit, descendant_explicit = [], set()
+        for element in self.iter():
+            implicit.extend(element._implicit_nspfxs)
+            if element is not self:
+                descendant_explicit.update(element.explicit_nspfxs)
+
+        nspfxs = _ordered_union(
+            [self.nspfx] if self.nspfx else [],
+            self.explicit_nspfxs,
+            (pfx for pfx in implicit if pfx != 'xml'),
+        )
+        return [pfx for pfx in nspfxs if pfx not in descendant_explicit]
+
+    def _start_tag(self, indent_str):
         """
         A string containing the opening tag of this element, including
         namespaces and attributes. If this is a root element, a namespace
@@ -350,7 +500,8 @@ class RootElement(BaseElement):
         a descendant. If this element contains text, that text follows the
         start tag. If not, and this element has no children, an empty tag is
         returned. Otherwise, an opening tag is returned, followed by
-        a newline.
+        a newline. A root element is never indented, so *indent_str* is
+        ignored.
         """
         return '<%s%s%s%s' % (
             self._tagname, self._nsdecls_str, self._attrs_str,
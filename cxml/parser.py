@@ -8,8 +8,8 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
-from .lib.grammar import Productions
-from .lib.parser import Parser
+from .lib.grammar import Grammar, Productions
+from .lib.parser import Parser, PredictiveParser
 
 from .symbols import (
     COLON, COMMA, EQUAL, LBRACE, LPAREN, NAME, RBRACE, RPAREN, SLASH, SNTL,
@@ -45,10 +45,29 @@ productions = Productions.from_seq(
     (nsdecl,       (NAME, COLON)),
 )
 
+# predictive parse table for the left-factored form of the CXML grammar
+ll1_table = Grammar(productions).left_factored().ll1_table()
+
 
 class CxmlParser(Parser):
     """
-    Parser for Compact XML Expression Languate (CXML).
+    Parser for Compact XML Expression Languate (CXML). Packrat memoization
+    is enabled by passing *memoize* |True| and matching on an explicit stack
+    rather than by recursion by passing *iterative* |True|. Passing
+    *incremental* |True|, with a |CxmlDfaLexer| as *lexer*, allows the
+    expression to be edited and parsed again with :meth:`reparse`.
+    """
+    def __init__(self, lexer, memoize=False, iterative=False,
+                 incremental=False):
+        super(CxmlParser, self).__init__(
+            lexer, productions, memoize, iterative, incremental
+        )
+
+
+class CxmlPredictiveParser(PredictiveParser):
+    """
+    Table-driven LL(1) parser for CXML, producing the same AST as
+    |CxmlParser| without backtracking.
     """
     def __init__(self, lexer):
-        super(CxmlParser, self).__init__(lexer, productions)
+        super(CxmlPredictiveParser, self).__init__(lexer, ll1_table)
@@ -0,0 +1,263 @@
+# encoding: utf-8
+
+"""
+CXML templates, translated once and then rendered with different values.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import re
+
+from .builder import CxmlBuilder
+from .lexer import CxmlRegexLexer, name_charset, name_start_charset
+from .symbols import COLON, EQUAL, NAME, TEXT
+
+
+_placeholder_re = re.compile(
+    r'\$(?:(?P<escaped>\$)|\{(?P<name>[A-Za-z_][A-Za-z0-9_]*)\})'
+)
+
+
+class CxmlTemplate(object):
+    """
+    A CXML expression containing `${name}` placeholders, e.g.
+    `'w:jc{w:val=${val}}'`, which can be rendered to XML many times with
+    different values. `$$` stands for a literal `$`.
+
+    A placeholder can stand for (part of) an attribute value, element text,
+    or a name. The template is translated once, with each placeholder
+    replaced by a unique sentinel name, and the resulting XML is split at the
+    sentinels. Rendering then only joins those pieces with the values, which
+    are inserted as-is rather than interpreted as CXML.
+
+    A placeholder in a name must complete it to a name, e.g. `'w:b${n}'`
+    rendered with `n='1'` gives `w:b1`. Where its value has a namespace
+    prefix, e.g. `'w:b'`, or is a namespace prefix, the
+    namespace declarations of the XML can change, so the template is
+    translated again for that combination of names; those translations are
+    cached. The same goes for element text made up of placeholders alone
+    when each of their values is empty, as an element without text has a
+    different form, e.g. `<w:t/>`.
+    """
+
+    def __init__(self, template):
+        self._template = template
+        self._sentinel_prefix = prefix = _sentinel_prefix(template)
+        self._sentinel_re = re.compile('%s(\\d+)z' % prefix)
+
+        # template is held as alternating literal CXML and placeholder
+        # names, starting and ending with literal CXML
+        self._cxml_parts = cxml_parts = []
+        literal, pos = [], 0
+        for match in _placeholder_re.finditer(template):
+            literal.append(_literal(template, pos, match.start()))
+            pos = match.end()
+            if match.group('escaped'):
+                literal.append('$')
+                continue
+            cxml_parts.extend((''.join(literal), match.group('name')))
+            literal = []
+        literal.append(_literal(template, pos, len(template)))
+        cxml_parts.append(''.join(literal))
+
+        self._names = names = []
+        for name in cxml_parts[1::2]:
+            if name not in names:
+                names.append(name)
+        (self._name_fields, self._prefix_fields, self._text_fields,
+         self._qnames) = self._find_fields()
+        self._fallback_xml_parts = {}
+        # a namespace prefix is needed to translate, so a template with a
+        # placeholder for one is only translated once its value is known
+        self._xml_parts = (
+            None if self._prefix_fields else self._translate({})
+        )
+
+    @property
+    def names(self):
+        """
+        The names of the placeholders in this template, in order of first
+        appearance.
+        """
+        return tuple(self._names)
+
+    def render(self, **values):
+        """
+        Return the XML for this template with each placeholder replaced by
+        its value in *values*. Raises |KeyError| when a placeholder has no
+        value and |ValueError| when a name completed by the values of its
+        placeholders is not a name.
+        """
+        values = dict((name, '%s' % values[name]) for name in self._names)
+
+        names = self._names
+        for qname in self._qnames:
+            qname = self._sentinel_re.sub(
+                lambda match: values[names[int(match.group(1))]], qname
+            )
+            if not _is_qname(qname):
+                raise ValueError("'%s' is not a name" % qname)
+
+        qualified = {}
+        for name in self._name_fields:
+            value = values[name]
+            if ':' in value or name in self._prefix_fields:
+                qualified[name] = value
+        for names in self._text_fields:
+            if not any(values[name] for name in names):
+                qualified.update((name, '') for name in names)
+
+        xml_parts = self._xml_parts
+        if qualified:
+            xml_parts = self._fallback(qualified)
+
+        parts = list(xml_parts)
+        for idx in range(1, len(parts), 2):
+            parts[idx] = values[parts[idx]]
+        return ''.join(parts)
+
+    @property
+    def template(self):
+        """
+        The template string this object was compiled from.
+        """
+        return self._template
+
+    def _cxml(self, substitutions):
+        """
+        Return the CXML expression for this template with placeholders in
+        *substitutions* replaced by their value and all others by their
+        sentinel.
+        """
+        parts = list(self._cxml_parts)
+        for idx in range(1, len(parts), 2):
+            name = parts[idx]
+            parts[idx] = substitutions.get(name, self._sentinel(name))
+        return ''.join(parts)
+
+    def _fallback(self, qualified):
+        """
+        Return the XML parts for this template with the placeholders in
+        *qualified* (a name to value mapping) translated as part of the
+        expression.
+        """
+        key = tuple(sorted(qualified.items()))
+        xml_parts = self._fallback_xml_parts.get(key)
+        if xml_parts is None:
+            if len(self._fallback_xml_parts) >= 256:
+                self._fallback_xml_parts.clear()
+            xml_parts = self._translate(qualified)
+            self._fallback_xml_parts[key] = xml_parts
+        return xml_parts
+
+    def _find_fields(self):
+        """
+        Return a (name_fields, prefix_fields, text_fields, qnames) 4-tuple.
+        The first two are sets, the placeholder names appearing in (part of)
+        a name token of the expression and the subset of those appearing in
+        a namespace prefix. *text_fields* is a list of the tuple of
+        placeholder names making up each element text consisting only of
+        placeholders. *qnames* is a list of each (qualified) name containing
+        a placeholder, with the placeholders as sentinels, e.g.
+        `'w:bcxmltpl0z'`; a namespace declaration such as `'cxmltpl0z:'`
+        keeps its trailing colon.
+        """
+        sentinel_re = self._sentinel_re
+        name_fields, prefix_fields, text_fields = set(), set(), []
+        qnames, qname = [], ''
+        names_in_prev_token, prev_symbol = (), None
+        for token in CxmlRegexLexer(self._cxml({})):
+            symbol, lexeme = token.symbol, token.lexeme
+            if symbol == COLON and prev_symbol == NAME:
+                qname += lexeme
+            elif symbol == NAME and qname.endswith(':'):
+                qname += lexeme
+            else:
+                if sentinel_re.search(qname):
+                    qnames.append(qname)
+                qname = lexeme if symbol == NAME else ''
+            if symbol == COLON:
+                prefix_fields.update(names_in_prev_token)
+            names_in_prev_token = ()
+            is_element_text = symbol == TEXT and prev_symbol != EQUAL
+            prev_symbol = symbol
+            if symbol != NAME and not is_element_text:
+                continue
+            names = [
+                self._names[int(match.group(1))]
+                for match in sentinel_re.finditer(lexeme)
+            ]
+            if symbol == NAME:
+                names_in_prev_token = names
+                name_fields.update(names)
+            elif names and not sentinel_re.sub('', lexeme):
+                text_fields.append(tuple(names))
+        if sentinel_re.search(qname):
+            qnames.append(qname)
+        return name_fields, prefix_fields, text_fields, qnames
+
+    def _sentinel(self, name):
+        """
+        Return the sentinel name standing in for placeholder *name*.
+        """
+        return '%s%dz' % (self._sentinel_prefix, self._names.index(name))
+
+    def _translate(self, substitutions):
+        """
+        Return the XML generated for the template with the placeholders in
+        *substitutions* replaced by their values, split into a tuple of
+        alternating literal XML and placeholder names.
+        """
+        root_element = CxmlBuilder(
+            CxmlRegexLexer(self._cxml(substitutions))
+        ).build()
+        parts = self._sentinel_re.split(root_element.xml)
+        for idx in range(1, len(parts), 2):
+            parts[idx] = self._names[int(parts[idx])]
+        return tuple(parts)
+
+
+def _is_qname(value):
+    """
+    |True| if *value* is a name, optionally with a namespace prefix, or is
+    a namespace prefix followed by a colon, as in a namespace declaration.
+    A name is tested against the same characters, non-ASCII letters
+    included, as the lexer accepts in one.
+    """
+    if value.endswith(':'):
+        value = value[:-1]
+        if ':' in value:
+            return False
+    parts = value.split(':')
+    if len(parts) > 2:
+        return False
+    for part in parts:
+        if not part or part[0] not in name_start_charset:
+            return False
+        if any(c not in name_charset for c in part):
+            return False
+    return True
+
+
+def _literal(template, start, end):
+    """
+    Return the literal text of *template* from *start* to *end*, raising
+    |ValueError| if it contains a `$` not part of a placeholder or escape.
+    """
+    literal = template[start:end]
+    if '$' in literal:
+        raise ValueError("invalid placeholder in '%s'" % template)
+    return literal
+
+
+def _sentinel_prefix(template):
+    """
+    Return a name, to be followed by a placeholder index, that does not
+    appear anywhere in *template*.
+    """
+    prefix = 'cxmltpl'
+    while prefix in template:
+        prefix += 'x'
+    return prefix
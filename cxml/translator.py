@@ -9,17 +9,39 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+from weakref import WeakKeyDictionary
+
 from .model import (
     Element, NamespaceDeclaration, RootElement, StringAttribute
 )
-from .symbols import attrs, qname
+from .symbols import attrs, qname, tree, tree_list, trees
+
+
+# symbols whose values are complete once evaluated, never modified by the
+# evaluation of an enclosing node, so can be shared between object graphs;
+# nodes of these symbols are evaluated on an explicit stack
+_reusable_symbols = frozenset((tree, tree_list, trees))
 
 
 class CxmlTranslator(object):
     """
     Constructs a |RootElement| object (with its graph) corresponding to
     a Compact XML Expression Language (CXML) abstract syntax tree (AST).
+
+    When *reuse* is |True|, the value of each `tree`, `tree_list`, and
+    `trees` node is kept for as long as the node is, and an AST sharing
+    such nodes with one evaluated before, as produced by
+    :meth:`CxmlParser.reparse`, reuses their values rather than building
+    those elements again.
+
+    The `tree`, `tree_list`, and `trees` nodes of an AST are evaluated on
+    an explicit stack rather than by recursion, so an expression of any
+    depth or width can be translated without reaching the Python recursion
+    limit.
     """
+    def __init__(self, reuse=False):
+        self._values = WeakKeyDictionary() if reuse else None
+
     @classmethod
     def translate(cls, tree):
         """
@@ -43,8 +65,14 @@ class CxmlTranslator(object):
         Return the value obtained by dispatching *node* to the appropriate
         eval method.
         """
-        eval_method = getattr(self, node.name)
-        return eval_method(node)
+        if node.symbol not in _reusable_symbols:
+            eval_method = getattr(self, node.name)
+            return eval_method(node)
+        values = self._values
+        value = None if values is None else values.get(node)
+        if value is None:
+            value = self._evaluate_tree(node)
+        return value
 
     def nsdecl(self, node):
         """
@@ -81,18 +109,14 @@ class CxmlTranslator(object):
 
     def attr_list(self, node):
         """
-        Return a list of attribute objects produced from *node*.
+        Return a list of attribute objects produced from *node*. The nested
+        `attr_list` nodes are followed in a loop rather than evaluated in
+        turn.
         """
-        nodes = node.child_nodes
-        if len(nodes) == 1:
-            attr_node, = nodes
-            return [self.evaluate(attr_node)]
-
-        attr_node, _, attr_list_node = nodes
-        attr = self.evaluate(attr_node)
-        attr_list = self.evaluate(attr_list_node)
-
-        return [attr] + attr_list
+        attr_list = []
+        for attr_node in _list_items(node):
+            attr_list.append(self.evaluate(attr_node))
+        return attr_list
 
     def attrs(self, node):
         """
@@ -140,18 +164,14 @@ class CxmlTranslator(object):
 
     def tree_list(self, node):
         """
-        Return a list of tree objects produced from *node*.
+        Return a list of tree objects produced from *node*. The nested
+        `tree_list` nodes are followed in a loop rather than evaluated in
+        turn.
         """
-        nodes = node.child_nodes
-        if len(nodes) == 1:
-            tree_node, = nodes
-            return [self.evaluate(tree_node)]
-
-        tree_node, _, tree_list_node = nodes
-        tree = self.evaluate(tree_node)
-        tree_list = self.evaluate(tree_list_node)
-
-        return [tree] + tree_list
+        tree_list = []
+        for tree_node in _list_items(node):
+            tree_list.append(self.evaluate(tree_node))
+        return tree_list
 
     def trees(self, node):
         """
@@ -200,3 +220,57 @@ class CxmlTranslator(object):
         for child, _ in trees:
             root_element.add_child(child)
         return root_element
+
+    def _evaluate_tree(self, node):
+        """
+        Return the value of *node*, a `tree`, `tree_list`, or `trees` node.
+        The nodes of those symbols within it are evaluated first, innermost
+        first, on an explicit stack, so the eval method of each only looks
+        up the values of those it contains. Those values are kept until
+        *node* is evaluated, or for as long as the node is when reusing
+        values.
+        """
+        reuse = self._values is not None
+        values = self._values if reuse else {}
+        self._values = values
+        try:
+            stack = [(node, False)]
+            while stack:
+                node_, ready = stack.pop()
+                if ready:
+                    values[node_] = getattr(self, node_.name)(node_)
+                elif node_ not in values:
+                    stack.append((node_, True))
+                    stack.extend(
+                        (n, False) for n in reversed(_subtree_nodes(node_))
+                    )
+            return values[node]
+        finally:
+            if not reuse:
+                self._values = None
+
+
+def _list_items(node):
+    """
+    Return the item nodes of *node*, an `attr_list` or `tree_list` node,
+    i.e. the first child of it and of each list node nested in it.
+    """
+    items = []
+    while True:
+        nodes = node.child_nodes
+        items.append(nodes[0])
+        if len(nodes) == 1:
+            return items
+        node = nodes[2]
+
+
+def _subtree_nodes(node):
+    """
+    Return the `tree`, `tree_list`, and `trees` nodes whose values make up
+    the value of *node*, itself one of those. For a `tree_list` node these
+    are the `tree` nodes it lists, rather than the `tree_list` node nested
+    in it.
+    """
+    if node.symbol == tree_list:
+        return _list_items(node)
+    return [n for n in node.child_nodes if n.symbol in _reusable_symbols]
@@ -35,6 +35,7 @@ URL = 'https://github.com/python-openxml/cxml'
 LICENSE = text_of('LICENSE')
 PACKAGES = find_packages(exclude=['tests', 'tests.*'])
 
+EXTRAS_REQUIRE = {'lxml': ['lxml'], 'numpy': ['numpy']}
 TEST_SUITE = 'tests'
 TESTS_REQUIRE = ['mock', 'pytest']
 
@@ -68,6 +69,7 @@ params = {
     'url':              URL,
     'license':          LICENSE,
     'packages':         PACKAGES,
+    'extras_require':   EXTRAS_REQUIRE,
     'tests_require':    TESTS_REQUIRE,
     'test_suite':       TEST_SUITE,
     'classifiers':      CLASSIFIERS,
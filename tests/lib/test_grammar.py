@@ -14,7 +14,8 @@ sys.path.insert(0, '.')
 import pytest
 
 from cxml.lib.grammar import (
-    NonterminalSymbol, Production, Productions, _Symbol, TerminalSymbol
+    Grammar, NonterminalSymbol, Production, Productions, Reduction, _Symbol,
+    TailSymbol, TerminalSymbol
 )
 
 
@@ -83,6 +84,21 @@ class DescribeNonterminalSymbol(object):
         assert nonterminal_symbol.is_terminal is False
 
 
+class DescribeTailSymbol(object):
+
+    def it_is_a_nonterminal(self):
+        tail_symbol = TailSymbol("expr'")
+        assert isinstance(tail_symbol, NonterminalSymbol)
+        assert tail_symbol.is_terminal is False
+
+    def it_knows_it_is_a_tail(self):
+        assert TailSymbol("expr'").is_tail is True
+        assert NonterminalSymbol('expr').is_tail is False
+
+    def it_assigns_symbol_ids_starting_at_2000(self):
+        assert TailSymbol("expr'") > 2000
+
+
 class DescribeProduction(object):
 
     def it_has_a_head(self):
@@ -126,6 +142,12 @@ class DescribeProductions(object):
         with pytest.raises(AttributeError):
             productions.new_attr = '9'
 
+    def it_knows_its_head_symbols(self):
+        productions = Productions((
+            Production(42, ()), Production(24, ()), Production(42, ()),
+        ))
+        assert productions.heads == [42, 24]
+
     # fixture --------------------------------------------------------
 
     @pytest.fixture(params=[
@@ -149,3 +171,124 @@ class DescribeProductions(object):
             (24, (4, 5, 6)),
         )
         return head_body_pairs
+
+
+class DescribeGrammar(object):
+
+    def it_knows_its_nullable_nonterminals(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (A, B)), (A, (a,)), (A, ()), (B, (b,)),
+        ))
+        assert grammar.nullable == frozenset([A])
+
+    def it_computes_the_first_set_of_each_nonterminal(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (A, B)), (A, (a,)), (A, ()), (B, (b,)),
+        ))
+        assert grammar.first_sets == {
+            S: frozenset([a, b]), A: frozenset([a]), B: frozenset([b])
+        }
+
+    def it_computes_the_first_set_of_a_symbol_sequence(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (A, B)), (A, (a,)), (A, ()), (B, (b,)),
+        ))
+        assert grammar.first((A, B)) == (frozenset([a, b]), False)
+        assert grammar.first((A, Reduction(S, 1))) == (frozenset([a]), True)
+
+    def it_computes_the_follow_set_of_each_nonterminal(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (A, B, c)), (S, (B, A)), (A, (a,)), (A, ()), (B, (b,)),
+        ))
+        assert grammar.follow_sets == {
+            S: frozenset(), A: frozenset([b]), B: frozenset([a, c])
+        }
+
+    def it_can_left_factor_a_common_prefix(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (a, b, c)), (S, (a, b)),
+        ))
+
+        productions = list(grammar.left_factored().productions)
+
+        assert len(productions) == 3
+        (s, tail, tail_2) = productions
+        assert (s.head, s.body[:2]) == (S, (a, b))
+        assert s.body[2].is_tail
+        assert (tail.head, tail.body) == (s.body[2], (c,))
+        assert (tail_2.head, tail_2.body) == (s.body[2], ())
+
+    def it_gives_each_tail_symbol_a_name_of_its_own(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (a, b)), (S, (a, c)), (S, (b, a)), (S, (b, c)),
+            (A, (c, a, b)), (A, (c, a, c)),
+        ))
+
+        productions = list(grammar.left_factored().productions)
+
+        names = [p.head.name for p in productions]
+        assert sorted(set(names)) == ['A', "A'", 'S', "S'", "S''"]
+
+    def it_substitutes_a_leading_nonterminal_to_expose_a_prefix(
+            self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (A, c)), (S, (a, c)), (A, (a, b)),
+        ))
+
+        productions = list(grammar.left_factored().productions)
+
+        s, a_, tail, tail_2 = productions
+        assert (s.head, s.body[0]) == (S, a)
+        assert (a_.head, a_.body) == (A, (a, b))
+        assert tail.body == (b, Reduction(A, 2), c)
+        assert tail_2.body == (c,)
+
+    def it_produces_a_conflict_free_table_for_an_ll1_grammar(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (A, c)), (S, (a, c)), (A, (a, b)),
+        ))
+        table = grammar.left_factored().ll1_table()
+        assert table.conflicts == []
+
+    def it_predicts_the_production_for_a_lookahead(self, symbols):
+        S, A, B, a, b, c = symbols
+        productions = Productions.from_seq(
+            (S, (a, A)), (A, (b,)), (A, ()),
+        )
+        s, a_b, a_empty = productions
+
+        table = Grammar(productions).ll1_table()
+
+        assert table.predict(S, a) is s
+        assert table.predict(A, b) is a_b
+        assert table.predict(A, c) is a_empty
+        assert table.predict(S, c) is None
+
+    def it_reports_conflicts_for_a_grammar_that_is_not_ll1(self, symbols):
+        S, A, B, a, b, c = symbols
+        grammar = Grammar(Productions.from_seq(
+            (S, (S, a)), (S, (b,)),
+        ))
+
+        conflicts = grammar.left_factored().ll1_table().conflicts
+
+        assert conflicts
+        conflict = conflicts[0]
+        assert conflict.terminal == b
+        assert len(conflict.productions) == 2
+
+    # fixture components ---------------------------------------------
+
+    @pytest.fixture
+    def symbols(self):
+        S, A, B = (NonterminalSymbol(n) for n in ('S', 'A', 'B'))
+        a, b, c = (TerminalSymbol(n) for n in ('a', 'b', 'c'))
+        return S, A, B, a, b, c
@@ -13,12 +13,26 @@ sys.path.insert(0, '.')
 
 import pytest
 
-from cxml.lib.grammar import _Symbol
-from cxml.lib.lexer import Lexer, Token
+from cxml.lib.grammar import SNTL, _Symbol, TerminalSymbol
+from cxml.lib.lexer import (
+    ByteToken, CharSet, DfaLexer, DfaTokenBuffer, Lexer, LexerSpec, Token,
+    TokenBuffer
+)
 
 from ..mocklib import class_mock, instance_mock
 
 
+A = TerminalSymbol('A')
+B = TerminalSymbol('B')
+
+
+def lexer_class(spec):
+    """
+    Return a |DfaLexer| subclass for *spec*.
+    """
+    return type(str('SpecLexer'), (DfaLexer,), {'spec': spec})
+
+
 class DescribeToken(object):
 
     def it_has_a_symbol(self):
@@ -42,6 +56,210 @@ class DescribeToken(object):
             token.new_attr = '9'
 
 
+class DescribeTokenBuffer(object):
+
+    def it_is_a_sequence_of_tokens(self, token_buffer):
+        assert len(token_buffer) == 3
+        token = token_buffer[2]
+        assert token.symbol is B
+        assert token.lexeme == 'bar'
+        assert token_buffer[-1].lexeme == 'bar'
+        assert [t.lexeme for t in token_buffer[1:]] == ['=', 'bar']
+        assert [t.value for t in token_buffer] == ['foo', '=', 'bar']
+
+    def it_raises_on_an_index_out_of_range(self, token_buffer):
+        with pytest.raises(IndexError):
+            token_buffer[3]
+
+    def it_provides_token_fields_without_creating_a_token(
+            self, token_buffer):
+        assert token_buffer.symbol_at(1) is B
+        assert token_buffer.span_at(1) == (4, 5)
+        assert token_buffer.lexeme_at(1) == '='
+
+    def it_slices_a_lexeme_only_when_asked_for(self, token_buffer):
+        token = token_buffer[0]
+        assert token._lexeme is None
+        assert token.lexeme == 'foo'
+        assert token._lexeme == 'foo'
+        assert repr(token) == "Token(A, 'foo')"
+
+    def it_decodes_a_lexeme_of_binary_input(self, binary_type):
+        token_buffer = TokenBuffer(binary_type(' ƒoo=bar'.encode('utf-8')))
+        token_buffer.append(A, 1, 5)
+        assert token_buffer.lexeme_at(0) == 'ƒoo'
+        assert token_buffer[0].lexeme == 'ƒoo'
+
+    def it_can_add_tokens_by_column(self, token_buffer):
+        token_buffer.extend_columns(
+            [int(A), int(B)], [9, 12], [12, 13], {int(A): A, int(B): B}
+        )
+        assert [token_buffer.symbol_at(i) for i in (3, 4)] == [A, B]
+        assert [token_buffer.span_at(i) for i in (3, 4)] == [(9, 12), (12, 13)]
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture
+    def token_buffer(self):
+        token_buffer = TokenBuffer(' foo=bar')
+        token_buffer.append(A, 1, 4)
+        token_buffer.append(B, 4, 5)
+        token_buffer.append(B, 5, 8)
+        return token_buffer
+
+
+class DescribeCharSet(object):
+
+    def it_contains_the_chars_it_names(self):
+        charset = CharSet('ab')
+        assert 'a' in charset
+        assert 'c' not in charset
+
+    def it_can_contain_all_chars_but_those_it_names(self):
+        charset = CharSet('ab', negated=True)
+        assert 'a' not in charset
+        assert 'ƒ' in charset
+
+    def it_can_name_ranges_of_chars(self):
+        charset = CharSet('ab', ranges=[(0x3b1, 0x3c9), (0x100, 0x17f)])
+        assert charset.ranges == ((0x100, 0x17f), (0x3b1, 0x3c9))
+        assert 'a' in charset
+        assert 'λ' in charset
+        assert 'ő' in charset
+        assert 'ƒ' not in charset
+        assert 'λ' not in CharSet('', negated=True, ranges=[(0x3b1, 0x3c9)])
+
+
+class DescribeLexerSpec(object):
+
+    def it_lexes_the_longest_match_by_the_first_rule(self, spec):
+        tokens = list(lexer_class(spec)('ab abb x xyz', emit_sntl=False))
+
+        assert [(t.symbol, t.lexeme) for t in tokens] == [
+            (A, 'ab'), (B, 'abb'), (B, 'x'), (A, 'xyz')
+        ]
+
+    def it_switches_and_falls_back_between_modes(self):
+        spec = LexerSpec()
+        spec.rule('start', [CharSet('a')], A, next_mode='b')
+        spec.mode('b', fallback='start')
+        spec.rule('b', [(CharSet('b'), '+')], B, next_mode='start')
+        spans = list(lexer_class(spec)('abbaab').iter_spans())
+
+        assert spans == [
+            (A, (0, 1)), (B, (1, 3)), (A, (3, 4)), (A, (4, 5)),
+            (B, (5, 6)), (SNTL, (6, 6))
+        ]
+
+    def it_partitions_chars_into_classes(self, spec):
+        class_map = spec.compile().class_map
+        assert class_map[ord('a')] != class_map[ord('x')]
+        assert class_map[ord('b')] != class_map[ord('z')]
+        assert class_map[ord('q')] == class_map[ord('ƒ')]
+
+    def it_places_chars_named_by_range_in_classes(self):
+        spec = LexerSpec()
+        spec.rule('start', [(CharSet(' '), '+')])
+        spec.rule('start', [(CharSet('a', ranges=[(0x3b1, 0x3c9)]), '+')], A)
+        spec.rule('start', [(CharSet('-', ranges=[(0x3c0, 0x3ff)]), '+')], B)
+
+        tokens = list(lexer_class(spec)('aαβ πϐ-', emit_sntl=False))
+
+        assert [(t.symbol, t.lexeme) for t in tokens] == [
+            (A, 'aαβ'), (B, 'πϐ-')
+        ]
+        class_map = spec.compile().class_map
+        assert class_map[ord('α')] != class_map[ord('π')]
+        assert class_map[ord('α')] == class_map[ord('β')]
+        with pytest.raises(SyntaxError):
+            list(lexer_class(spec)('aƒ'))
+
+    def it_raises_on_an_invalid_spec(self, invalid_fixture):
+        spec = invalid_fixture
+        with pytest.raises(ValueError):
+            spec.compile()
+
+    def it_raises_on_an_invalid_quantifier(self):
+        with pytest.raises(ValueError):
+            LexerSpec().rule('start', [(CharSet('a'), '{2}')], A)
+
+    def it_raises_on_an_error_rule_match_or_no_match(self, spec):
+        spec.rule('start', [CharSet('!')], error='bang')
+        SpecLexer = lexer_class(spec)
+        with pytest.raises(SyntaxError) as e:
+            list(SpecLexer('ab!'))
+        assert str(e.value) == 'bang'
+
+        with pytest.raises(SyntaxError) as e:
+            list(SpecLexer('ab?'))
+        assert str(e.value) == "at character '?' in 'ab?'"
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=['empty-match', 'no-start', 'no-mode', 'cycle'])
+    def invalid_fixture(self, request):
+        spec = LexerSpec()
+        if request.param == 'empty-match':
+            spec.rule('start', [(CharSet('a'), '*')], A)
+        elif request.param == 'no-start':
+            spec.rule('other', [CharSet('a')], A)
+        elif request.param == 'no-mode':
+            spec.rule('start', [CharSet('a')], A, next_mode='other')
+        else:
+            spec.mode('start', fallback='other')
+            spec.mode('other', fallback='start')
+            spec.rule('start', [CharSet('a')], A)
+        return spec
+
+    @pytest.fixture
+    def spec(self):
+        spec = LexerSpec()
+        spec.rule('start', [(CharSet(' '), '+')])
+        spec.rule(
+            'start', [CharSet('ax'), (CharSet('xyz'), '?'), CharSet('bz')], A
+        )
+        spec.rule('start', [CharSet('ax'), (CharSet('b'), '*')], B)
+        return spec
+
+
+class DescribeDfaTokenBuffer(object):
+
+    def it_knows_how_many_tokens_an_edit_leaves_unaffected(self, buffer_):
+        assert buffer_.unaffected_count(0) == 0
+        assert buffer_.unaffected_count(3) == 0
+        assert buffer_.unaffected_count(4) == 1
+        assert buffer_.unaffected_count(5) == 1
+        assert buffer_.unaffected_count(6) == 2
+
+    def it_knows_the_lexer_state_after_a_token(self, buffer_):
+        assert buffer_.resume_state(0) == (0, None, 0)
+        assert buffer_.resume_state(2) == (5, 0, 6)
+
+    def it_can_find_where_the_lexer_resumed(self, buffer_):
+        assert buffer_.resync_index(3, 1) == 1
+        assert buffer_.resync_index(3, 0) is None
+        assert buffer_.resync_index(4, 1) is None
+
+    def it_can_add_the_tokens_of_another_buffer(self, buffer_):
+        token_buffer = DfaTokenBuffer(' bar=foo', emit_sntl=False)
+        token_buffer.extend_lexed([(A, 1, 4, 4, 1, 5)])
+
+        token_buffer.extend_from(buffer_, 1, 2, 3)
+
+        assert token_buffer.span_at(1) == (6, 8)
+        assert token_buffer.symbol_at(1) is B
+        assert token_buffer.resume_state(2) == (8, 0, 9)
+        assert token_buffer.lexed_count == 2
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture
+    def buffer_(self):
+        token_buffer = DfaTokenBuffer('foo=b', emit_sntl=False)
+        token_buffer.extend_lexed([(A, 0, 3, 3, 1, 4), (B, 3, 5, 5, 0, 6)])
+        return token_buffer
+
+
 class DescribeLexer(object):
 
     def it_can_peek_at_the_next_input_character(self, peek_fixture):
@@ -69,6 +287,63 @@ class DescribeLexer(object):
         lexer._accept_until('=')
         assert lexer._pos == 5
 
+    def it_reads_a_character_for_each_byte_of_binary_input(
+            self, binary_type):
+        lexer = Lexer(binary_type(b'x:foo="b\xc6\x92r"'))
+        assert lexer._peek == 'x'
+        lexer._accept_until('=')
+        assert lexer._pos == 5
+        assert lexer._next() == '='
+        lexer._ignore()
+        lexer._skip()
+        lexer._accept_until('"')
+        assert lexer._pos == 11
+        lexer._accept_run('"')
+        assert lexer._next() is None
+
+    def it_can_accept_a_whole_character_of_binary_input(self, binary_type):
+        lexer = Lexer(binary_type('ƒ中x'.encode('utf-8')))
+        assert lexer._peek_char == 'ƒ'
+        lexer._accept_char()
+        assert (lexer._pos, lexer._peek_char) == (2, '中')
+        lexer._accept_char()
+        assert (lexer._pos, lexer._peek_char) == (5, 'x')
+        lexer._accept_char()
+        assert lexer._peek_char is None
+
+    def it_raises_on_a_character_that_is_not_utf8(self):
+        lexer = Lexer(b'\xc6x')
+        with pytest.raises(SyntaxError) as e:
+            lexer._peek_char
+        assert str(e.value) == "invalid UTF-8 (byte 0) in '\ufffdx'"
+
+    def it_shows_only_the_input_around_an_error(self):
+        lexer = Lexer('%s?%s' % ('a' * 100, 'b' * 100))
+        lexer._pos = 100
+        assert str(lexer._syntax_error('bang')) == "bang in '...%s?%s...'" % (
+            'a' * 40, 'b' * 40
+        )
+
+    def it_keeps_whole_characters_around_an_error_in_binary_input(self):
+        lexer = Lexer(('\u00e9' * 30 + '?' + '\u00e9' * 30).encode('utf-8'))
+        lexer._pos = 60
+        assert str(lexer._syntax_error('bang')) == (
+            "bang (byte 60) in '...%s?%s...'" % ('\u00e9' * 20, '\u00e9' * 20)
+        )
+
+    def it_emits_a_token_decoding_its_lexeme_only_when_used(
+            self, binary_type):
+        lexer = Lexer(binary_type('fooƒ'.encode('utf-8')))
+        lexer._pos = 5
+
+        lexer._emit(A)
+
+        token = lexer._tokens[-1]
+        assert isinstance(token, ByteToken)
+        assert token._lexeme is None
+        assert token.lexeme == 'fooƒ'
+        assert token._lexeme == 'fooƒ'
+
     def it_can_discard_its_current_lexeme(self):
         lexer = Lexer('foobar')
         lexer._pos = 3
@@ -159,3 +434,8 @@ class DescribeLexer(object):
     @pytest.fixture
     def token_(self, request):
         return instance_mock(request, Token)
+
+
+@pytest.fixture(params=[bytes, bytearray])
+def binary_type(request):
+    return request.param
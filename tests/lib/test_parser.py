@@ -0,0 +1,142 @@
+# encoding: utf-8
+
+"""
+Test suite for parselib.parser module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+sys.path.insert(0, '.')
+
+import pytest
+
+from cxml.lexer import CxmlRegexLexer
+from cxml.lib.grammar import (
+    Grammar, NonterminalSymbol, Productions, TerminalSymbol
+)
+from cxml.lib.lexer import Token, TokenBuffer
+from cxml.lib.parser import PredictiveParser, TokenStream
+
+
+class DescribePredictiveParser(object):
+
+    def it_raises_when_the_grammar_is_not_ll1(self):
+        S, a = NonterminalSymbol('S'), TerminalSymbol('a')
+        table = Grammar(Productions.from_seq(
+            (S, (a,)), (S, (a, a)),
+        )).ll1_table()
+        with pytest.raises(ValueError):
+            PredictiveParser(None, table)
+
+
+class DescribeTokenStream(object):
+
+    def it_can_peek_at_the_current_token(self, peek_fixture):
+        tokens, pos, expected_value = peek_fixture
+        token_stream = TokenStream(tokens)
+        token_stream.reset(pos)
+        assert token_stream.peek() == expected_value
+
+    def it_can_advance_past_the_current_token(self):
+        token_stream = TokenStream(['a', 'b'])
+        token_stream.advance()
+        assert token_stream.peek() == 'b'
+        assert len(token_stream) == 1
+
+    def it_can_backtrack_to_a_marked_position(self):
+        token_stream = TokenStream(['a', 'b', 'c'])
+        token_stream.advance()
+        mark = token_stream.mark()
+        token_stream.advance()
+        token_stream.advance()
+
+        token_stream.reset(mark)
+
+        assert token_stream.peek() == 'b'
+        assert token_stream.remaining == ['b', 'c']
+
+    def it_knows_when_all_tokens_are_consumed(self):
+        token_stream = TokenStream(['a'])
+        assert token_stream.at_end is False
+        token_stream.advance()
+        assert token_stream.at_end is True
+        assert token_stream.remaining == []
+
+    def it_accepts_any_iterable_of_tokens(self):
+        token_stream = TokenStream(iter(['a', 'b']))
+        assert len(token_stream) == 2
+
+    def it_pulls_tokens_from_an_iterator_only_as_needed(self, monkeypatch):
+        monkeypatch.setattr(TokenStream, 'chunk_size', 2)
+        pulled = []
+
+        def tokens():
+            for token in 'abcdefg':
+                pulled.append(token)
+                yield token
+
+        token_stream = TokenStream(tokens())
+        assert token_stream.peek() == 'a'
+        assert pulled == ['a', 'b']
+        token_stream.advance()
+        token_stream.advance()
+        assert token_stream.peek() == 'c'
+        assert pulled == ['a', 'b', 'c', 'd']
+
+        token_stream.reset(0)
+        assert token_stream.peek() == 'a'
+        assert token_stream.remaining == list('abcdefg')
+        token_stream.reset(7)
+        assert token_stream.at_end is True
+
+    def it_does_not_copy_the_token_sequence_as_it_advances(self):
+        tokens = ['a', 'b', 'c']
+        token_stream = TokenStream(tokens)
+        token_stream.advance()
+        assert token_stream._tokens is tokens
+
+    def it_reads_a_token_buffer_in_place(self):
+        a = TerminalSymbol('a')
+        token_buffer = TokenBuffer('xy')
+        token_buffer.append(a, 0, 1)
+        token_buffer.append(a, 1, 2)
+
+        token_stream = TokenStream(token_buffer)
+        token_stream.advance()
+
+        assert token_stream._tokens is token_buffer
+        assert token_stream.peek_symbol() is a
+        assert token_stream.peek().lexeme == 'y'
+        token_stream.advance()
+        assert token_stream.peek_symbol() is None
+
+    def it_lexes_a_long_input_into_a_token_buffer(self):
+        short_input = 'foo/bar'
+        long_input = '/'.join(['foo'] * TokenStream.buffer_threshold)
+
+        short_stream = TokenStream.from_lexer(CxmlRegexLexer(short_input))
+        long_stream = TokenStream.from_lexer(CxmlRegexLexer(long_input))
+
+        assert isinstance(short_stream._tokens, list)
+        assert isinstance(long_stream._tokens, TokenBuffer)
+
+    def it_can_peek_at_the_current_token_class(self):
+        a = TerminalSymbol('a')
+        token_stream = TokenStream([Token(a, 'x')])
+        assert token_stream.peek_symbol() is a
+        token_stream.advance()
+        assert token_stream.peek_symbol() is None
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        (['a', 'b'], 0, 'a'),
+        (['a', 'b'], 1, 'b'),
+        (['a', 'b'], 2, None),
+        ([],         0, None),
+    ])
+    def peek_fixture(self, request):
+        return request.param
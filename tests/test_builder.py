@@ -0,0 +1,99 @@
+# encoding: utf-8
+
+"""
+Test suite for cxml builder module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+sys.path.insert(0, '.')
+
+import pytest
+
+from cxml.builder import CxmlBuilder
+from cxml.lexer import CxmlLexer, CxmlRegexLexer
+from cxml.lib.parser import TokenStream
+from cxml.parser import CxmlParser
+from cxml.symbols import root
+from cxml.translator import CxmlTranslator
+
+
+class DescribeCxmlBuilder(object):
+
+    def it_builds_the_same_graph_as_the_translator(self, build_fixture):
+        cxml = build_fixture
+        root_element = CxmlBuilder(CxmlRegexLexer(cxml)).build()
+        assert root_element.xml == translate(cxml).xml
+
+    def it_builds_the_same_graph_from_a_token_buffer(
+            self, build_fixture, monkeypatch):
+        cxml = build_fixture
+        monkeypatch.setattr(TokenStream, 'buffer_threshold', 0)
+        for lexer in (CxmlRegexLexer(cxml), CxmlLexer(cxml)):
+            root_element = CxmlBuilder(lexer).build()
+            assert root_element.xml == translate(cxml).xml
+
+    def it_accepts_tokens_from_any_cxml_lexer(self):
+        cxml = 'w:r/(w:rPr/w:b,w:t"foo")'
+        root_element = CxmlBuilder(CxmlLexer(cxml)).build()
+        assert root_element.xml == translate(cxml).xml
+
+    def it_raises_on_a_syntax_error(self, error_fixture):
+        cxml = error_fixture
+        with pytest.raises(SyntaxError):
+            CxmlBuilder(CxmlRegexLexer(cxml)).build()
+
+    @pytest.mark.parametrize('count', [1000, 4000])
+    def it_raises_before_lexing_the_rest_of_input(self, count):
+        cxml = 'foo/)%s!' % ('x,' * count)
+        with pytest.raises(SyntaxError) as e:
+            CxmlBuilder(CxmlRegexLexer(cxml)).build()
+        assert str(e.value).startswith("in '")
+
+    def it_can_build_beyond_the_recursion_limit(self, stress_fixture):
+        cxml, child_count = stress_fixture
+        root_element = CxmlBuilder(CxmlRegexLexer(cxml)).build()
+        assert len(root_element._children) == child_count
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        'foobar',
+        'w:rPr{r:,w:}',
+        'w:rPr{w:val=-48.7, b=c}',
+        'w:t{a=b}bar',
+        'foo{a=b}" ba r "',
+        'foo/(bar/(baz,baz),bar)',
+        'foo/(bar/(baz/(a,b),c),d/e/f)',
+        'w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foobar,w:r{r:id=3})',
+        'foo/w:bar{w:}',
+    ])
+    def build_fixture(self, request):
+        return request.param
+
+    @pytest.fixture(params=[
+        'w:', 'w:rPr{', 'w:rPr/', 'foo/(bar', 'foo/(bar,)', 'foo/bar)',
+        'w:rPr{w:b=1,}', 'w:rPr{w:b}', 'w:rPr{w:b=}', 'foo"bar"baz',
+        'foo/(bar)baz',
+    ])
+    def error_fixture(self, request):
+        return request.param
+
+    @pytest.fixture(params=['wide', 'deep'])
+    def stress_fixture(self, request):
+        n = sys.getrecursionlimit() * 2
+        if request.param == 'wide':
+            return 'w:p/(%s)' % ','.join(['w:r/w:t"x"'] * n), n
+        return '/'.join(['w:sdt'] * n), 1
+
+
+def translate(cxml):
+    """
+    Return the |RootElement| object produced from *cxml* by CxmlParser and
+    CxmlTranslator.
+    """
+    root_ast = CxmlParser(CxmlLexer(cxml)).parse(root)
+    return CxmlTranslator.translate(root_ast)
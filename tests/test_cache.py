@@ -0,0 +1,193 @@
+# encoding: utf-8
+
+"""
+Test suite for cxml cache module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import threading
+
+from cxml.cache import CacheInfo, DiskCache, XmlCache
+
+
+class DescribeDiskCache(object):
+
+    def it_returns_a_stored_value(self, tmpdir):
+        cache = DiskCache(str(tmpdir))
+        cache.put('foo', '<foo a="ƒ"/>')
+        assert cache.get('foo') == '<foo a="ƒ"/>'
+        assert cache.get('bar') is None
+
+    def it_persists_values_across_instances(self, tmpdir):
+        DiskCache(str(tmpdir), 'v1').put('foo', '<foo/>')
+        assert DiskCache(str(tmpdir), 'v1').get('foo') == '<foo/>'
+
+    def it_does_not_find_values_stored_with_another_salt(self, tmpdir):
+        DiskCache(str(tmpdir), 'v1').put('foo', '<foo/>')
+        assert DiskCache(str(tmpdir), 'v2').get('foo') is None
+
+    def it_replaces_a_stored_value(self, tmpdir):
+        cache = DiskCache(str(tmpdir))
+        cache.put('foo', '<foo/>')
+        cache.put('foo', '<bar/>')
+        assert cache.get('foo') == '<bar/>'
+
+    def it_leaves_no_temporary_files_behind(self, tmpdir):
+        cache = DiskCache(str(tmpdir))
+        for i in range(20):
+            cache.put('%d' % i, '<foo/>')
+        paths = [
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(str(tmpdir))
+            for filename in filenames
+        ]
+        assert len(paths) == 20
+        assert all(path.endswith('.xml') for path in paths)
+
+    def it_ignores_a_failure_to_write(self, tmpdir):
+        path = tmpdir.join('file')
+        path.write('')
+        cache = DiskCache(str(path))
+        cache.put('foo', '<foo/>')
+        assert cache.get('foo') is None
+
+    def it_treats_an_entry_that_is_not_utf8_as_missing(self, tmpdir):
+        cache = DiskCache(str(tmpdir))
+        cache.put('foo', '<foo a="ƒ"/>')
+        with open(cache._path('foo'), 'wb') as f:
+            f.write('<foo a="ƒ"/>'.encode('utf-8')[:-4])
+        assert cache.get('foo') is None
+
+    def it_can_clear_its_entries(self, tmpdir):
+        cache = DiskCache(str(tmpdir.join('cache')))
+        cache.put('foo', '<foo/>')
+        cache.clear()
+        assert cache.get('foo') is None
+
+    def it_can_be_shared_by_concurrent_writers(self, tmpdir):
+        caches = [DiskCache(str(tmpdir)) for _ in range(8)]
+        # a failed assert in a thread is not reported, so the results and
+        # errors are gathered to be checked here
+        results, errors = [], []
+
+        def work(cache):
+            try:
+                for i in range(50):
+                    cache.put('%d' % (i % 10), '<x%d/>' % (i % 10))
+                    results.append((i % 10, cache.get('%d' % (i % 10))))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(c,)) for c in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(results) == 8 * 50
+        for i, value in results:
+            assert value in (None, '<x%d/>' % i)
+        for i in range(10):
+            assert caches[0].get('%d' % i) == '<x%d/>' % i
+
+
+class DescribeXmlCache(object):
+
+    def it_returns_a_cached_value(self):
+        cache = XmlCache()
+        cache.put('foo', '<foo/>')
+        assert cache.get('foo') == '<foo/>'
+        assert cache.get('bar') is None
+
+    def it_evicts_the_least_recently_used_entry_beyond_maxsize(self):
+        cache = XmlCache(maxsize=2)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+
+        cache.put('c', 'C')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 'A'
+        assert cache.get('c') == 'C'
+
+    def it_evicts_entries_to_stay_within_maxbytes(self):
+        cache = XmlCache(maxbytes=10)
+        cache.put('a', 'x' * 4)
+        cache.put('b', 'ƒ' * 2)  # 4 bytes in UTF-8
+        cache.put('c', 'x' * 4)
+
+        assert cache.get('a') is None
+        assert cache.info().currbytes == 8
+
+    def it_does_not_cache_a_value_larger_than_maxbytes(self):
+        cache = XmlCache(maxbytes=4)
+        cache.put('a', 'x' * 5)
+        assert cache.get('a') is None
+        assert cache.info().currsize == 0
+
+    def it_replaces_the_value_for_an_existing_key(self):
+        cache = XmlCache()
+        cache.put('a', 'xx')
+        cache.put('a', 'y')
+        assert cache.get('a') == 'y'
+        assert cache.info().currbytes == 1
+
+    def it_reports_its_statistics(self):
+        cache = XmlCache(maxsize=1, maxbytes=100)
+        cache.put('a', 'A')
+        cache.get('a')
+        cache.get('b')
+        cache.put('b', 'BB')
+
+        assert cache.info() == CacheInfo(
+            hits=1, misses=1, evictions=1, maxsize=1, maxbytes=100,
+            currsize=1, currbytes=2
+        )
+
+    def it_can_clear_its_entries_and_statistics(self):
+        cache = XmlCache()
+        cache.put('a', 'A')
+        cache.get('a')
+
+        cache.clear()
+
+        assert cache.get('a') is None
+        assert cache.info()[:3] == (0, 1, 0)
+
+    def it_is_safe_to_use_from_multiple_threads(self):
+        cache = XmlCache(maxsize=50)
+        errors = []
+
+        def work(n):
+            try:
+                for i in range(2000):
+                    key = '%d' % ((i * n) % 80)
+                    if cache.get(key) is None:
+                        cache.put(key, key * 3)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=work, args=(n,)) for n in range(1, 9)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        info = cache.info()
+        assert info.hits + info.misses == 8 * 2000
+        assert info.currsize <= 50
+        assert info.currbytes == sum(
+            len(v) for v, _ in cache._entries.values()
+        )
@@ -8,6 +8,7 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+import multiprocessing
 import os
 
 # import sys
@@ -15,8 +16,12 @@ import os
 
 import pytest
 
+from cxml import (
+    _pool_lock, _worker_pool, cache_clear, cache_info, set_cache_dir, xml,
+    xml_many,
+)
 
-from cxml import xml
+from .mocklib import call, function_mock
 
 
 def snippet_seq(name):
@@ -54,8 +59,121 @@ class DescribeCxmlModule(object):
         cxml, expected_xml = cxml_fixture
         assert xml(cxml) == expected_xml
 
+    def it_can_translate_cxml_to_XML_directly(self, cxml_fixture):
+        cxml, expected_xml = cxml_fixture
+        assert xml(cxml, engine='direct') == expected_xml
+
+    @pytest.mark.parametrize('engine', ['ast', 'direct'])
+    def it_can_translate_a_very_deep_or_wide_expression(self, engine):
+        wide = 'w:p/(%s)' % ','.join(['w:r/w:t"x"'] * 5000)
+        deep = 'a/' * 3000 + 'b'
+
+        wide_xml = xml(wide, engine)
+        deep_xml = xml(deep, engine)
+
+        assert wide_xml.count('<w:t>x</w:t>') == 5000
+        assert deep_xml.count('<a>') == 3000
+
+    def it_raises_on_an_unknown_engine(self):
+        with pytest.raises(ValueError):
+            xml('foobar', engine='foo')
+
+    def it_caches_the_xml_for_each_expression(self, _translate_):
+        _translate_.return_value = '<foo/>\n'
+
+        xml_ = xml('foo')
+        xml_2 = xml('foo')
+
+        _translate_.assert_called_once_with('foo', 'ast')
+        assert xml_ is xml_2
+        assert cache_info()[:2] == (1, 1)
+
+    def it_caches_the_xml_from_each_engine_separately(self, _translate_):
+        _translate_.side_effect = ['<foo/>\n', '<foo></foo>\n']
+
+        xml_ = xml('foo')
+        xml_2 = xml('foo', engine='direct')
+
+        assert _translate_.call_args_list == [
+            call('foo', 'ast'), call('foo', 'direct')
+        ]
+        assert (xml_, xml_2) == ('<foo/>\n', '<foo></foo>\n')
+        assert xml('foo', engine='direct') is xml_2
+
+    def it_can_clear_its_cache(self):
+        xml('foo')
+        cache_clear()
+        assert cache_info().currsize == 0
+        assert cache_info().misses == 0
+
+    def it_can_persist_its_cache_in_a_directory(self, tmpdir, _translate_):
+        _translate_.return_value = '<foo/>\n'
+        set_cache_dir(str(tmpdir))
+
+        xml('foo')
+        cache_clear()
+        xml_ = xml('foo')
+
+        _translate_.assert_called_once_with('foo', 'ast')
+        assert xml_ == '<foo/>\n'
+        assert len(tmpdir.listdir()) == 1
+
+    def it_can_translate_many_expressions(self, workers):
+        expressions = [
+            'foo', 'w:rPr{w:b=on}', 'foo/(bar', 'foo/bar', 'w:', 'bar'
+        ] * 20
+
+        results = xml_many(expressions, workers=workers, chunksize=4)
+
+        assert len(results) == len(expressions)
+        for cxml, result in zip(expressions, results):
+            if cxml in ('foo/(bar', 'w:'):
+                assert isinstance(result, SyntaxError)
+            else:
+                assert result == xml(cxml)
+
+    def it_keeps_its_worker_pool_for_the_next_batch(self):
+        pool = _worker_pool(2)
+        assert _worker_pool(2) is pool
+        assert _worker_pool(3) is not pool
+
+    def it_holds_its_worker_pool_while_mapping(self, request):
+        def imap(func, iterable, chunksize):
+            assert _pool_lock.locked()
+            return map(func, iterable)
+
+        _worker_pool_ = function_mock(request, 'cxml._worker_pool')
+        _worker_pool_.return_value.imap.side_effect = imap
+
+        results = xml_many(['foo', 'bar'], workers=2)
+
+        _worker_pool_.assert_called_once_with(2)
+        assert results == [xml('foo'), xml('bar')]
+        assert not _pool_lock.locked()
+
+    def it_can_translate_many_expressions_in_a_pool_it_is_given(self):
+        pool = multiprocessing.Pool(2)
+        try:
+            results = xml_many(['foo', 'w:'], pool=pool)
+            assert results[0] == xml('foo')
+            assert isinstance(results[1], SyntaxError)
+            assert pool.apply(len, ('foo',)) == 3
+        finally:
+            pool.close()
+            pool.join()
+
+    def it_raises_on_an_unknown_engine_for_many(self):
+        with pytest.raises(ValueError):
+            xml_many(['foo'], engine='foo', workers=1)
+
     # fixtures -------------------------------------------------------
 
+    @pytest.fixture(autouse=True)
+    def clear_cache(self, request):
+        cache_clear()
+        set_cache_dir(None)
+        request.addfinalizer(lambda: set_cache_dir(None))
+
     @pytest.fixture(params=[
         (0,  'foobar'),
         (1,  ' w : rPr'),
@@ -86,3 +204,13 @@ class DescribeCxmlModule(object):
     def cxml_fixture(self, request):
         snippet_idx, cxml = request.param
         return cxml, '%s\n' % snippets[snippet_idx].strip()
+
+    @pytest.fixture(params=[1, 2])
+    def workers(self, request):
+        return request.param
+
+    # fixture components ---------------------------------------------
+
+    @pytest.fixture
+    def _translate_(self, request):
+        return function_mock(request, 'cxml._translate')
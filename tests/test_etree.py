@@ -0,0 +1,178 @@
+# encoding: utf-8
+
+"""
+Test suite for cxml.etree module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+sys.path.insert(0, '.')
+
+import re
+
+from xml.etree import ElementTree
+
+import pytest
+
+from cxml import element, xml
+from cxml.builder import CxmlBuilder
+from cxml.lexer import CxmlRegexLexer
+from cxml.etree import (
+    ElementFactory, EtreeBuilder, clark_name, etree, have_lxml
+)
+
+from .mocklib import method_mock, var_mock
+
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class DescribeEtreeBuilder(object):
+
+    def it_builds_the_same_lxml_tree_as_parsing_the_xml(self, cxml):
+        lxml_etree = pytest.importorskip('lxml.etree')
+        root = EtreeBuilder().build(root_element(cxml))
+        assert lxml_etree.tostring(root, encoding='unicode') == compact(
+            xml(cxml)
+        )
+
+    def it_builds_an_ElementTree_tree_when_asked(self, cxml):
+        root = EtreeBuilder(ElementTree).build(root_element(cxml))
+        assert isinstance(root, ElementTree.Element)
+        expected = ElementTree.fromstring(compact(xml(cxml)))
+        assert signature(root) == signature(expected)
+
+    def it_can_build_a_very_deep_tree(self):
+        cxml = '/'.join(['w:p'] * 3000)
+        root = EtreeBuilder(ElementTree).build(root_element(cxml))
+        assert len(list(root.iter())) == 3000
+
+    @pytest.mark.parametrize('qname, expected_value', [
+        ('foo', 'foo'),
+        ('w:p', W + 'p'),
+        ('xml:space', '{http://www.w3.org/XML/1998/namespace}space'),
+    ])
+    def it_can_form_a_clark_name(self, qname, expected_value):
+        assert clark_name(qname) == expected_value
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        'foobar',
+        'w:rPr{w:b=on}',
+        'w:rPr{r:,w:b=on}',
+        'w:rPr{w:val=-48.7, b=c}',
+        'foo/(bar/baz,bar)',
+        'foo{a=b} ba r ',
+        'w:t{xml:space=preserve} foo ',
+        'w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foobar,w:r{r:id=3})',
+        'w:p/(w:r{r:}/r:x,w:r)',
+        'wp:inline/(wp:extent{cx=333,cy=666},a:graphic/a:graphicData/pic:'
+        'pic/pic:spPr/a:xfrm/a:ext{cx=333,cy=666})',
+    ])
+    def cxml(self, request):
+        return request.param
+
+
+class DescribeElementFactory(object):
+
+    def it_provides_the_element_tree_for_an_expression(self):
+        root = ElementFactory().element('w:p{w:a=1}/(w:r/w:t"foo",w:r)')
+        assert root.tag == W + 'p'
+        assert root.get(W + 'a') == '1'
+        assert root.text is None
+        assert [child.tag for child in root] == [W + 'r', W + 'r']
+        assert root[0][0].text == 'foo'
+        assert all(e.tail is None for e in root.iter())
+
+    def it_builds_each_expression_only_once(self, build_):
+        build_.return_value = etree.Element('foo')
+        factory = ElementFactory()
+
+        factory.element('foo')
+        factory.element('foo')
+
+        assert build_.call_count == 1
+        assert factory.cache_info()[:2] == (1, 1)
+
+    def it_provides_a_copy_the_caller_can_modify(self):
+        factory = ElementFactory()
+        root = factory.element('foo/bar')
+        root.remove(root[0])
+        root.set('a', 'b')
+
+        root_2 = factory.element('foo/bar')
+
+        assert root_2 is not root
+        assert len(root_2) == 1
+        assert root_2.get('a') is None
+
+    def it_can_clear_its_cache(self):
+        factory = ElementFactory()
+        factory.element('foo')
+        factory.cache_clear()
+        assert factory.cache_info().currsize == 0
+
+    def it_is_available_from_the_cxml_module(self):
+        assert element('foo{a=b}').get('a') == 'b'
+
+    def it_provides_an_lxml_element_when_lxml_is_installed(self):
+        lxml_etree = pytest.importorskip('lxml.etree')
+        assert have_lxml
+        root = element('w:p/w:r')
+        assert isinstance(root, lxml_etree._Element)
+        assert lxml_etree.tostring(root, encoding='unicode') == (
+            xml('w:p/w:r').replace('\n', '').replace('  ', '')
+        )
+
+    @pytest.mark.parametrize('cxml', [
+        'foo{a=b} ba r ',
+        'w:t{xml:space=preserve} foo ',
+        'w:p{w:a=1}/(w:r{r:id=1}/w:t"foo",w:r)',
+        'w:p/(w:r{r:}/r:x,w:r)',
+    ])
+    def it_provides_an_ElementTree_element_without_lxml(
+            self, cxml, without_lxml_):
+        root = ElementFactory().element(cxml)
+        assert isinstance(root, ElementTree.Element)
+        expected = ElementTree.fromstring(compact(xml(cxml)))
+        assert signature(root) == signature(expected)
+
+    # fixture components ---------------------------------------------
+
+    @pytest.fixture
+    def build_(self, request):
+        return method_mock(request, EtreeBuilder, 'build')
+
+    @pytest.fixture
+    def without_lxml_(self, request):
+        var_mock(request, 'cxml.etree.have_lxml', new=False)
+        var_mock(request, 'cxml.etree.etree', new=ElementTree)
+
+
+# helpers ------------------------------------------------------------
+
+def compact(xml):
+    """
+    Return *xml* without the newlines and indentation used to pretty-print
+    it.
+    """
+    return re.sub(r'\n *', '', xml)
+
+
+def root_element(cxml):
+    return CxmlBuilder(CxmlRegexLexer(cxml)).build()
+
+
+def signature(element):
+    """
+    Return a nested tuple of the tag, attributes, text, and children of
+    *element*, for comparing trees.
+    """
+    return (
+        element.tag, sorted(element.attrib.items()), element.text or '',
+        [signature(child) for child in element],
+    )
@@ -0,0 +1,109 @@
+# encoding: utf-8
+
+"""
+Test suite for cxml.events module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+sys.path.insert(0, '.')
+
+import io
+import re
+
+from xml.sax.saxutils import XMLGenerator
+
+import pytest
+
+from cxml import iterevents, saxify, xml
+from cxml.builder import CxmlBuilder
+from cxml.events import CxmlEventParser
+from cxml.lexer import CxmlRegexLexer
+from cxml.model import nsmap
+
+
+W = nsmap['w']
+R = nsmap['r']
+
+
+class DescribeIterevents(object):
+
+    def it_generates_the_parse_events_in_document_order(self):
+        events = list(iterevents('w:p{w:a=1}/(w:r"foo",r:x/(y,z))'))
+        assert events == [
+            ('start', 'w:p', [('w:a', '1')], [('w', W), ('r', R)]),
+            ('start', 'w:r', [], []),
+            ('text', 'foo'),
+            ('end', 'w:r'),
+            ('start', 'r:x', [], []),
+            ('start', 'y', [], []),
+            ('end', 'y'),
+            ('start', 'z', [], []),
+            ('end', 'z'),
+            ('end', 'r:x'),
+            ('end', 'w:p'),
+        ]
+
+    def it_declares_the_same_namespaces_as_the_xml(self, cxml):
+        root_element = CxmlBuilder(CxmlRegexLexer(cxml)).build()
+        nsdecls = next(iterevents(cxml))[3]
+        assert [nspfx for nspfx, _ in nsdecls] == root_element.nspfxs
+
+    def it_omits_a_root_namespace_declared_in_a_descendant(self):
+        nsdecls = next(iterevents('w:p/(w:r{r:}/r:x,r:y)'))[3]
+        assert nsdecls == [('w', W)]
+
+    def it_can_generate_the_events_of_a_very_deep_tree(self):
+        cxml = '/'.join(['w:p'] * 5000)
+        events = list(iterevents(cxml))
+        assert len(events) == 10000
+        assert events[-1] == ('end', 'w:p')
+
+    @pytest.mark.parametrize('cxml, exception_type', [
+        ('foo/(bar', SyntaxError),
+        ('foo/bar)', SyntaxError),
+        ('w:', SyntaxError),
+    ])
+    def it_raises_on_a_syntax_error(self, cxml, exception_type):
+        with pytest.raises(exception_type):
+            list(iterevents(cxml))
+
+
+class DescribeCxmlEventParser(object):
+
+    def it_declares_only_explicit_root_namespaces_by_default(self):
+        events = CxmlEventParser(CxmlRegexLexer('w:p{r:}/a:b')).events()
+        assert next(events) == ('start', 'w:p', [], [('r', R)])
+
+
+class DescribeSaxAdapter(object):
+
+    def it_feeds_the_events_to_a_sax_content_handler(self, cxml):
+        out = io.BytesIO()
+        saxify(cxml, XMLGenerator(out, 'utf-8'))
+        xml_decl, sax_xml = out.getvalue().decode('utf-8').split('?>\n', 1)
+        # XMLGenerator writes an empty element as a start and end tag pair
+        expected = re.sub(
+            r'<([^\s/>]+)([^>]*)/>', r'<\1\2></\1>',
+            re.sub(r'\n *', '', xml(cxml))
+        )
+        assert sax_xml == expected
+
+
+# fixtures -----------------------------------------------------------
+
+@pytest.fixture(params=[
+    'foobar',
+    'w:rPr{r:,w:b=on}',
+    'foo{a=b} ba r ',
+    'w:t{xml:space=preserve} foo ',
+    'w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foobar,w:r{r:id=3}/(a:b,c))',
+    'w:p/(w:r{r:}/r:x,w:r)',
+    'c:barChart/c:ser/c:cat/c:strRef/c:strCache/(c:pt{idx=1}/c:v"bar",'
+    'c:pt{idx=0}/c:v"foo")',
+])
+def cxml(request):
+    return request.param
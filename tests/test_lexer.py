@@ -8,12 +8,16 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+import mmap
 import sys
 sys.path.insert(0, '.')
 
 import pytest
 
-from cxml.lexer import CxmlLexer as Lexer
+from cxml import lexer as lexer_module
+from cxml.lexer import (
+    CxmlDfaLexer, CxmlLexer as Lexer, CxmlRegexLexer, lex_many
+)
 from cxml.symbols import (
     COLON, COMMA, EQUAL, LBRACE, LPAREN, NAME, RBRACE, RPAREN, SLASH, SNTL,
     TEXT
@@ -83,6 +87,64 @@ class DescribeLexer(object):
             assert token.symbol is symbol
             assert token.lexeme == lexeme
 
+    def it_recognizes_a_non_ascii_name(self, ncname_fixture):
+        input_, lexemes = ncname_fixture
+
+        tokens = list(Lexer(input_))
+
+        assert [t.lexeme for t in tokens if t.symbol is NAME] == lexemes
+
+    def it_rejects_a_non_ascii_character_not_allowed_in_a_name(self):
+        with pytest.raises(SyntaxError) as e:
+            list(Lexer('foo/b·r,×'.encode('utf-8')))
+        assert str(e.value) == "at character '×' (byte 9) in 'foo/b·r,×'"
+
+    def it_generates_each_token_before_lexing_the_rest_of_input(self):
+        tokens = iter(Lexer('foo/bar!'))
+        assert next(tokens).lexeme == 'foo'
+        with pytest.raises(SyntaxError):
+            list(tokens)
+
+    def it_can_lex_into_a_token_buffer(self, lex_fixture):
+        input_, expected_values = lex_fixture
+
+        token_buffer = Lexer(input_).token_buffer()
+
+        assert [(t.symbol, t.lexeme) for t in token_buffer] == list(
+            expected_values
+        )
+
+    def it_lexes_binary_input_like_text(self, lex_fixture, binary_input):
+        input_, expected_values = lex_fixture
+        data = binary_input(input_.encode('utf-8'))
+
+        tokens = list(Lexer(data))
+        token_buffer = Lexer(data).token_buffer()
+
+        assert [(t.symbol, t.lexeme) for t in tokens] == list(expected_values)
+        assert [(t.symbol, t.lexeme) for t in token_buffer] == list(
+            expected_values
+        )
+
+    def it_decodes_binary_input_for_an_error_message(self):
+        with pytest.raises(SyntaxError) as e:
+            list(Lexer('foo{a=ø}/!'.encode('utf-8')))
+        assert str(e.value) == "at character '!' (byte 10) in 'foo{a=ø}/!'"
+
+    @pytest.mark.parametrize('data, message', [
+        (b'foo\xff', "invalid UTF-8 (byte 3) in 'foo\ufffd'"),
+        (b'foo{a=b}\xff', "invalid UTF-8 (byte 8) in 'foo{a=b}\ufffd'"),
+        (b'\xc3', "invalid UTF-8 (byte 0) in '\ufffd'"),
+    ])
+    def it_raises_on_binary_input_that_is_not_utf8(self, data, message):
+        with pytest.raises(SyntaxError) as e:
+            [token.lexeme for token in Lexer(data)]
+        assert str(e.value) == message
+
+    def it_omits_the_sentinel_from_the_buffer_when_asked(self):
+        token_buffer = Lexer('foo', emit_sntl=False).token_buffer()
+        assert [t.symbol for t in token_buffer] == [NAME]
+
     # fixtures -------------------------------------------------------
 
     @pytest.fixture(params=[
@@ -94,6 +156,11 @@ class DescribeLexer(object):
             (NAME, 'foo'), (LBRACE, '{'), (NAME, 'anm'), (EQUAL, '='),
             (TEXT, 'bar'), (RBRACE, '}'), (TEXT, 'baz'),
         )),
+        ('wö:ƒoo', ((NAME, 'wö'), (COLON, ':'), (NAME, 'ƒoo'))),
+        ('foo{a=ƒøø}"bår"', (
+            (NAME, 'foo'), (LBRACE, '{'), (NAME, 'a'), (EQUAL, '='),
+            (TEXT, 'ƒøø'), (RBRACE, '}'), (TEXT, 'bår'),
+        )),
         ('w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foo,w:r{r:id=3})', (
             (NAME,   'w'), (COLON,  ':'),   (NAME,   'rPr'), (LBRACE, '{'),
             (NAME,   'r'), (COLON,  ':'),   (COMMA,  ','),   (NAME,   'w'),
@@ -112,6 +179,31 @@ class DescribeLexer(object):
         expected_values = values + ((SNTL, ''),)
         return input_, expected_values
 
+    @pytest.fixture(params=['bytes', 'bytearray', 'mmap'])
+    def binary_input(self, request, tmpdir):
+        def binary_input(data):
+            if request.param == 'bytes':
+                return data
+            if request.param == 'bytearray':
+                return bytearray(data)
+            path = tmpdir.join('input.cxml')
+            path.write_binary(data)
+            with path.open('rb') as f:
+                # an empty file cannot be mapped
+                if not data:
+                    return data
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return binary_input
+
+    @pytest.fixture(params=[
+        ('ƒoo', ['ƒoo']),
+        ('w:tëst{ättr=1}', ['w', 'tëst', 'ättr']),
+        ('中文/Ωmega_·‿x,x·́', ['中文', 'Ωmega_·‿x', 'x·́']),
+        ('a\U00010400b', ['a\U00010400b']),
+    ])
+    def ncname_fixture(self, request):
+        return request.param
+
     @pytest.fixture(params=[
         (':', COLON,  ':'),
         (',', COMMA,  ','),
@@ -151,3 +243,241 @@ class DescribeLexer(object):
         input_ = request.param
         lexer = Lexer(input_, '_lex_whitespace')
         return lexer
+
+
+class DescribeCxmlRegexLexer(object):
+
+    def it_produces_the_same_tokens_as_the_state_machine_lexer(
+            self, equiv_fixture, lexer_cls):
+        input_, emit_sntl = equiv_fixture
+
+        tokens = list(lexer_cls(input_, emit_sntl=emit_sntl))
+
+        expected = list(Lexer(input_, emit_sntl=emit_sntl))
+        assert [(t.symbol, t.lexeme) for t in tokens] == [
+            (t.symbol, t.lexeme) for t in expected
+        ]
+
+    def it_can_lex_into_the_same_token_buffer(self, equiv_fixture, lexer_cls):
+        input_, emit_sntl = equiv_fixture
+
+        token_buffer = lexer_cls(input_, emit_sntl).token_buffer()
+
+        expected = Lexer(input_, emit_sntl=emit_sntl).token_buffer()
+        assert [
+            (token_buffer.symbol_at(i), token_buffer.span_at(i))
+            for i in range(len(token_buffer))
+        ] == [
+            (expected.symbol_at(i), expected.span_at(i))
+            for i in range(len(expected))
+        ]
+
+    def it_raises_on_an_unexpected_character(self, error_fixture, lexer_cls):
+        input_, message = error_fixture
+        with pytest.raises(SyntaxError) as e:
+            list(lexer_cls(input_))
+        assert str(e.value) == message
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        ('', True),
+        ('', False),
+        ('   ', True),
+        (' w : rPr', True),
+        ('w:rPr{r:,w:b=on}', False),
+        ('w:rPr{w:val=-48.7, b=c}', True),
+        ('w:rPr{a=,b=}', True),
+        ('foo{a=b} ba r ', True),
+        ('foo{a=b}" ba r "', True),
+        ('foo{a=b}', True),
+        ('foo"bar"', True),
+        ('foo{a=b"c}', True),
+        ('w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foobar,w:r{r:id=3})', True),
+        ('c:pt{idx=1}/c:v"bar"', True),
+        ('w:tëst{ättr=ƒ}/(中文,x·́"y")', True),
+    ])
+    def equiv_fixture(self, request):
+        return request.param
+
+    @pytest.fixture(params=[
+        ('foo!', "at character '!' in 'foo!'"),
+        ('foo\n', "at character '\n' in 'foo\n'"),
+        ('foo"bar', 'unterminated quote'),
+        ('foo{a="bar}', 'unterminated quote'),
+    ])
+    def error_fixture(self, request):
+        return request.param
+
+    @pytest.fixture
+    def lexer_cls(self):
+        return CxmlRegexLexer
+
+
+class DescribeCxmlDfaLexer(DescribeCxmlRegexLexer):
+
+    def it_compiles_its_spec_once(self):
+        tables = CxmlDfaLexer.spec.compile()
+        assert CxmlDfaLexer.spec.compile() is tables
+        assert sorted(tables.modes) == ['start', 'text']
+
+    def it_knows_its_input_and_whether_it_emits_a_sentinel(self):
+        lexer = CxmlDfaLexer('foo', emit_sntl=False)
+        assert lexer.input == 'foo'
+        assert lexer.emit_sntl is False
+
+    def it_lexes_non_ascii_text(self):
+        tokens = list(CxmlDfaLexer('foo{a=ƒøø}"bår"'))
+        assert [t.lexeme for t in tokens] == [
+            'foo', '{', 'a', '=', 'ƒøø', '}', 'bår', ''
+        ]
+
+    def it_can_relex_an_edited_input(self, relex_fixture):
+        input_, offset, deleted, inserted = relex_fixture
+        token_buffer = CxmlDfaLexer(input_).token_buffer()
+
+        new_buffer = CxmlDfaLexer.relex(
+            token_buffer, offset, deleted, inserted
+        )
+
+        new_input = input_[:offset] + inserted + input_[offset + deleted:]
+        expected = CxmlDfaLexer(new_input).token_buffer()
+        assert new_buffer.input == new_input
+        assert spans(new_buffer) == spans(expected)
+
+    def it_only_relexes_the_tokens_around_the_edit(self, monkeypatch):
+        input_ = ','.join(['w:r{w:a=b}/w:t"foo"'] * 100)
+        token_buffer = CxmlDfaLexer(input_).token_buffer()
+        scanned = []
+        _scan = CxmlDfaLexer._scan
+
+        def scan(*args):
+            for record in _scan(*args):
+                scanned.append(record)
+                yield record
+        monkeypatch.setattr(
+            CxmlDfaLexer, '_scan', staticmethod(scan)
+        )
+
+        new_buffer = CxmlDfaLexer.relex(token_buffer, 1000, 3, 'xyzzy')
+
+        assert len(scanned) < 5
+        new_input = new_buffer.input
+        assert spans(new_buffer) == spans(
+            CxmlDfaLexer(new_input).token_buffer()
+        )
+
+    def it_raises_when_the_edited_input_is_invalid(self):
+        token_buffer = CxmlDfaLexer('foo{a=b}').token_buffer()
+        with pytest.raises(SyntaxError):
+            CxmlDfaLexer.relex(token_buffer, 5, 0, '"')
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture
+    def lexer_cls(self):
+        return CxmlDfaLexer
+
+    @pytest.fixture(params=[
+        ('foo', 3, 0, 'bar'),
+        ('foo', 0, 3, ''),
+        ('', 0, 0, 'foo{a=b}'),
+        ('foo{a=b}', 6, 1, 'xy z'),
+        ('foo{a=b}', 5, 1, ','),
+        ('foo{a,b}', 5, 1, '='),
+        ('foo{a=b}/bar', 7, 1, ')'),
+        ('foo{a=b}/bar', 8, 0, ' text '),
+        ('foo{a=b}bar', 7, 1, ','),
+        ('foo{a="b,c"}', 6, 6, 'b,c}'),
+        ('foo{a=b}', 6, 1, '"b}"'),
+        ('foo/(bar,baz)', 6, 1, 'oo  '),
+        ('w:r{w:a=b}/w:t"foo",w:r/w:t"bar"', 15, 3, 'ba z'),
+    ])
+    def relex_fixture(self, request):
+        return request.param
+
+
+class DescribeLexMany(object):
+
+    def it_lexes_each_expression_like_the_state_machine_lexer(
+            self, many_fixture):
+        inputs, emit_sntl = many_fixture
+
+        token_buffers = lex_many(inputs, emit_sntl)
+
+        assert [spans(b) for b in token_buffers] == [
+            spans(Lexer(input_, emit_sntl=emit_sntl).token_buffer())
+            for input_ in inputs
+        ]
+        assert [b.input for b in token_buffers] == inputs
+
+    def it_lexes_each_expression_in_turn_without_numpy(
+            self, many_fixture, monkeypatch):
+        inputs, emit_sntl = many_fixture
+        monkeypatch.setattr(lexer_module, 'have_numpy', False)
+
+        token_buffers = lex_many(inputs, emit_sntl)
+
+        assert [spans(b) for b in token_buffers] == [
+            spans(Lexer(input_, emit_sntl=emit_sntl).token_buffer())
+            for input_ in inputs
+        ]
+
+    def it_lexes_a_large_batch_with_numpy(self):
+        pytest.importorskip('numpy')
+        inputs = [
+            'w:p{w:a=%d}/(w:r{w:b=on}/w:t" foo ",w:r/w:t%s, }%d)' % (
+                i, 'x' * (i % 7), i
+            ) for i in range(500)
+        ]
+
+        token_buffers = lexer_module._BatchLexer(inputs, True).token_buffers()
+
+        assert [spans(b) for b in token_buffers] == [
+            spans(Lexer(input_).token_buffer()) for input_ in inputs
+        ]
+
+    def it_raises_on_the_first_invalid_expression(self, many_error_fixture):
+        inputs, message = many_error_fixture
+        with pytest.raises(SyntaxError) as e:
+            lex_many(inputs)
+        assert str(e.value) == message
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        ([], True),
+        ([''], True),
+        (['', 'foo', ''], False),
+        (['foo{a=b}', 'bar{c=d}"e"', 'baz'], True),
+        (['w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foo,w:r{r:id=3})'], True),
+        (['foo{a=b} ba r ', 'foo{a=b}" ba r "', 'foo{a=b"c}'], True),
+        (['foo{a=}', 'foo{a==b}', 'foo{a=b}}', 'foo{a=""}/bar'], True),
+        (['foo=', 'foo}', 'foo="bar"', 'a-1.b_2', 'foo{a=b}/(c,d)'], False),
+        (['foo{a=ƒøø}"bår"', '"a=b"c', 'c:pt{idx=1}/c:v"bar"'], True),
+        (['w:tëst{ättr=ƒ}', '中文/(x·́,y)', 'ƒoo'], True),
+    ])
+    def many_fixture(self, request):
+        return request.param
+
+    @pytest.fixture(params=[
+        (['foo', 'foo!'], "at character '!' in 'foo!'"),
+        (['foo"bar', 'foo!'], 'unterminated quote'),
+        (['foo', 'foo!"bar'], "at character '!' in 'foo!\"bar'"),
+        (['foo{a="b}', 'bar'], 'unterminated quote'),
+        (['1foo'], "at character '1' in '1foo'"),
+        (['ƒoo', 'f×o'], "at character '×' in 'f×o'"),
+    ])
+    def many_error_fixture(self, request):
+        return request.param
+
+
+def spans(token_buffer):
+    """
+    Return a list of the (symbol, (start, end)) pair of each token in
+    *token_buffer*.
+    """
+    return [
+        (token_buffer.symbol_at(i), token_buffer.span_at(i))
+        for i in range(len(token_buffer))
+    ]
@@ -0,0 +1,187 @@
+# encoding: utf-8
+
+"""
+Test suite for cxml model module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import io
+import sys
+sys.path.insert(0, '.')
+
+import pytest
+
+from cxml.model import (
+    Element, NamespaceDeclaration, RootElement, StringAttribute
+)
+
+from .mocklib import method_mock
+
+
+class DescribeElement(object):
+
+    def it_partitions_its_attributes_on_construction(self):
+        nsdecl, str_attr = attrs(['r:', 'w:val=1'])
+        element = Element.new('w:jc', [str_attr, nsdecl], '')
+        assert element._nsdecls == (nsdecl,)
+        assert element._str_attrs == (str_attr,)
+
+    def it_raises_on_assign_to_new_attribute(self, model_object):
+        with pytest.raises(AttributeError):
+            model_object.new_attr = '9'
+
+    def it_can_generate_its_xml_at_an_indent(self):
+        element = Element.new('w:r', attrs(['w:rsid=1']), '')
+        element.add_child(Element.new('w:t', [], 'foo'))
+        element.add_child(Element.new('w:br', [], ''))
+
+        xml = element.xml(indent=2)
+
+        assert xml == (
+            '  <w:r w:rsid="1">\n'
+            '    <w:t>foo</w:t>\n'
+            '    <w:br/>\n'
+            '  </w:r>\n'
+        )
+
+    def it_places_children_after_its_text(self):
+        element = Element.new('foo', [], 'bar')
+        element.add_child(Element.new('baz', [], ''))
+        assert element.xml(indent=0) == '<foo>bar  <baz/>\n</foo>\n'
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        lambda: Element.new('w:p', [], ''),
+        lambda: RootElement.new('w:p', [], ''),
+        lambda: StringAttribute.new('w:val', '1'),
+        lambda: NamespaceDeclaration('w'),
+    ])
+    def model_object(self, request):
+        return request.param()
+
+
+class DescribeRootElement(object):
+
+    def it_can_generate_the_xml_of_a_tree_deeper_than_the_recursion_limit(
+            self):
+        depth = sys.getrecursionlimit() * 2
+        root_element = parent = RootElement.new('w:sdt', [], '')
+        for _ in range(depth):
+            child = Element.new('w:sdt', [], '')
+            parent.add_child(child)
+            parent = child
+
+        lines = root_element.xml.splitlines()
+
+        assert len(lines) == depth * 2 + 1
+        assert lines[depth] == '%s<w:sdt/>' % (' ' * 2 * depth)
+
+    def it_can_generate_its_xml_in_chunks(self, chunks_fixture):
+        root_element, chunk_size = chunks_fixture
+
+        chunks = list(root_element.iter_xml(chunk_size))
+
+        assert ''.join(chunks) == root_element.xml
+        assert all(len(c) >= chunk_size for c in chunks[:-1])
+
+    def it_resolves_namespaces_before_generating_the_first_chunk(self):
+        root_element = RootElement.new('w:p', [], '')
+        root_element.add_child(Element.new('a:r', [], ''))
+
+        chunks = root_element.iter_xml(chunk_size=1)
+        chunk = next(chunks)
+
+        assert root_element._nsdecls_str_cache is not None
+        assert chunk.startswith('<w:p xmlns:w=')
+
+    def it_can_write_its_xml_to_a_file(self, chunks_fixture):
+        root_element, chunk_size = chunks_fixture
+        fileobj = io.StringIO()
+
+        root_element.write_to(fileobj, chunk_size)
+
+        assert fileobj.getvalue() == root_element.xml
+
+    def it_resolves_the_namespace_prefixes_to_declare(self, nspfxs_fixture):
+        root_element, expected_nspfxs = nspfxs_fixture
+        assert root_element._resolve_nspfxs() == expected_nspfxs
+
+    def it_resolves_namespaces_once_while_generating_its_xml(
+            self, request):
+        root_element = RootElement.new('w:p', [], '')
+        root_element.add_child(Element.new('a:r', [], ''))
+        _resolve_nspfxs_ = method_mock(
+            request, RootElement, '_resolve_nspfxs', return_value=['w', 'a']
+        )
+
+        root_element.xml
+
+        _resolve_nspfxs_.assert_called_once_with()
+        assert root_element._nsdecls_str_cache is None
+
+    def it_resolves_namespaces_again_when_a_child_is_added(self):
+        root_element = RootElement.new('w:p', [], '')
+        root_element._nsdecls_str
+        root_element.add_child(Element.new('a:r', [], ''))
+        assert root_element._resolve_nspfxs() == ['w', 'a']
+        assert 'xmlns:a=' in root_element._nsdecls_str
+
+    def it_resolves_namespaces_again_when_a_descendant_changes(self):
+        root_element = RootElement.new('w:p', [], '')
+        child = Element.new('w:r', [], '')
+        root_element.add_child(child)
+        assert 'xmlns:a=' not in root_element.xml
+
+        child.add_child(Element.new('a:t', [], ''))
+
+        assert 'xmlns:a=' in root_element.xml
+        assert 'xmlns:a=' in ''.join(root_element.iter_xml())
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[1, 40, 100000])
+    def chunks_fixture(self, request):
+        chunk_size = request.param
+        root_element = RootElement.new('w:body', [], '')
+        for idx in range(20):
+            p = Element.new('w:p', attrs(['w:rsid=%d' % idx]), '')
+            p.add_child(Element.new('w:r', [], 'text %d' % idx))
+            root_element.add_child(p)
+        return root_element, chunk_size
+
+    @pytest.fixture(params=[
+        # root tag first, then root explicit, then document order
+        ('w:p', ['r:', 'b=1'], [('a:r', ['wp:x=1']), ('c:t', [])],
+         ['w', 'r', 'a', 'wp', 'c']),
+        # xml prefix is never declared implicitly
+        ('p', ['xml:space=1'], [('w:r', [])], ['w']),
+        # prefixes explicitly declared in a descendant are omitted
+        ('w:p', [], [('a:r', ['a:']), ('r:t', ['w:', 'r:id=1'])],
+         ['r']),
+        ('p', [], [('x', ['c:'])], []),
+    ])
+    def nspfxs_fixture(self, request):
+        root_qname, root_attrs, children, expected_nspfxs = request.param
+        root_element = RootElement.new(root_qname, attrs(root_attrs), '')
+        for qname, attr_specs in children:
+            root_element.add_child(Element.new(qname, attrs(attr_specs), ''))
+        return root_element, expected_nspfxs
+
+
+def attrs(specs):
+    """
+    Return a list of attribute objects from *specs* like `'w:'` for
+    a namespace declaration or `'w:val=1'` for a string attribute.
+    """
+    attrs = []
+    for spec in specs:
+        if spec.endswith(':'):
+            attrs.append(NamespaceDeclaration(spec[:-1]))
+            continue
+        qname, value = spec.split('=')
+        attrs.append(StringAttribute.new(qname, value))
+    return attrs
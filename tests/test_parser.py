@@ -13,8 +13,9 @@ sys.path.insert(0, '.')
 
 import pytest
 
-from cxml.lexer import CxmlLexer
-from cxml.parser import CxmlParser
+from cxml.lexer import CxmlDfaLexer, CxmlLexer
+from cxml.lib.parser import TokenStream
+from cxml.parser import CxmlParser, CxmlPredictiveParser, ll1_table
 from cxml.symbols import (
     COLON, COMMA, SNTL, EQUAL, LBRACE, LPAREN, NAME, RBRACE, RPAREN, SLASH,
     TEXT, attr, attr_list, attrs, element, nsdecl, qname, root, root_element,
@@ -84,8 +85,210 @@ class DescribeParser(object):
         ast = parse(input_, root, emit_sntl=True)
         assert shallow_eq(ast, root_symbol, expected_values)
 
+    def it_produces_the_same_ast_in_packrat_mode(self, cxml_fixture):
+        cxml = cxml_fixture
+        ast = parse(cxml, root, emit_sntl=True, memoize=True)
+        assert repr(ast) == repr(parse(cxml, root, emit_sntl=True))
+
+    def it_produces_the_same_ast_from_utf8_bytes(self, cxml_fixture):
+        cxml = cxml_fixture
+        ast = parse(cxml.encode('utf-8'), root, emit_sntl=True)
+        assert repr(ast) == repr(parse(cxml, root, emit_sntl=True))
+
+    def it_reports_packrat_memo_hits_and_misses(self):
+        parser = CxmlParser(CxmlLexer('w:t{a=1,b=2,c=3}'), memoize=True)
+        assert parser.memo_info == (0, 0)
+
+        parser.parse(root)
+        hits, misses = parser.memo_info
+
+        assert hits > 0
+        assert misses > 0
+        parser.parse(root)
+        assert parser.memo_info == (hits, misses)
+
+    def it_produces_the_same_ast_in_iterative_mode(self, cxml_fixture):
+        cxml = cxml_fixture
+        ast = parse(cxml, root, emit_sntl=True, iterative=True)
+        assert repr(ast) == repr(parse(cxml, root, emit_sntl=True))
+
+    def it_can_parse_any_symbol_in_iterative_mode(self, symbol_fixture):
+        input_, start_symbol = symbol_fixture
+        for memoize in (False, True):
+            ast = parse(
+                input_, start_symbol, memoize=memoize, iterative=True
+            )
+            assert repr(ast) == repr(parse(input_, start_symbol))
+
+    def it_raises_on_a_syntax_error_in_iterative_mode(self, error_fixture):
+        cxml = error_fixture
+        with pytest.raises(SyntaxError):
+            parse(cxml, root, emit_sntl=True, iterative=True)
+
+    def it_can_parse_beyond_the_recursion_limit_in_iterative_mode(
+            self, stress_fixture):
+        cxml, expected_value = stress_fixture
+        ast = parse(cxml, root, emit_sntl=True, iterative=True)
+        assert ast.value == expected_value
+
+    def it_produces_the_same_ast_with_the_predictive_parser(
+            self, cxml_fixture):
+        cxml = cxml_fixture
+        parser = CxmlPredictiveParser(CxmlLexer(cxml))
+        ast = parser.parse(root)
+        assert repr(ast) == repr(parse(cxml, root, emit_sntl=True))
+
+    def it_can_parse_any_symbol_with_the_predictive_parser(
+            self, symbol_fixture):
+        input_, start_symbol = symbol_fixture
+        parser = CxmlPredictiveParser(CxmlLexer(input_, emit_sntl=False))
+        ast = parser.parse(start_symbol)
+        assert repr(ast) == repr(parse(input_, start_symbol))
+
+    def it_raises_on_a_syntax_error_with_the_predictive_parser(
+            self, error_fixture):
+        cxml = error_fixture
+        parser = CxmlPredictiveParser(CxmlLexer(cxml))
+        with pytest.raises(SyntaxError):
+            parser.parse(root)
+
+    def it_produces_the_same_ast_from_a_token_buffer(
+            self, cxml_fixture, monkeypatch):
+        cxml = cxml_fixture
+        expected = repr(parse(cxml, root, emit_sntl=True))
+        monkeypatch.setattr(TokenStream, 'buffer_threshold', 0)
+        modes = ((False, False), (True, False), (True, True))
+        for memoize, iterative in modes:
+            ast = parse(
+                cxml, root, emit_sntl=True, memoize=memoize,
+                iterative=iterative
+            )
+            assert repr(ast) == expected
+        ast = CxmlPredictiveParser(CxmlLexer(cxml)).parse(root)
+        assert repr(ast) == expected
+
+    def it_uses_a_conflict_free_ll1_table(self):
+        assert ll1_table.conflicts == []
+
+    def it_can_reparse_an_edited_expression(self, reparse_fixture):
+        cxml, offset, deleted, inserted, iterative = reparse_fixture
+        parser = CxmlParser(
+            CxmlDfaLexer(cxml), iterative=iterative, incremental=True
+        )
+        parser.parse(root)
+
+        ast = parser.reparse(root, offset, deleted, inserted)
+
+        edited = cxml[:offset] + inserted + cxml[offset + deleted:]
+        assert repr(ast) == repr(parse(edited, root, emit_sntl=True))
+
+    def it_reuses_the_subtrees_outside_the_edit(self, iterative):
+        cxml = 'w:p/(w:r/w:t"foo",w:r/w:t"bar",w:r/w:t"baz")'
+        parser = CxmlParser(
+            CxmlDfaLexer(cxml), iterative=iterative, incremental=True
+        )
+        before = tree_nodes(parser.parse(root))
+
+        after = tree_nodes(parser.reparse(root, cxml.index('bar'), 3, 'qux'))
+
+        assert after[0] is before[0]
+        assert after[1] is not before[1]
+        assert after[1].value == 'w:r/w:tqux'
+        assert after[2] is before[2]
+
+    def it_reparses_in_full_after_a_lexical_error(self):
+        parser = CxmlParser(CxmlDfaLexer('foo{a=b}'), incremental=True)
+        parser.parse(root)
+        with pytest.raises(SyntaxError):
+            parser.reparse(root, 6, 0, '"')
+
+        ast = parser.reparse(root, 8, 0, '"')
+
+        assert repr(ast) == repr(parse('foo{a="b"}', root, emit_sntl=True))
+
+    def it_reparses_in_full_after_a_parse_with_a_lexical_error(self):
+        parser = CxmlParser(CxmlDfaLexer('foo{a="b}'), incremental=True)
+        with pytest.raises(SyntaxError):
+            parser.parse(root)
+
+        ast = parser.reparse(root, 8, 0, '"')
+
+        assert repr(ast) == repr(parse('foo{a="b"}', root, emit_sntl=True))
+
+    def it_requires_a_dfa_lexer_to_parse_incrementally(self):
+        with pytest.raises(ValueError):
+            CxmlParser(CxmlLexer('foo'), incremental=True)
+        with pytest.raises(ValueError):
+            CxmlParser(CxmlDfaLexer('foo')).reparse(root, 0, 0, 'x')
+
+    def it_keeps_no_memo_when_not_memoizing(self):
+        parser = CxmlParser(CxmlLexer('w:t{a=1,b=2,c=3}'))
+        parser.parse(root)
+        assert parser.memo_info == (0, 0)
+
     # fixtures -------------------------------------------------------
 
+    @pytest.fixture(params=[False, True])
+    def iterative(self, request):
+        return request.param
+
+    @pytest.fixture(params=[
+        ('foo', 3, 0, 'bar'),
+        ('foo', 3, 0, '/bar'),
+        ('foo/bar', 3, 4, ''),
+        ('foo/(bar,baz)', 8, 0, ',qux{a=b}'),
+        ('foo/(bar,baz)', 4, 9, 'bar/baz'),
+        ('foo/(bar,baz,qux)', 9, 3, 'w:baz"text"'),
+        ('foo{a=b}/(bar,baz)', 6, 1, '"b,c"'),
+        ('foo{a=b}/(bar,baz)', 7, 1, ',r:}'),
+        ('w:p/(w:r/w:t"foo",w:r/w:t"bar")', 13, 3, 'baz'),
+        ('w:p/(w:r/w:t"foo",w:r/w:t"bar")', 17, 13, ''),
+        ('w:p/(w:r/w:t"foo",w:r/w:t"bar")', 0, 3, 'a:b'),
+    ])
+    def reparse_fixture(self, request, iterative):
+        return request.param + (iterative,)
+
+    @pytest.fixture(params=[
+        'foobar',
+        'w:rPr{r:,w:b=on}',
+        'w:t{a=b}bar',
+        'foo/(bar/(baz,baz),bar)',
+        'w:rPr{r:,w:val="8,7"}/(w:r{r:id=1}foobar,w:r{r:id=3})',
+    ])
+    def cxml_fixture(self, request):
+        return request.param
+
+    @pytest.fixture(params=['wide', 'deep'])
+    def stress_fixture(self, request):
+        n = sys.getrecursionlimit() * 2
+        if request.param == 'wide':
+            cxml = 'w:p/(%s)' % ','.join(['w:r/w:t"x"'] * n)
+        else:
+            cxml = '/'.join(['w:sdt'] * n)
+        return cxml, cxml.replace('"', '')
+
+    @pytest.fixture(params=[
+        'w:', 'w:rPr{', 'w:rPr/', 'foo/(bar', 'foo/(bar,)', 'foo/bar)',
+        'w:rPr{w:b=1,}', 'w:rPr{w:b}', 'foo"bar"baz',
+    ])
+    def error_fixture(self, request):
+        return request.param
+
+    @pytest.fixture(params=[
+        ('w:', nsdecl),
+        ('w:rPr', qname),
+        ('w:b=1', str_attr),
+        ('r:,w:b=1,w:i=0', attr_list),
+        ('{w:b=1,r:,w:i=0}', attrs),
+        ('w:t{b=1}"foo"', element),
+        ('foo/bar', tree),
+        ('foo,bar/baz', tree_list),
+        ('(foo,bar)', trees),
+        ('w:t{a=b}bar', root_element),
+    ])
+    def symbol_fixture(self, request):
+        return request.param
+
     @pytest.fixture(params=[
         ('w:',    attr, [(nsdecl, 'w:')]),
         ('w:b=1', attr, [(str_attr, 'w:b=1')]),
@@ -203,15 +406,31 @@ class DescribeParser(object):
         return input_, root_symbol, expected_values
 
 
-def parse(string, start_symbol, emit_sntl=False):
+def parse(string, start_symbol, emit_sntl=False, memoize=False,
+          iterative=False):
     """
     Return the |ASTNode| object produced by parsing *string* with CxmlParser.
     """
     lexer = CxmlLexer(string, emit_sntl=emit_sntl)
-    parser = CxmlParser(lexer)
+    parser = CxmlParser(lexer, memoize=memoize, iterative=iterative)
     return parser.parse(start_symbol)
 
 
+def tree_nodes(root_ast):
+    """
+    Return a list of the `tree` nodes in *root_ast* under its `trees` node,
+    in document order.
+    """
+    nodes, stack = [], [root_ast]
+    while stack:
+        node = stack.pop()
+        if node.symbol == tree:
+            nodes.append(node)
+        elif node.symbol in (root, trees, tree_list):
+            stack.extend(reversed(node.child_nodes))
+    return nodes
+
+
 def shallow_eq(ast, root_symbol, values):
     """
     Return |True| if the root node in *ast* has *root_symbol* as its symbol
@@ -0,0 +1,121 @@
+# encoding: utf-8
+
+"""
+Test suite for cxml.template module.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+sys.path.insert(0, '.')
+
+import pytest
+
+from cxml import compile, xml
+from cxml.template import CxmlTemplate
+
+
+class DescribeCxmlTemplate(object):
+
+    def it_renders_the_same_xml_as_the_filled_in_expression(
+            self, render_fixture):
+        template, values, expression = render_fixture
+        assert compile(template).render(**values) == xml(expression)
+
+    def it_renders_without_translating_again(self, template_fixture):
+        cxml_template, translate_count = template_fixture
+        for val in ('left', 'right', 'center'):
+            cxml_template.render(val=val)
+        assert translate_count() == 0
+
+    def it_translates_again_for_a_prefixed_name(self, template_fixture):
+        cxml_template, translate_count = template_fixture
+        cxml_template.render(val='r:id')
+        cxml_template.render(val='r:id')
+        assert translate_count() == 1
+
+    def it_translates_again_for_empty_element_text(self):
+        cxml_template = CxmlTemplate('w:p/w:r/w:t"${text}"')
+        assert cxml_template.render(text='') == xml('w:p/w:r/w:t')
+        assert cxml_template.render(text='') == xml('w:p/w:r/w:t')
+        assert len(cxml_template._fallback_xml_parts) == 1
+        assert cxml_template.render(text='x') == xml('w:p/w:r/w:t"x"')
+
+    def it_knows_its_placeholder_names(self):
+        cxml_template = compile('${a}{x=${b}}/(c"${a}",d{y=${c}})')
+        assert cxml_template.names == ('a', 'b', 'c')
+
+    def it_raises_on_a_missing_value(self):
+        with pytest.raises(KeyError):
+            compile('w:jc{w:val=${val}}').render()
+
+    @pytest.mark.parametrize('template, values', [
+        ('w:${tag}', {'tag': 'foo bar'}),
+        ('w:${tag}', {'tag': 'r:id'}),
+        ('${n}b', {'n': '1'}),
+        ('${t}', {'t': '\u00b7a'}),
+        ('foo{x${k}=1}', {'k': ' '}),
+        ('foo{${p}:,b=c}', {'p': 'r:w'}),
+    ])
+    def it_raises_on_a_name_value_that_is_not_a_name(self, template, values):
+        with pytest.raises(ValueError):
+            compile(template).render(**values)
+
+    @pytest.mark.parametrize('template', [
+        'foo{a=$}', 'foo{a=${1}}', 'foo{a=${b', 'foo$',
+    ])
+    def it_raises_on_an_invalid_placeholder(self, template):
+        with pytest.raises(ValueError):
+            compile(template)
+
+    def it_raises_on_a_syntax_error_in_the_template(self):
+        with pytest.raises(SyntaxError):
+            compile('foo/(${a}')
+
+    # fixtures -------------------------------------------------------
+
+    @pytest.fixture(params=[
+        ('w:jc{w:val=${val}}', {'val': 'center'}, 'w:jc{w:val=center}'),
+        ('w:jc{w:val="${a},${b}"}', {'a': 1, 'b': 2}, 'w:jc{w:val="1,2"}'),
+        ('w:t"${text}"', {'text': 'foo, bar'}, 'w:t"foo, bar"'),
+        ('foo{a=b}${t}', {'t': 'bar'}, 'foo{a=b}bar'),
+        ('w:${tag}{w:val=1}', {'tag': 'sz'}, 'w:sz{w:val=1}'),
+        ('${tag}/w:b', {'tag': 'w:rPr'}, 'w:rPr/w:b'),
+        ('foo{${a}=x}', {'a': 'r:id'}, 'foo{r:id=x}'),
+        ('foo{${p}:,b=c}', {'p': 'w'}, 'foo{w:,b=c}'),
+        ('foo/(${x}bar,baz"${x}")', {'x': 'ab'}, 'foo/(abbar,baz"ab")'),
+        ('foo{a="$$${v}"}', {'v': 9}, 'foo{a="$9"}'),
+        ('cxmltpl0z/${a}', {'a': 'b'}, 'cxmltpl0z/b'),
+        ('foo/bar', {}, 'foo/bar'),
+        ('w:b${n}', {'n': '1'}, 'w:b1'),
+        ('${t}', {'t': '\u00e9l\u00e9ment'}, '\u00e9l\u00e9ment'),
+        ('w:${t}', {'t': '\u00e9t\u00e9'}, 'w:\u00e9t\u00e9'),
+        ('foo{${k}=1}', {'k': '\u043a\u043b\u044e\u0447'},
+         'foo{\u043a\u043b\u044e\u0447=1}'),
+        ('foo{x${k}=1}', {'k': '2'}, 'foo{x2=1}'),
+        ('w:${a}-${b}{w:val=1}', {'a': 'b', 'b': '2'}, 'w:b-2{w:val=1}'),
+        ('w:t"${v}"', {'v': ''}, 'w:t'),
+        ('foo{a=b}"${v}"', {'v': ''}, 'foo{a=b}'),
+        ('foo{a=b}${v}', {'v': ''}, 'foo{a=b}'),
+        ('foo"${v}${w}"/bar', {'v': '', 'w': ''}, 'foo/bar'),
+        ('foo"${v}${w}"/bar', {'v': '', 'w': 'x'}, 'foo"x"/bar'),
+        ('foo"a${v}"/bar', {'v': ''}, 'foo"a"/bar'),
+        ('foo{a="${v}"}', {'v': ''}, 'foo{a=""}'),
+    ])
+    def render_fixture(self, request):
+        return request.param
+
+    @pytest.fixture
+    def template_fixture(self, request):
+        cxml_template = CxmlTemplate('w:rPr/${val}{w:val="${val}"}')
+        calls = []
+        translate = cxml_template._translate
+
+        def counting_translate(substitutions):
+            calls.append(substitutions)
+            return translate(substitutions)
+
+        cxml_template._translate = counting_translate
+        return cxml_template, lambda: len(calls)
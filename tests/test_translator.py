@@ -122,6 +122,20 @@ class DescribeCxmlTranslator(object):
         assert root_element_.add_child.call_args_list == add_calls
         assert value == expected_value
 
+    def it_reuses_the_value_of_a_tree_node_when_asked(self, request):
+        tree_ = method_mock(request, CxmlTranslator, 'tree')
+        qname_ = method_mock(request, CxmlTranslator, 'qname')
+        cxml_translator = CxmlTranslator(reuse=True)
+        tree_node = ASTNode(tree, [ASTNode(element, ())])
+        qname_node = ASTNode(qname, ['NAME'])
+
+        values = [cxml_translator.evaluate(tree_node) for _ in range(2)]
+        [cxml_translator.evaluate(qname_node) for _ in range(2)]
+
+        assert values == [tree_.return_value] * 2
+        assert tree_.call_count == 1
+        assert qname_.call_count == 2
+
     # fixtures -------------------------------------------------------
 
     @pytest.fixture
@@ -131,15 +145,16 @@ class DescribeCxmlTranslator(object):
         return cxml_translator, node
 
     @pytest.fixture(params=[
-        (('w:b=1',),              ('w:b=1',),           ['w:b=1']),
-        (('w:b=1', ',', 'w:i=0'), ('w:b=1', ['w:i=0']), ['w:b=1', 'w:i=0']),
+        ['w:b=1'],
+        ['w:b=1', 'w:i=0'],
+        ['w:b=1', 'w:i=0', 'w:u=1'],
     ])
     def attr_list_fixture(self, request, evaluate_):
-        child_nodes, evaluate_return_values, expected_value = request.param
+        attrs = request.param
         cxml_translator = CxmlTranslator()
-        node = ASTNode(attr_list, child_nodes)
-        evaluate_.side_effect = evaluate_return_values
-        return cxml_translator, node, expected_value
+        node = list_node(attr_list, attrs)
+        evaluate_.side_effect = attrs
+        return cxml_translator, node, attrs
 
     @pytest.fixture
     def attrs_fixture(self, evaluate_):
@@ -254,15 +269,16 @@ class DescribeCxmlTranslator(object):
         return cxml_translator, node, element_, add_calls, expected_value
 
     @pytest.fixture(params=[
-        (('tree',),               ('tree',),            ['tree']),
-        (('tree', ',', 'tree_2'), ('tree', ['tree_2']), ['tree', 'tree_2']),
+        ['tree'],
+        ['tree', 'tree_2'],
+        ['tree', 'tree_2', 'tree_3'],
     ])
     def tree_list_fixture(self, request, evaluate_):
-        child_nodes, evaluate_return_values, expected_value = request.param
+        trees = request.param
         cxml_translator = CxmlTranslator()
-        node = ASTNode(tree_list, child_nodes)
-        evaluate_.side_effect = evaluate_return_values
-        return cxml_translator, node, expected_value
+        node = list_node(tree_list, trees)
+        evaluate_.side_effect = trees
+        return cxml_translator, node, trees
 
     @pytest.fixture(params=[
         (['tree'],                  0, 'tree',        ['tree']),
@@ -304,3 +320,16 @@ class DescribeCxmlTranslator(object):
     @pytest.fixture
     def StringAttribute_(self, request):
         return class_mock(request, 'cxml.translator.StringAttribute')
+
+
+# helpers ------------------------------------------------------------
+
+def list_node(symbol, items):
+    """
+    Return an `attr_list` or `tree_list` node, as *symbol* says, listing
+    *items*, as the grammar nests them.
+    """
+    node = ASTNode(symbol, [items[-1]])
+    for item in reversed(items[:-1]):
+        node = ASTNode(symbol, [item, ',', node])
+    return node